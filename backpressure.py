@@ -0,0 +1,92 @@
+import logging
+import threading
+from contextlib import contextmanager
+from typing import Optional, Iterator
+
+from config import IMAGE_MEMORY_MAX_BYTES
+
+logger = logging.getLogger("ebay_listing.backpressure")
+
+class ByteBudget:
+    """
+    同時に保持できるバイト数の上限
+    上限に達したら、保持している分が解放されるまで acquire を待たせ、前の段階（読み込み・ダウンロード）を遅らせる
+    1つで上限を超える大きさのものは、他に何も保持していないときに限り受け入れる（待ち続けないため）
+    """
+
+    def __init__(self, max_bytes: int, name: str = ""):
+        """
+        初期化
+
+        Args:
+            max_bytes (int): 上限（バイト）。0の場合は上限なし
+            name (str): ログに表示する名前
+        """
+        self.max_bytes = max_bytes
+        self.name = name
+        self.used = 0
+        # 上限に達して待った回数（実行の最後に報告する）
+        self.waits = 0
+        self._condition = threading.Condition()
+
+    def _fits(self, size: int) -> bool:
+        return not self.used or self.used + size <= self.max_bytes
+
+    def acquire(self, size: int) -> None:
+        """
+        指定したバイト数を確保する（上限を超える場合は解放されるまで待つ）
+
+        Args:
+            size (int): 確保するバイト数
+        """
+        if not self.max_bytes or size <= 0:
+            return
+        with self._condition:
+            if not self._fits(size):
+                self.waits += 1
+                logger.debug(f"{self.name}の上限（{self.max_bytes} バイト）に達したため、解放されるまで待ちます")
+                self._condition.wait_for(lambda: self._fits(size))
+            self.used += size
+
+    def release(self, size: int) -> None:
+        """
+        確保したバイト数を解放する
+
+        Args:
+            size (int): acquire で確保したバイト数
+        """
+        if not self.max_bytes or size <= 0:
+            return
+        with self._condition:
+            self.used -= size
+            self._condition.notify_all()
+
+    @contextmanager
+    def reserve(self, size: int) -> Iterator[None]:
+        """
+        with ブロックの間だけ指定したバイト数を確保する
+
+        Args:
+            size (int): 確保するバイト数
+        """
+        self.acquire(size)
+        try:
+            yield
+        finally:
+            self.release(size)
+
+_image_memory: Optional[ByteBudget] = None
+_image_memory_lock = threading.Lock()
+
+def get_image_memory_budget() -> ByteBudget:
+    """
+    アップロードのためにメモリに読み込む画像の合計サイズの上限を取得する（プロセス内で共有する）
+
+    Returns:
+        ByteBudget: IMAGE_MEMORY_MAX_BYTES を上限とする ByteBudget
+    """
+    global _image_memory
+    with _image_memory_lock:
+        if _image_memory is None:
+            _image_memory = ByteBudget(IMAGE_MEMORY_MAX_BYTES, "メモリに読み込む画像")
+        return _image_memory
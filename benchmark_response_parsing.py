@@ -0,0 +1,107 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Trading APIのレスポンスの解析方法を比較するマイクロベンチマーク
+AddItemのレスポンス（手数料の一覧を含む）から ItemID を取り出すときの、
+response.dict()（全体を辞書に変換）と extract_response_fields（必要な要素だけを読み取る）の
+1回あたりの所要時間とメモリの割り当てを比較する
+
+使い方: python benchmark_response_parsing.py [繰り返し回数]
+"""
+
+import sys
+import time
+import tracemalloc
+from types import SimpleNamespace
+
+from ebaysdk.response import Response
+
+from ebay_env import extract_response_fields
+
+FEE_NAMES = [
+    "AuctionLengthFee", "BoldFee", "BuyItNowFee", "CategoryFeaturedFee", "FeaturedFee", "GalleryPlusFee",
+    "FeaturedGalleryFee", "FixedPriceDurationFee", "GalleryFee", "GiftIconFee", "HighLightFee",
+    "InsertionFee", "InternationalInsertionFee", "ListingDesignerFee", "ListingFee", "PhotoDisplayFee",
+    "PhotoFee", "ReserveFee", "SchedulingFee", "SubtitleFee", "BorderFee", "ProPackBundleFee",
+    "BasicUpgradePackBundleFee", "ValuePackBundleFee", "PrivateListingFee", "ProPackPlusBundleFee",
+    "MotorsGermanySearchFee"
+]
+
+def build_additem_response() -> bytes:
+    """
+    本番のAddItemと同じ構造のレスポンスXMLを作成する
+
+    Returns:
+        bytes: レスポンスのXML
+    """
+    fees = "".join(
+        f'<Fee><Name>{name}</Name><Fee currencyID="USD">0.0</Fee>'
+        f'<PromotionalDiscount currencyID="USD">0.0</PromotionalDiscount></Fee>'
+        for name in FEE_NAMES
+    )
+    return (
+        '<?xml version="1.0" encoding="UTF-8"?>'
+        '<AddItemResponse xmlns="urn:ebay:apis:eBLBaseComponents">'
+        '<Timestamp>2024-05-01T00:00:00.000Z</Timestamp><Ack>Success</Ack>'
+        '<Version>1349</Version><Build>E1349_CORE_APISELLING_19187371_R1</Build>'
+        '<ItemID>110554987612</ItemID>'
+        '<StartTime>2024-05-01T00:00:00.000Z</StartTime><EndTime>2024-05-31T00:00:00.000Z</EndTime>'
+        f'<Fees>{fees}</Fees>'
+        '<DiscountReason>SpecialOffer</DiscountReason>'
+        '</AddItemResponse>'
+    ).encode('utf-8')
+
+def parse_full(content: bytes) -> str:
+    http_response = SimpleNamespace(content=content)
+    return Response(http_response, verb='AddItem').dict().get('ItemID')
+
+def parse_fields(content: bytes) -> str:
+    return extract_response_fields(content, ['ItemID'])['ItemID']
+
+def measure(func, content: bytes, iterations: int) -> dict:
+    """
+    1回あたりの所要時間とメモリの割り当てを計測する
+
+    Args:
+        func: 解析する関数
+        content (bytes): レスポンスのXML
+        iterations (int): 繰り返し回数
+
+    Returns:
+        dict: seconds（1回あたりの秒数）、peak（1回の解析で割り当てたメモリの最大値、バイト）
+    """
+    assert func(content) == '110554987612'
+
+    start = time.perf_counter()
+    for _ in range(iterations):
+        func(content)
+    seconds = (time.perf_counter() - start) / iterations
+
+    # 割り当ては1回分だけを計測する（tracemallocの計測中は遅くなるため、時間とは別に計測する）
+    tracemalloc.start()
+    func(content)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return {"seconds": seconds, "peak": peak}
+
+def main() -> int:
+    iterations = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    content = build_additem_response()
+    print(f"AddItemレスポンス: {len(content)} バイト, 繰り返し: {iterations} 回")
+
+    results = {
+        "response.dict()": measure(parse_full, content, iterations),
+        "extract_response_fields": measure(parse_fields, content, iterations),
+    }
+    for name, result in results.items():
+        print(f"{name:<24} {result['seconds'] * 1e6:9.1f} µs/回  最大割り当て {result['peak'] / 1024:8.1f} KiB/回")
+
+    full, light = results["response.dict()"], results["extract_response_fields"]
+    print(f"所要時間: {full['seconds'] / light['seconds']:.1f} 倍高速, "
+          f"最大割り当て: {full['peak'] / max(light['peak'], 1):.1f} 分の1")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
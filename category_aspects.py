@@ -0,0 +1,211 @@
+import time
+import logging
+import threading
+from typing import Optional, List, Dict, Any, Tuple, Iterable
+
+from config import CATEGORY_ASPECTS_TTL_SECONDS
+from ebay_env import EbayEnvironment
+from ebay_lister import get_category_specifics
+from file_lock import FileLock
+from state_store import load_state, save_state, state_path
+
+logger = logging.getLogger("ebay_listing.category_aspects")
+
+# GetCategorySpecificsの1回の呼び出しで指定できるカテゴリ数と、カテゴリごとに返される項目数の上限
+CATEGORIES_PER_CALL = 100
+MAX_NAMES = 30
+MAX_VALUES_PER_NAME = 1000
+
+class CategoryAspectCache:
+    """
+    カテゴリごとのItem Specificsの定義（GetCategorySpecifics）のキャッシュ
+    環境ごとに状態ファイルへ保存し、有効期限が切れたカテゴリだけを取得し直す
+    """
+
+    def __init__(self, env_type: str, ttl_seconds: float = CATEGORY_ASPECTS_TTL_SECONDS):
+        """
+        初期化
+
+        Args:
+            env_type (str): 環境タイプ（カテゴリIDは環境ごとに異なるため、キャッシュも分ける）
+            ttl_seconds (float): キャッシュの有効期限（秒）
+        """
+        self.state_name = f"category_aspects_{env_type}"
+        self.ttl_seconds = ttl_seconds
+        self.entries: Dict[str, Dict[str, Any]] = load_state(self.state_name, {})
+        # 取得に失敗したカテゴリ（この実行中は再取得しない）
+        self._failed = set()
+        self._lock = threading.Lock()
+
+    def _is_fresh(self, entry: Optional[Dict[str, Any]]) -> bool:
+        return entry is not None and time.time() - entry.get("fetched_at", 0) < self.ttl_seconds
+
+    def get(self, category_id: str, environment: EbayEnvironment) -> Optional[List[Dict[str, Any]]]:
+        """
+        カテゴリのItem Specificsの定義を取得する（キャッシュが古いか、ない場合はAPIから取得する）
+
+        Args:
+            category_id (str): カテゴリID
+            environment (EbayEnvironment): eBay環境オブジェクト
+
+        Returns:
+            Optional[List[Dict[str, Any]]]: 項目の定義のリスト。取得できなかった場合はNone。
+        """
+        category_id = str(category_id)
+        with self._lock:
+            entry = self.entries.get(category_id)
+            if self._is_fresh(entry):
+                return entry["aspects"]
+            if category_id in self._failed:
+                return entry["aspects"] if entry else None
+
+        self.refresh([category_id], environment)
+
+        with self._lock:
+            entry = self.entries.get(category_id)
+            if entry is None:
+                return None
+            if not self._is_fresh(entry):
+                logger.warning(f"カテゴリ {category_id} の有効期限切れのItem Specificsの定義を使用します")
+            return entry["aspects"]
+
+    def cached(self, category_id: str) -> Optional[List[Dict[str, Any]]]:
+        """
+        APIを呼ばずに、キャッシュにある有効期限内の定義だけを返す
+
+        Args:
+            category_id (str): カテゴリID
+
+        Returns:
+            Optional[List[Dict[str, Any]]]: 項目の定義のリスト。キャッシュにない場合はNone。
+        """
+        with self._lock:
+            entry = self.entries.get(str(category_id))
+            return entry["aspects"] if self._is_fresh(entry) else None
+
+    def refresh(self, category_ids: Iterable[str], environment: EbayEnvironment) -> int:
+        """
+        複数のカテゴリの定義をまとめて取得し直す
+
+        Args:
+            category_ids (Iterable[str]): カテゴリID
+            environment (EbayEnvironment): eBay環境オブジェクト
+
+        Returns:
+            int: 取得できたカテゴリの数
+        """
+        category_ids = sorted({str(category_id) for category_id in category_ids if category_id})
+        fetched: Dict[str, Dict[str, Any]] = {}
+        for start in range(0, len(category_ids), CATEGORIES_PER_CALL):
+            chunk = category_ids[start:start + CATEGORIES_PER_CALL]
+            specifics = get_category_specifics(chunk, environment, MAX_NAMES, MAX_VALUES_PER_NAME)
+            if specifics is None:
+                with self._lock:
+                    self._failed.update(chunk)
+                continue
+            now = time.time()
+            for category_id in chunk:
+                aspects = specifics.get(category_id)
+                if aspects is None:
+                    with self._lock:
+                        self._failed.add(category_id)
+                    continue
+                fetched[category_id] = {"fetched_at": now, "aspects": aspects}
+
+        if fetched:
+            with self._lock:
+                self.entries.update(fetched)
+                # 他のプロセスが保存した分を消さないように、ファイルロックの中で保存されている状態に追加する
+                with FileLock(state_path(self.state_name) + ".lock"):
+                    stored = load_state(self.state_name, {})
+                    stored.update(fetched)
+                    save_state(self.state_name, stored)
+        return len(fetched)
+
+    def cached_categories(self) -> List[str]:
+        """
+        キャッシュに保存されているカテゴリIDの一覧を返す
+
+        Returns:
+            List[str]: カテゴリID
+        """
+        with self._lock:
+            return list(self.entries)
+
+_caches: Dict[str, CategoryAspectCache] = {}
+_caches_lock = threading.Lock()
+
+def get_aspect_cache(env_type: str) -> CategoryAspectCache:
+    """
+    環境ごとのキャッシュを取得する（プロセス内で共有する）
+
+    Args:
+        env_type (str): 環境タイプ
+
+    Returns:
+        CategoryAspectCache: キャッシュ
+    """
+    with _caches_lock:
+        if env_type not in _caches:
+            _caches[env_type] = CategoryAspectCache(env_type)
+        return _caches[env_type]
+
+def apply_category_aspects(item_specifics: List[Dict[str, str]],
+                           aspects: List[Dict[str, Any]],
+                           defaults: Optional[List[Dict[str, str]]] = None) -> Tuple[List[Dict[str, str]], List[str]]:
+    """
+    カテゴリのItem Specificsの定義に従って、出品前にItem Specificsを整える
+
+    - 項目名の大文字・小文字をカテゴリの定義に合わせる
+    - カテゴリにない項目を取り除く（定義が上限まで返された場合は、取得されていない項目の可能性があるため残す）
+    - 足りない必須項目をデフォルト値で補う
+    - 推奨値からしか選べない項目の値と、足りない必須項目を問題として返す
+
+    Args:
+        item_specifics (List[Dict[str, str]]): 行のItem Specifics（デフォルト値はマージしない。
+                                               デフォルト値は足りない必須項目を補うためだけに使う）
+        aspects (List[Dict[str, Any]]): カテゴリの項目の定義
+        defaults (List[Dict[str, str]], optional): 必須項目を補うためのデフォルト値
+
+    Returns:
+        Tuple[List[Dict[str, str]], List[str]]: (整えたItem Specifics, 問題の一覧)
+    """
+    definitions = {aspect["name"].lower(): aspect for aspect in aspects if aspect.get("name")}
+    complete = len(aspects) < MAX_NAMES
+
+    cleaned: List[Dict[str, str]] = []
+    problems: List[str] = []
+    present = set()
+    for specific in item_specifics:
+        name = specific.get("Name") or ""
+        definition = definitions.get(name.lower())
+        if definition is None:
+            if complete:
+                logger.info(f"カテゴリにないItem Specifics '{name}' を除外します")
+                continue
+            cleaned.append(specific)
+            continue
+
+        value = specific.get("Value")
+        allowed = definition["values"]
+        if (definition["selection_only"] and allowed and len(allowed) < MAX_VALUES_PER_NAME
+                and value not in allowed):
+            problems.append(f"'{definition['name']}' の値 '{value}' は選択肢にありません")
+            present.add(definition["name"].lower())
+            continue
+
+        cleaned.append({**specific, "Name": definition["name"]})
+        present.add(definition["name"].lower())
+
+    default_values = {(specific.get("Name") or "").lower(): specific.get("Value") for specific in defaults or []}
+    for key, definition in definitions.items():
+        if not definition["required"] or key in present:
+            continue
+        value = default_values.get(key)
+        if value:
+            logger.info(f"必須のItem Specifics '{definition['name']}' をデフォルト値 '{value}' で補います")
+            cleaned.append({"Name": definition["name"], "Value": value})
+        else:
+            problems.append(f"必須のItem Specifics '{definition['name']}' がありません")
+
+    return cleaned, problems
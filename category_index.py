@@ -0,0 +1,344 @@
+import os
+import re
+import json
+import math
+import time
+import logging
+import threading
+from collections import defaultdict
+from typing import Optional, List, Dict, Any, Tuple, Set
+
+from config import STATE_DIR
+from state_store import load_state, save_state
+
+logger = logging.getLogger("ebay_listing.category_index")
+
+# 1位と2位のスコア（0〜1）の差がこの値より小さい場合は、あいまいとして確信度を下げる
+MIN_MARGIN = 0.1
+# 葉カテゴリ名の一致率、上位カテゴリのパスの一致率、タイトルのうちカテゴリで説明できる割合の重み
+NAME_WEIGHT = 0.6
+PATH_WEIGHT = 0.15
+TITLE_WEIGHT = 0.25
+
+_STOPWORDS = {"and", "the", "for", "with", "of", "in", "on", "a", "an", "other", "new", "item", "items"}
+
+def tokenize(text: str) -> List[str]:
+    """
+    タイトルやカテゴリ名を照合用のトークンに分割する
+
+    Args:
+        text (str): タイトルまたはカテゴリ名
+
+    Returns:
+        List[str]: 小文字にして単数形にそろえたトークン
+    """
+    tokens = []
+    for token in re.findall(r"[a-z0-9]+", text.lower()):
+        if token in _STOPWORDS:
+            continue
+        if len(token) > 3 and token.endswith("s") and not token.endswith("ss"):
+            token = token[:-1]
+        tokens.append(token)
+    return tokens
+
+class CategoryTreeIndex:
+    """
+    GetCategoriesで取得したカテゴリツリーのローカル索引
+    葉カテゴリかどうか、パス、名前を保持し、カテゴリ名のトークンからの転置索引でタイトルを照合する
+    """
+
+    def __init__(self, categories: List[List[Any]]):
+        """
+        初期化
+
+        Args:
+            categories (List[List[Any]]): [カテゴリID, 名前, 親カテゴリID, 葉カテゴリかどうか] のリスト
+        """
+        self.names: Dict[str, str] = {}
+        self.parents: Dict[str, Optional[str]] = {}
+        self.leaves: Set[str] = set()
+        for category_id, name, parent_id, leaf in categories:
+            self.names[category_id] = name
+            self.parents[category_id] = parent_id
+            if leaf:
+                self.leaves.add(category_id)
+
+        # 葉カテゴリ名のトークンの転置索引と、パス（上位カテゴリ名）のトークン
+        self._name_tokens: Dict[str, Set[str]] = {}
+        self._path_tokens: Dict[str, Set[str]] = {}
+        self._postings: Dict[str, List[str]] = defaultdict(list)
+        document_frequency: Dict[str, int] = defaultdict(int)
+        for category_id in self.leaves:
+            name_tokens = set(tokenize(self.names[category_id]))
+            path_tokens = set()
+            for ancestor in self.ancestors(category_id):
+                path_tokens.update(tokenize(self.names.get(ancestor, "")))
+            self._name_tokens[category_id] = name_tokens
+            self._path_tokens[category_id] = path_tokens - name_tokens
+            for token in name_tokens:
+                self._postings[token].append(category_id)
+            for token in name_tokens | path_tokens:
+                document_frequency[token] += 1
+
+        total = max(len(self.leaves), 1)
+        self._idf = {token: math.log(1 + total / count) for token, count in document_frequency.items()}
+        # カテゴリ名に出てこないトークン（商品名・型番など）の重み
+        self._unknown_idf = math.log(1 + total)
+
+    def ancestors(self, category_id: str) -> List[str]:
+        """
+        上位カテゴリのIDをルートから順に返す
+
+        Args:
+            category_id (str): カテゴリID
+
+        Returns:
+            List[str]: 上位カテゴリのID
+        """
+        result = []
+        parent_id = self.parents.get(category_id)
+        while parent_id and parent_id not in result:
+            result.append(parent_id)
+            parent_id = self.parents.get(parent_id)
+        return list(reversed(result))
+
+    def path(self, category_id: str) -> str:
+        """
+        カテゴリのパス（"Toys & Hobbies > Action Figures > ..."）を返す
+
+        Args:
+            category_id (str): カテゴリID
+
+        Returns:
+            str: カテゴリのパス
+        """
+        return " > ".join(self.names.get(c, c) for c in self.ancestors(category_id) + [category_id])
+
+    def is_leaf(self, category_id: str) -> bool:
+        """
+        出品できる葉カテゴリかどうか
+
+        Args:
+            category_id (str): カテゴリID
+
+        Returns:
+            bool: 葉カテゴリの場合はTrue
+        """
+        return category_id in self.leaves
+
+    def _coverage(self, tokens: Set[str], category_tokens: Set[str]) -> float:
+        total = sum(self._idf.get(token, 0) for token in category_tokens)
+        if not total:
+            return 0.0
+        return sum(self._idf.get(token, 0) for token in category_tokens & tokens) / total
+
+    def _title_coverage(self, tokens: Set[str], category_id: str) -> float:
+        weights = {token: self._idf.get(token, self._unknown_idf) for token in tokens}
+        matched = tokens & (self._name_tokens[category_id] | self._path_tokens[category_id])
+        return sum(weights[token] for token in matched) / sum(weights.values())
+
+    def classify(self, title: str) -> Tuple[Optional[str], float]:
+        """
+        タイトルに最も合う葉カテゴリを推定する
+        葉カテゴリ名のトークンのうちタイトルに含まれる割合（IDFで重み付け）、パスの一致率、
+        タイトルのうちカテゴリ名とパスで説明できる割合を組み合わせて順位を付ける
+
+        Args:
+            title (str): 商品タイトル
+
+        Returns:
+            Tuple[Optional[str], float]: (カテゴリID, 確信度 0〜1)
+        """
+        tokens = set(tokenize(title))
+        candidates = set()
+        for token in tokens:
+            candidates.update(self._postings.get(token, ()))
+        if not candidates:
+            return None, 0.0
+
+        scored = sorted(
+            ((NAME_WEIGHT * self._coverage(tokens, self._name_tokens[c])
+              + PATH_WEIGHT * self._coverage(tokens, self._path_tokens[c])
+              + TITLE_WEIGHT * self._title_coverage(tokens, c), c) for c in candidates),
+            reverse=True
+        )
+        best_score, best_id = scored[0]
+        second_score = scored[1][0] if len(scored) > 1 else 0.0
+        if best_score - second_score < MIN_MARGIN:
+            return best_id, best_score / 2
+        return best_id, best_score
+
+class CategoryLedger:
+    """
+    出品に成功したタイトルとカテゴリの履歴
+    過去に出品したものと似たタイトルは、同じカテゴリに分類する
+    """
+
+    def __init__(self, path: str):
+        """
+        初期化
+
+        Args:
+            path (str): 履歴ファイル（JSON Lines）のパス
+        """
+        self.path = path
+        self._titles: Dict[str, str] = {}
+        self._tokens: List[Tuple[Set[str], str]] = []
+        self._postings: Dict[str, List[int]] = defaultdict(list)
+        self._lock = threading.Lock()
+        if os.path.exists(path):
+            with open(path, 'r', encoding='utf-8') as f:
+                for line in f:
+                    try:
+                        entry = json.loads(line)
+                    except ValueError:
+                        continue
+                    self._add(entry["title"], entry["category_id"])
+
+    def _add(self, title: str, category_id: str) -> None:
+        key = " ".join(tokenize(title))
+        if self._titles.get(key) == category_id:
+            return
+        self._titles[key] = category_id
+        tokens = set(key.split())
+        position = len(self._tokens)
+        self._tokens.append((tokens, category_id))
+        for token in tokens:
+            self._postings[token].append(position)
+
+    def record(self, title: str, category_id: str) -> None:
+        """
+        出品に成功したタイトルとカテゴリを記録する
+
+        Args:
+            title (str): 商品タイトル
+            category_id (str): 出品したカテゴリID
+        """
+        with self._lock:
+            if self._titles.get(" ".join(tokenize(title))) == category_id:
+                return
+            self._add(title, category_id)
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            with open(self.path, 'a', encoding='utf-8') as f:
+                f.write(json.dumps({"title": title, "category_id": category_id, "recorded_at": time.time()},
+                                   ensure_ascii=False) + "\n")
+
+    def classify(self, title: str) -> Tuple[Optional[str], float]:
+        """
+        最も似ている過去のタイトルのカテゴリを返す
+
+        Args:
+            title (str): 商品タイトル
+
+        Returns:
+            Tuple[Optional[str], float]: (カテゴリID, 確信度 0〜1。トークンのJaccard係数)
+        """
+        tokens = set(tokenize(title))
+        with self._lock:
+            exact = self._titles.get(" ".join(tokenize(title)))
+            if exact:
+                return exact, 1.0
+            positions = set()
+            for token in tokens:
+                positions.update(self._postings.get(token, ()))
+            best_id, best_score = None, 0.0
+            for position in positions:
+                entry_tokens, category_id = self._tokens[position]
+                score = len(tokens & entry_tokens) / len(tokens | entry_tokens)
+                if score > best_score:
+                    best_id, best_score = category_id, score
+        return best_id, best_score
+
+class CategoryClassifier:
+    """
+    カテゴリツリーの索引と出品履歴を組み合わせたオフラインのカテゴリ分類器
+    """
+
+    def __init__(self, env_type: str):
+        """
+        初期化（索引がまだ作成されていない場合は出品履歴だけを使う）
+
+        Args:
+            env_type (str): 環境タイプ
+        """
+        tree = load_state(category_tree_state_name(env_type))
+        self.index = CategoryTreeIndex(tree["categories"]) if tree else None
+        self.ledger = CategoryLedger(os.path.join(STATE_DIR, f"category_ledger_{env_type}.jsonl"))
+
+    def classify(self, title: str) -> Tuple[Optional[str], float]:
+        """
+        タイトルからカテゴリを推定する
+
+        Args:
+            title (str): 商品タイトル
+
+        Returns:
+            Tuple[Optional[str], float]: (カテゴリID, 確信度 0〜1)。推定できない場合は (None, 0.0)
+        """
+        category_id, confidence = self.ledger.classify(title)
+        if self.index is not None:
+            tree_id, tree_confidence = self.index.classify(title)
+            if tree_confidence > confidence:
+                category_id, confidence = tree_id, tree_confidence
+        return category_id, confidence
+
+    def record(self, title: str, category_id: str) -> None:
+        """
+        出品に成功したタイトルとカテゴリを履歴に記録する
+
+        Args:
+            title (str): 商品タイトル
+            category_id (str): 出品したカテゴリID
+        """
+        self.ledger.record(title, str(category_id))
+
+def category_tree_state_name(env_type: str) -> str:
+    """
+    カテゴリツリーの状態の名前を返す
+
+    Args:
+        env_type (str): 環境タイプ
+
+    Returns:
+        str: 状態の名前
+    """
+    return f"category_tree_{env_type}"
+
+def save_category_tree(env_type: str, tree: Dict[str, Any]) -> int:
+    """
+    GetCategoriesの結果をコンパクトな形で保存する
+
+    Args:
+        env_type (str): 環境タイプ
+        tree (Dict[str, Any]): get_categories の結果
+
+    Returns:
+        int: 保存したカテゴリの数
+    """
+    categories = [[c["category_id"], c["name"], c["parent_id"], 1 if c["leaf"] else 0] for c in tree["categories"]]
+    save_state(category_tree_state_name(env_type), {
+        "version": tree.get("version"),
+        "built_at": time.time(),
+        "categories": categories
+    })
+    with _classifiers_lock:
+        _classifiers.pop(env_type, None)
+    return len(categories)
+
+_classifiers: Dict[str, CategoryClassifier] = {}
+_classifiers_lock = threading.Lock()
+
+def get_category_classifier(env_type: str) -> CategoryClassifier:
+    """
+    環境ごとの分類器を取得する（初回の呼び出しで索引を読み込み、プロセス内で共有する）
+
+    Args:
+        env_type (str): 環境タイプ
+
+    Returns:
+        CategoryClassifier: 分類器
+    """
+    with _classifiers_lock:
+        if env_type not in _classifiers:
+            _classifiers[env_type] = CategoryClassifier(env_type)
+        return _classifiers[env_type]
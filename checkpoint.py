@@ -0,0 +1,186 @@
+import os
+import json
+import time
+import logging
+from typing import Optional, List, Dict, Any, Tuple
+
+from config import STATE_DIR
+
+logger = logging.getLogger("ebay_listing.checkpoint")
+
+class CheckpointJournal:
+    """
+    出品処理の進捗を記録するチェックポイントジャーナル
+    1商品の処理が終わるたびに1行のJSONを追記し、fsyncで確実にディスクへ書き込む
+    """
+
+    def __init__(self, path: str):
+        """
+        初期化
+
+        Args:
+            path (str): ジャーナルファイルのパス
+        """
+        self.path = path
+        self.entries: Dict[int, Dict[str, Any]] = {}
+        self._file = None
+
+    def start(self, run_info: Dict[str, Any], resume: bool = False) -> None:
+        """
+        ジャーナルを開く
+
+        Args:
+            run_info (Dict[str, Any]): 実行条件（スプレッドシートID、環境など）
+            resume (bool): Trueの場合は既存のジャーナルを読み込んで追記する。
+                           Falseの場合は新しいジャーナルを作成する。
+        """
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        if resume and self._load(run_info):
+            self._file = open(self.path, 'a', encoding='utf-8')
+            logger.info(f"チェックポイントから再開します: 完了済み {len(self.completed_rows())} 件 ({self.path})")
+            return
+
+        self.entries = {}
+        self._file = open(self.path, 'w', encoding='utf-8')
+        self._write({"type": "run", "started_at": time.time(), **run_info})
+
+    def _load(self, run_info: Dict[str, Any]) -> bool:
+        """
+        既存のジャーナルを読み込む
+
+        Args:
+            run_info (Dict[str, Any]): 現在の実行条件
+
+        Returns:
+            bool: 実行条件が一致するジャーナルを読み込めた場合はTrue
+        """
+        if not os.path.exists(self.path):
+            logger.info("チェックポイントが見つからないため、最初から処理します")
+            return False
+
+        header = None
+        entries = {}
+        with open(self.path, 'r', encoding='utf-8') as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError:
+                    # 書き込み途中で停止した最終行は無視する
+                    logger.warning("チェックポイントの不完全な行を無視します")
+                    continue
+
+                if record.get("type") == "run":
+                    header = record
+                elif record.get("type") == "item":
+                    entries[record["row_index"]] = record
+
+        if header is None or any(header.get(key) != value for key, value in run_info.items()):
+            logger.warning("チェックポイントの実行条件が現在の条件と異なるため、最初から処理します")
+            return False
+
+        self.entries = entries
+        return True
+
+    def _write(self, record: Dict[str, Any]) -> None:
+        """
+        1レコードを追記してディスクに同期する
+
+        Args:
+            record (Dict[str, Any]): 書き込むレコード
+        """
+        self._file.write(json.dumps(record, ensure_ascii=False) + "\n")
+        self._file.flush()
+        os.fsync(self._file.fileno())
+
+    def record(self, row_index: int, result: Dict[str, Any], image_ref: str = "") -> None:
+        """
+        1商品の処理結果を記録する
+
+        Args:
+            row_index (int): スプレッドシートの行番号（0から始まる）
+            result (Dict[str, Any]): process_item_detailed の戻り値
+            image_ref (str): 処理時の image 列の値（アップロード済み画像の再利用判定に使う）
+        """
+        entry = {
+            "type": "item",
+            "row_index": row_index,
+            "outcome": "success" if result.get("success") else "failure",
+            "item_id": result.get("item_id"),
+            "picture_urls": result.get("picture_urls", []),
+            "image_ref": image_ref,
+            "error": result.get("error"),
+            "finished_at": time.time()
+        }
+        self.entries[row_index] = entry
+        self._write(entry)
+
+    def completed_rows(self) -> List[int]:
+        """
+        出品に成功した行番号を取得する
+
+        Returns:
+            List[int]: 出品済みの行番号
+        """
+        return sorted(row for row, entry in self.entries.items() if entry.get("outcome") == "success")
+
+    def is_completed(self, row_index: int) -> bool:
+        """
+        指定した行が出品済みかどうかを確認する
+
+        Args:
+            row_index (int): 行番号
+
+        Returns:
+            bool: 出品済みの場合はTrue
+        """
+        entry = self.entries.get(row_index)
+        return bool(entry and entry.get("outcome") == "success")
+
+    def reusable_picture_urls(self, row_index: int, image_ref: str) -> Optional[List[str]]:
+        """
+        前回の実行でアップロード済みの画像URLを取得する
+        image 列の値が前回と同じ場合のみ再利用する
+
+        Args:
+            row_index (int): 行番号
+            image_ref (str): 現在の image 列の値
+
+        Returns:
+            Optional[List[str]]: 再利用できる画像URL。ない場合はNone。
+        """
+        entry = self.entries.get(row_index)
+        if not entry or not entry.get("picture_urls") or entry.get("image_ref") != image_ref:
+            return None
+        return entry["picture_urls"]
+
+    def close(self) -> None:
+        """
+        ジャーナルを閉じる
+        """
+        if self._file:
+            self._file.close()
+            self._file = None
+
+def checkpoint_path(env_type: str,
+                    shard: Optional[Tuple[int, int]] = None,
+                    account: Optional[str] = None,
+                    name: str = "checkpoint") -> str:
+    """
+    環境（とアカウント、シャード）ごとのチェックポイントファイルのパスを取得する
+
+    Args:
+        env_type (str): 環境タイプ
+        shard (Tuple[int, int], optional): (シャード番号, シャード数)
+        account (str, optional): アカウント名
+        name (str): ファイル名の先頭（監視モードは通常の実行のチェックポイントを上書きしないように別の名前を使う）
+
+    Returns:
+        str: チェックポイントファイルのパス
+    """
+    suffix = f"_{account}" if account else ""
+    if shard:
+        suffix += f"_shard{shard[0]}of{shard[1]}"
+    return os.path.join(STATE_DIR, f"{name}_{env_type}{suffix}.jsonl")
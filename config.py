@@ -14,6 +14,91 @@ SPREADSHEET_ID = os.getenv("GOOGLE_SHEET_ID", "15hBsS4XTVit5Su_a0BnIzgdfvQF0aNaC
 SHEET_NAME = os.getenv("GOOGLE_SHEET_NAME", "sales-tast-page")
 CELL_RANGE = "A2"
 GOOGLE_CREDENTIALS_FILE = os.getenv("GOOGLE_SHEETS_CREDENTIALS_PATH", "auto-sales-input-2b5d0118f65a.json")
+# サービスアカウントのアクセストークンを実行状態の保存先に保存し、プロセス・実行の間で共有するかどうか
+GOOGLE_TOKEN_CACHE = os.getenv("GOOGLE_TOKEN_CACHE", "true").lower() in ("1", "true", "yes")
+
+# 出品結果の書き戻し（--write-back）の設定
+# この行数の結果が溜まるか、前回の書き込みからこの秒数が経過したらまとめて書き込む
+SHEETS_WRITE_BATCH_ROWS = int(os.getenv("SHEETS_WRITE_BATCH_ROWS", "50"))
+SHEETS_WRITE_FLUSH_SECONDS = float(os.getenv("SHEETS_WRITE_FLUSH_SECONDS", "30"))
+
+# スプレッドシートの全行（または --rows の範囲）を読み込むときに1回のAPI呼び出しで読み込む行数
+# 次のページは前のページの行を処理してから読み込む（0の場合は一度にすべて読み込む）
+SHEETS_READ_PAGE_ROWS = int(os.getenv("SHEETS_READ_PAGE_ROWS", "500"))
+
+# --skip-unchanged でDrive APIの更新日時が使えない場合に、変更の判定に使う範囲
+# 空の場合は読み込みと同じくシート全体を使う（一部の列だけでは価格・数量・画像などの変更を見逃す）
+SHEETS_FINGERPRINT_RANGE = os.getenv("SHEETS_FINGERPRINT_RANGE", "")
+
+# HTTPの送信（eBay API、Google API、画像の転送）に共有するトランスポートの設定
+# HTTP_TRANSPORT: requests（デフォルト）または httpx（httpx[http2] が必要。サーバーが対応していればHTTP/2で多重化する）
+HTTP_TRANSPORT = os.getenv("HTTP_TRANSPORT", "requests")
+# Keep-Aliveで保持するホストごと（httpx の場合は全体）の接続の数と、同時に使う接続の最大数
+HTTP_POOL_CONNECTIONS = int(os.getenv("HTTP_POOL_CONNECTIONS", "10"))
+HTTP_POOL_MAXSIZE = int(os.getenv("HTTP_POOL_MAXSIZE", "32"))
+# 接続に失敗した場合の再試行回数と、接続・読み込みのタイムアウト（秒）
+HTTP_MAX_RETRIES = int(os.getenv("HTTP_MAX_RETRIES", "3"))
+HTTP_CONNECT_TIMEOUT = float(os.getenv("HTTP_CONNECT_TIMEOUT", "10"))
+HTTP_READ_TIMEOUT = float(os.getenv("HTTP_READ_TIMEOUT", "30"))
+
+# Trading APIのレスポンスをgzipで圧縮して受け取るかどうか
+EBAY_ACCEPT_GZIP = os.getenv("EBAY_ACCEPT_GZIP", "true").lower() in ("1", "true", "yes")
+# Trading APIのリクエストの本文（1KiB以上）をgzipで圧縮して送るかどうか（eBayが受け付けることを確認してから有効にする）
+EBAY_GZIP_REQUESTS = os.getenv("EBAY_GZIP_REQUESTS", "false").lower() in ("1", "true", "yes")
+
+# Trading APIの1秒あたりの最大呼び出し回数（0の場合は制限なし）
+# シャーディング時は各シャードにこの値をシャード数で割った分が割り当てられる
+EBAY_CALLS_PER_SECOND = float(os.getenv("EBAY_CALLS_PER_SECOND", "0"))
+
+# 実行の開始時に GetTokenStatus で確認した認証トークンの状態を再利用する時間（秒、0の場合は毎回確認する）
+EBAY_TOKEN_CHECK_TTL_SECONDS = float(os.getenv("EBAY_TOKEN_CHECK_TTL_SECONDS", "3600"))
+
+# --fan-out で出品する出品先（"環境[:アカウント]" のカンマ区切り）
+# アカウントを指定した場合は EBAY_<ENV>_<ACCOUNT>_APP_ID などの認証情報を使用する
+EBAY_FANOUT_TARGETS = os.getenv("EBAY_FANOUT_TARGETS", "")
+
+# --watch でスプレッドシートを確認する間隔（秒）
+WATCH_INTERVAL_SECONDS = float(os.getenv("WATCH_INTERVAL_SECONDS", "60"))
+# --watch で出品に失敗した行を、シートが変更されなくても再試行するまでの時間（秒）
+WATCH_RETRY_SECONDS = float(os.getenv("WATCH_RETRY_SECONDS", "600"))
+
+# カテゴリごとのItem Specificsの定義（GetCategorySpecifics）のキャッシュの有効期限（秒）
+CATEGORY_ASPECTS_TTL_SECONDS = float(os.getenv("CATEGORY_ASPECTS_TTL_SECONDS", str(7 * 24 * 60 * 60)))
+
+# オフラインのカテゴリ分類の確信度（0〜1）がこの値未満の場合は GetSuggestedCategories を呼び出す
+CATEGORY_CLASSIFIER_MIN_CONFIDENCE = float(os.getenv("CATEGORY_CLASSIFIER_MIN_CONFIDENCE", "0.6"))
+
+# 画像URLのホストごとの扱い（"ホスト=モード" のカンマ区切り。"*.example.com" でサブドメインにも一致）
+# direct: URLをそのまま出品に使う / external: eBayにURLから取得させる / download: ダウンロードしてアップロードする
+PICTURE_URL_POLICY = os.getenv("PICTURE_URL_POLICY", "")
+# どのホストにも一致しないHTTPSの画像URLの扱い
+PICTURE_URL_DEFAULT_MODE = os.getenv("PICTURE_URL_DEFAULT_MODE", "download")
+
+# 1商品の画像を並行してダウンロード・アップロードする最大数と、画像の転送に使うスレッドの総数
+IMAGE_CONCURRENCY_PER_ITEM = int(os.getenv("IMAGE_CONCURRENCY_PER_ITEM", "4"))
+IMAGE_WORKERS = int(os.getenv("IMAGE_WORKERS", "16"))
+
+# ダウンロードした画像のキャッシュの保存先と、合計サイズの上限（バイト、0の場合は上限なし）
+IMAGE_CACHE_DIR = os.getenv("IMAGE_CACHE_DIR", "images")
+IMAGE_CACHE_MAX_BYTES = int(os.getenv("IMAGE_CACHE_MAX_BYTES", str(1024 * 1024 * 1024)))
+# キャッシュにない画像をディスクに保存せず、ダウンロードしながらeBayにアップロードするかどうか
+IMAGE_STREAM_UPLOAD = os.getenv("IMAGE_STREAM_UPLOAD", "false").lower() in ("1", "true", "yes")
+
+# 大量の行を処理するときのメモリ・ディスクの使用量の上限（バイト、0の場合は上限なし）
+# アップロードのためにメモリに読み込む画像の合計サイズ（プロセスごと）
+IMAGE_MEMORY_MAX_BYTES = int(os.getenv("IMAGE_MEMORY_MAX_BYTES", str(64 * 1024 * 1024)))
+# --fan-out でダウンロード済みで、まだすべての出品先へのアップロードが終わっていない画像の合計サイズ
+IMAGE_PENDING_MAX_BYTES = int(os.getenv("IMAGE_PENDING_MAX_BYTES", str(256 * 1024 * 1024)))
+# --fan-out で前処理済みで、まだすべての出品先での処理が終わっていない行の最大数
+MAX_ITEMS_IN_FLIGHT = int(os.getenv("MAX_ITEMS_IN_FLIGHT", "8"))
+
+# SellerProfile列が空の行に使う出品プロファイルの名前（空の場合は返品・配送の条件を出品ごとに指定する）
+# プロファイルは EBAY_SELLER_PROFILES（出品先ごとには EBAY_<ENV>[_<ACCOUNT>]_SELLER_PROFILES）で
+# "名前=支払いポリシーID:返品ポリシーID:配送ポリシーID" のカンマ区切りで設定する
+EBAY_SELLER_PROFILE_DEFAULT = os.getenv("EBAY_SELLER_PROFILE_DEFAULT", "")
+
+# 実行状態（チェックポイントなど）の保存先ディレクトリ
+STATE_DIR = os.getenv("EBAY_LISTING_STATE_DIR", ".ebay_listing_state")
 
 def get_env_var(var_name, env_type=None):
     """
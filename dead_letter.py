@@ -0,0 +1,271 @@
+import os
+import re
+import json
+import time
+import logging
+import tempfile
+import threading
+from typing import Optional, List, Dict, Any, Iterable
+
+from config import STATE_DIR
+from file_lock import FileLock
+
+logger = logging.getLogger("ebay_listing.dead_letter")
+
+# process_item_detailed のエラーメッセージの先頭とエラーの分類
+ERROR_CLASSES = [
+    ("eBay APIエラー", "api"),
+    ("eBay API接続エラー", "connection"),
+    ("API認証情報", "credentials"),
+    ("設定エラー", "validation"),
+    ("Item Specificsエラー", "validation"),
+    ("商品タイトルがありません", "validation"),
+]
+
+# エラーの分類の一覧（いずれの先頭にも一致しない場合は "unexpected"）
+ERROR_CLASS_NAMES = ("api", "connection", "credentials", "validation", "unexpected")
+
+_ERROR_CODES = re.compile(r"コード=(.*?), メッセージ=")
+
+def classify_error(message: Optional[str]) -> str:
+    """
+    エラーメッセージからエラーの分類を決める
+
+    Args:
+        message (str, optional): process_item_detailed のエラーメッセージ
+
+    Returns:
+        str: "api"、"connection"、"credentials"、"validation"、"unexpected" のいずれか
+    """
+    for prefix, error_class in ERROR_CLASSES:
+        if (message or "").startswith(prefix):
+            return error_class
+    return "unexpected"
+
+def extract_error_codes(message: Optional[str]) -> List[str]:
+    """
+    エラーメッセージに含まれるeBay APIのエラーコードを取り出す
+
+    Args:
+        message (str, optional): エラーメッセージ（"eBay APIエラー: コード=240, 21916, メッセージ=..."）
+
+    Returns:
+        List[str]: エラーコード
+    """
+    codes = []
+    for match in _ERROR_CODES.finditer(message or ""):
+        codes.extend(code.strip() for code in match.group(1).split(',') if code.strip())
+    return codes
+
+class DeadLetterQueue:
+    """
+    リトライ上限に達して出品できなかった商品の記録（デッドレターキュー）
+    失敗した行のデータ・最後のエラー・試行回数をJSON Linesで追記し、後で成功した行は解決済みとして記録する
+    追記はファイルロックで排他するため、複数のワーカープロセスから同時に使える
+    """
+
+    def __init__(self, path: str):
+        """
+        初期化
+
+        Args:
+            path (str): 記録ファイル（JSON Lines）のパス
+        """
+        self.path = path
+        self._file_lock = FileLock(path + ".lock")
+        self._lock = threading.Lock()
+        # このプロセスで把握している未解決の行（成功時に解決済みを記録するかどうかの判定に使う）
+        with self._file_lock:
+            self._pending_keys = set(self._read())
+
+    @staticmethod
+    def key(source: str, row_index: int) -> str:
+        """
+        行を識別するキーを作る
+
+        Args:
+            source (str): 入力元（入力ファイルのパス、またはスプレッドシートID|シート名）
+            row_index (int): 行番号
+
+        Returns:
+            str: キー
+        """
+        return f"{source}#{row_index}"
+
+    def _read(self) -> Dict[str, Dict[str, Any]]:
+        """
+        記録ファイルを読み込み、未解決の失敗をキーごとに返す（ファイルロックを取得してから呼び出すこと）
+
+        Raises:
+            ValueError: 最終行以外に読み込めない行がある場合
+        """
+        pending: Dict[str, Dict[str, Any]] = {}
+        if not os.path.exists(self.path):
+            return pending
+        # 書き込み途中で停止した最終行はマルチバイト文字の途中で切れている場合がある
+        with open(self.path, 'r', encoding='utf-8', errors='replace') as f:
+            for number, line in enumerate(f, 1):
+                if not line.endswith("\n"):
+                    # 書き込み途中で停止した最終行は無視する（次の追記の前に取り除く）
+                    logger.warning(f"デッドレターキューの不完全な最終行を無視します: {self.path}")
+                    break
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    raise ValueError(f"デッドレターキューの {number} 行目を読み込めません: {self.path}")
+                if record.get("type") == "failed":
+                    pending[record["key"]] = record
+                elif record.get("type") == "resolved":
+                    pending.pop(record["key"], None)
+        return pending
+
+    def _append(self, record: Dict[str, Any]) -> None:
+        with self._file_lock:
+            self._append_locked(record)
+
+    def _append_locked(self, record: Dict[str, Any]) -> None:
+        """
+        1レコードを追記してディスクに同期する（ファイルロックを取得してから呼び出すこと）
+        書き込み途中で停止した最終行があれば、追記するレコードと混ざらないように先に取り除く
+        """
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        with open(self.path, 'ab+') as f:
+            end = f.seek(0, os.SEEK_END)
+            f.seek(max(end - 1, 0))
+            if end and f.read(1) != b"\n":
+                # 最後の改行の直後まで切り詰める（改行がなければファイル全体が書き込み途中の行）
+                start = end
+                while start > 0:
+                    start = max(start - 65536, 0)
+                    f.seek(start)
+                    newline = f.read(end - start).rfind(b"\n")
+                    if newline >= 0:
+                        start += newline + 1
+                        break
+                f.truncate(start)
+            f.write((json.dumps(record, ensure_ascii=False) + "\n").encode('utf-8'))
+            f.flush()
+            os.fsync(f.fileno())
+
+    def record(self, source: str, row_index: int, item: Dict[str, str], result: Dict[str, Any]) -> None:
+        """
+        1商品の処理結果を記録する
+        失敗した場合は行のデータとエラーを追加し、以前に失敗した行が成功した場合は解決済みにする
+
+        Args:
+            source (str): 入力元
+            row_index (int): 行番号
+            item (Dict[str, str]): 行のデータ
+            result (Dict[str, Any]): process_item_detailed の戻り値
+        """
+        key = self.key(source, row_index)
+        if result.get("success"):
+            with self._lock:
+                if key not in self._pending_keys:
+                    return
+                self._pending_keys.discard(key)
+            self._append({"type": "resolved", "key": key, "item_id": result.get("item_id"),
+                          "resolved_at": time.time()})
+            return
+
+        error = result.get("error")
+        with self._lock:
+            self._pending_keys.add(key)
+        with self._file_lock:
+            # 試行回数は、解決されるまでの実行（再処理を含む）の合計を記録する
+            previous = self._read().get(key, {})
+            self._append_locked({
+                "type": "failed",
+                "key": key,
+                "source": source,
+                "row_index": row_index,
+                "item": item,
+                # 出品済みの商品の更新（ReviseItem）に失敗した場合は、再処理でも同じ出品を更新する
+                "item_id": result.get("item_id"),
+                "error": error,
+                "error_class": classify_error(error),
+                "error_codes": extract_error_codes(error),
+                "attempts": previous.get("attempts", 0) + result.get("attempts", 0),
+                "failed_at": time.time()
+            })
+
+    def pending(self,
+                error_codes: Optional[Iterable[str]] = None,
+                error_classes: Optional[Iterable[str]] = None) -> List[Dict[str, Any]]:
+        """
+        未解決の失敗を返す
+
+        Args:
+            error_codes (Iterable[str], optional): 指定した場合は、いずれかのエラーコードを含むものだけを返す
+            error_classes (Iterable[str], optional): 指定した場合は、いずれかの分類のものだけを返す
+
+        Returns:
+            List[Dict[str, Any]]: 失敗の記録（入力元・行番号の順）
+        """
+        with self._file_lock:
+            entries = list(self._read().values())
+        if error_codes is not None:
+            codes = set(error_codes)
+            entries = [entry for entry in entries if codes & set(entry.get("error_codes", []))]
+        if error_classes is not None:
+            classes = set(error_classes)
+            entries = [entry for entry in entries if entry.get("error_class") in classes]
+        return sorted(entries, key=lambda entry: (entry["source"], entry["row_index"]))
+
+    def compact(self) -> int:
+        """
+        解決済みの記録を取り除いて記録ファイルを書き直す
+
+        Returns:
+            int: 残った未解決の失敗の数
+        """
+        with self._file_lock:
+            pending = self._read()
+            if not os.path.exists(self.path):
+                return 0
+            fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(self.path) or ".", prefix=".dead_letters.",
+                                            suffix=".tmp")
+            try:
+                with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                    for record in pending.values():
+                        f.write(json.dumps(record, ensure_ascii=False) + "\n")
+                    f.flush()
+                    os.fsync(f.fileno())
+                os.replace(tmp_path, self.path)
+            except BaseException:
+                if os.path.exists(tmp_path):
+                    os.remove(tmp_path)
+                raise
+        with self._lock:
+            self._pending_keys = set(pending)
+        return len(pending)
+
+def dead_letter_path(label: str) -> str:
+    """
+    出品先ごとのデッドレターキューのパスを取得する
+
+    Args:
+        label (str): 出品先の表示名（"sandbox" や "production:shop2"）
+
+    Returns:
+        str: 記録ファイルのパス
+    """
+    return os.path.join(STATE_DIR, f"dead_letters_{label.replace(':', '_')}.jsonl")
+
+_queues: Dict[str, DeadLetterQueue] = {}
+_queues_lock = threading.Lock()
+
+def get_dead_letter_queue(label: str) -> DeadLetterQueue:
+    """
+    出品先ごとのデッドレターキューを取得する（プロセス内で共有する）
+
+    Args:
+        label (str): 出品先の表示名
+
+    Returns:
+        DeadLetterQueue: デッドレターキュー
+    """
+    with _queues_lock:
+        if label not in _queues:
+            _queues[label] = DeadLetterQueue(dead_letter_path(label))
+        return _queues[label]
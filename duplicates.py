@@ -0,0 +1,131 @@
+import re
+import hashlib
+import logging
+from typing import Optional, List, Dict, Tuple, Iterable
+
+logger = logging.getLogger("ebay_listing.duplicates")
+
+# --dedupe で指定できる扱い
+# off: 何もしない / report: 重複をログに出力する（すべての行を出品する） / collapse: 最初の行に数量を合計して1件だけ出品する
+DEDUPE_MODES = ("off", "report", "collapse")
+
+QUANTITY_COLUMN = "Quantity"
+
+def _normalize(value: str) -> str:
+    return " ".join(str(value).casefold().split())
+
+def _normalize_title(value: str) -> str:
+    # 記号・空白・大文字小文字の違いは同じ商品とみなす
+    return " ".join(re.findall(r"\w+", str(value).casefold()))
+
+def parse_quantity(value: Optional[str]) -> Optional[int]:
+    """
+    Quantity列の値を数量にする
+
+    Args:
+        value (str, optional): Quantity列の値
+
+    Returns:
+        Optional[int]: 1以上の数量。空または整数でない場合はNone
+    """
+    try:
+        quantity = int(float(str(value).strip()))
+    except (TypeError, ValueError):
+        return None
+    return quantity if quantity >= 1 else None
+
+def row_fingerprint(item: Dict[str, str], ignore: Iterable[str] = ()) -> str:
+    """
+    同じ商品の行を見つけるための指紋を計算する
+    タイトルは記号・空白・大文字小文字を無視し、画像は順序を無視し、その他の列は空白・大文字小文字を無視して比較する
+
+    Args:
+        item (Dict[str, str]): 商品データ
+        ignore (Iterable[str]): 比較に含めない列（数量、書き戻した出品結果の列など）
+
+    Returns:
+        str: 指紋
+    """
+    ignore = set(ignore)
+    parts = []
+    for key in sorted(item):
+        value = item[key]
+        if key in ignore or not value:
+            continue
+        if key == 'Item name':
+            value = _normalize_title(value)
+        elif key == 'image':
+            value = "\n".join(sorted(ref.strip() for ref in str(value).split(',') if ref.strip()))
+        else:
+            value = _normalize(value)
+        parts.append(f"{key.strip().casefold()}\t{value}")
+    return hashlib.sha1("\0".join(parts).encode('utf-8')).hexdigest()
+
+def find_duplicates(items: Iterable[Tuple[int, Dict[str, str]]],
+                    ignore: Iterable[str] = ()) -> Tuple[List[Tuple[int, Dict[str, str]]], Dict[int, List[int]]]:
+    """
+    1回の走査で重複した行を見つける
+
+    Args:
+        items (Iterable[Tuple[int, Dict[str, str]]]): (行番号, 商品データ) の並び
+        ignore (Iterable[str]): 比較に含めない列
+
+    Returns:
+        Tuple[List[Tuple[int, Dict[str, str]]], Dict[int, List[int]]]:
+            (すべての行, 最初の行番号ごとの重複した後続の行番号)
+    """
+    ignore = list(ignore)
+    rows = []
+    first_rows: Dict[str, int] = {}
+    groups: Dict[int, List[int]] = {}
+    for row_index, item in items:
+        rows.append((row_index, item))
+        fingerprint = row_fingerprint(item, ignore)
+        first = first_rows.setdefault(fingerprint, row_index)
+        if first != row_index:
+            groups.setdefault(first, []).append(row_index)
+    return rows, groups
+
+def dedupe_rows(items: Iterable[Tuple[int, Dict[str, str]]],
+                mode: str,
+                ignore: Iterable[str] = (),
+                default_quantity: int = 1) -> List[Tuple[int, Dict[str, str]]]:
+    """
+    出品の前に、シート内で重複した行を報告する、または1件にまとめる
+
+    Args:
+        items (Iterable[Tuple[int, Dict[str, str]]]): (行番号, 商品データ) の並び
+        mode (str): "report" または "collapse"
+        ignore (Iterable[str]): 比較に含めない列（Quantity列は常に含めない）
+        default_quantity (int): Quantity列が空の行の数量
+
+    Returns:
+        List[Tuple[int, Dict[str, str]]]: 処理する (行番号, 商品データ)。
+            collapse の場合は、重複した行を除き、最初の行のQuantity列を合計した数量にする
+    """
+    rows, groups = find_duplicates(items, list(ignore) + [QUANTITY_COLUMN])
+    if not groups:
+        return rows
+
+    duplicate_count = sum(len(duplicates) for duplicates in groups.values())
+    for first, duplicates in groups.items():
+        logger.warning(f"行 {first} と同じ商品の行があります: {', '.join(str(row) for row in duplicates)}")
+
+    if mode != "collapse":
+        logger.warning(f"{len(groups)} 件の商品が {duplicate_count} 行重複しています（すべての行を出品します）")
+        return rows
+
+    by_row = dict(rows)
+    merged = {row for duplicates in groups.values() for row in duplicates}
+    result = []
+    for row_index, item in rows:
+        if row_index in merged:
+            continue
+        if row_index in groups:
+            members = [row_index] + groups[row_index]
+            quantity = sum(parse_quantity(by_row[row].get(QUANTITY_COLUMN)) or default_quantity for row in members)
+            item = {**item, QUANTITY_COLUMN: str(quantity)}
+            logger.info(f"行 {', '.join(str(row) for row in members)} を行 {row_index} にまとめて出品します（数量: {quantity}）")
+        result.append((row_index, item))
+    logger.warning(f"{len(groups)} 件の商品の重複した {duplicate_count} 行をまとめました")
+    return result
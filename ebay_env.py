@@ -1,32 +1,254 @@
 import os
+import time
+import uuid
 import logging
-from typing import Dict, Any, Optional
+import threading
+import xml.parsers.expat
+from typing import Dict, Any, Optional, Iterable, Iterator, List
+
+import requests
+from ebaysdk.trading import Connection as Trading
+
+from config import EBAY_CALLS_PER_SECOND, EBAY_ACCEPT_GZIP, EBAY_GZIP_REQUESTS
+from transport import mount, default_timeout
+from traffic import TrafficStats, compress_body, wire_bytes
 
 logger = logging.getLogger("ebay_listing.ebay_env")
 
+class _PersistentSession(requests.Session):
+    """
+    ebaysdkが呼び出しのたびに行う close() を無視するセッション
+    接続プールを維持し、同じホストへのKeep-Alive接続を再利用する
+    """
+
+    def close(self) -> None:
+        pass
+
+    def shutdown(self) -> None:
+        super().close()
+
+class _FieldsFound(Exception):
+    """必要な要素がすべて見つかったため、XMLの解析を打ち切る"""
+
+def extract_response_fields(content: bytes, paths: Iterable[str]) -> Dict[str, Optional[str]]:
+    """
+    Trading APIのレスポンスXMLから、指定した要素のテキストだけを取り出す
+    要素のオブジェクトや辞書を作らずにexpatで読み進め、すべての要素が見つかった時点で解析をやめる
+    （AddItemの手数料一覧のような、使わない後半の要素は読まない）
+    
+    Args:
+        content (bytes): レスポンスのXML
+        paths (Iterable[str]): ルート要素からのパス（例: "ItemID", "SiteHostedPictureDetails/FullURL"）。
+                               同じパスの要素が複数ある場合は最初のものを使う。"Ack" は常に取り出す
+        
+    Returns:
+        Dict[str, Optional[str]]: パスごとのテキスト（要素がない場合はNone）
+        
+    Raises:
+        xml.parsers.expat.ExpatError: XMLとして解析できない場合
+    """
+    wanted = set(paths) | {"Ack"}
+    found: Dict[str, Optional[str]] = dict.fromkeys(wanted)
+    remaining = set(wanted)
+    stack: List[str] = []
+    text: List[str] = []
+    
+    def start(name, attributes):
+        stack.append(name.rpartition('}')[2])
+        text.clear()
+    
+    def end(name):
+        path = '/'.join(stack[1:])
+        stack.pop()
+        if path in remaining:
+            found[path] = ''.join(text).strip()
+            remaining.discard(path)
+            if not remaining:
+                raise _FieldsFound()
+        text.clear()
+    
+    def characters(data):
+        text.append(data)
+    
+    parser = xml.parsers.expat.ParserCreate(namespace_separator='}')
+    parser.StartElementHandler = start
+    parser.EndElementHandler = end
+    parser.CharacterDataHandler = characters
+    parser.buffer_text = True
+    try:
+        parser.Parse(content, True)
+    except _FieldsFound:
+        pass
+    return found
+
+class _TradingConnection(Trading):
+    """
+    レスポンスを必要な要素だけ読み取れるTrading API接続
+    fields が設定された呼び出しでは、成功したレスポンス（Ack=Success）を辞書やDOMに変換しない
+    エラーや警告を含むレスポンスは、従来どおり全体を変換してエラー処理に使う
+    呼び出しごとに送受信した本文のバイト数を traffic に記録する
+    """
+    
+    fields: Optional[List[str]] = None
+    extracted: Optional[Dict[str, Optional[str]]] = None
+    traffic: Optional[TrafficStats] = None
+    _light = False
+    
+    def build_request(self, verb, data, verb_attrs, files=None):
+        super().build_request(verb, data, verb_attrs, files)
+        # ebaysdk はセッションの既定のヘッダーを使わないため、指定しないと圧縮されていないレスポンスが返る
+        self.request.headers["Accept-Encoding"] = "gzip" if EBAY_ACCEPT_GZIP else "identity"
+        if EBAY_GZIP_REQUESTS and not files and isinstance(self.request.body, bytes):
+            compressed = compress_body(self.request.body)
+            if compressed is not None:
+                self.request.body = compressed
+                self.request.headers["Content-Encoding"] = "gzip"
+                self.request.headers["Content-Length"] = str(len(compressed))
+    
+    def execute_request(self):
+        super().execute_request()
+        if self.traffic is not None and self.response is not None:
+            body = self.request.body
+            self.traffic.record(self.verb, len(body) if isinstance(body, (bytes, str)) else 0,
+                                wire_bytes(self.response), len(self.response.content or b""))
+    
+    def process_response(self, parse_response=True):
+        self._light = False
+        if self.fields is None:
+            return super().process_response(parse_response)
+        
+        self.extracted = {}
+        try:
+            self.extracted = extract_response_fields(self.response.content, self.fields)
+        except xml.parsers.expat.ExpatError as e:
+            logger.debug(f"レスポンスの読み取りに失敗したため、全体を解析します: {str(e)}")
+        self._light = self.response.status_code == 200 and self.extracted.get("Ack") == "Success"
+        return super().process_response(parse_response=not self._light)
+    
+    def _get_resp_body_errors(self):
+        if self._light:
+            return []
+        return super()._get_resp_body_errors()
+
+class StreamingBody:
+    """
+    長さがわかっているストリームをリクエストの本文にするためのクラス
+    __len__ があるため requests はチャンク形式にせず Content-Length を付けて送信し、
+    本文は送信しながら少しずつ読み込まれる
+    """
+
+    def __init__(self, head: bytes, chunks: Iterable[bytes], size: int, tail: bytes):
+        """
+        初期化
+
+        Args:
+            head (bytes): ストリームの前に送るデータ
+            chunks (Iterable[bytes]): ストリーム
+            size (int): ストリームのバイト数
+            tail (bytes): ストリームの後に送るデータ
+        """
+        self.head = head
+        self.chunks = chunks
+        self.size = size
+        self.tail = tail
+
+    def __len__(self) -> int:
+        return len(self.head) + self.size + len(self.tail)
+
+    def __iter__(self) -> Iterator[bytes]:
+        yield self.head
+        sent = 0
+        for chunk in self.chunks:
+            if chunk:
+                sent += len(chunk)
+                yield chunk
+        if sent != self.size:
+            raise IOError(f"ストリームのサイズが一致しません（想定: {self.size}バイト, 実際: {sent}バイト）")
+        yield self.tail
+
+class RateLimiter:
+    """
+    1秒あたりの呼び出し回数を制限するクラス
+    """
+
+    def __init__(self, calls_per_second: float = 0):
+        """
+        初期化
+
+        Args:
+            calls_per_second (float): 1秒あたりの最大呼び出し回数。0以下の場合は制限しない
+        """
+        self.calls_per_second = calls_per_second
+        self.interval = 1.0 / calls_per_second if calls_per_second > 0 else 0.0
+        self._next_slot = 0.0
+        self._lock = threading.Lock()
+
+    def acquire(self) -> None:
+        """
+        次の呼び出しが許可されるまで待機する
+        """
+        if not self.interval:
+            return
+
+        with self._lock:
+            now = time.monotonic()
+            wait = self._next_slot - now
+            self._next_slot = max(now, self._next_slot) + self.interval
+
+        if wait > 0:
+            time.sleep(wait)
+
 class EbayEnvironment:
     """
     eBay環境設定を管理するクラス
     サンドボックスと本番環境の切り替えを容易にする
     """
     
-    def __init__(self, env_type: str = "sandbox"):
+    def __init__(self, env_type: str = "sandbox", calls_per_second: Optional[float] = None,
+                 account: Optional[str] = None):
         """
         初期化
         
         Args:
             env_type (str): 環境タイプ。"sandbox"または"production"
+            calls_per_second (float, optional): Trading APIの1秒あたりの最大呼び出し回数。
+                                                Noneの場合は EBAY_<ENV>[_<ACCOUNT>]_CALLS_PER_SECOND、
+                                                それもなければconfigのEBAY_CALLS_PER_SECONDを使用
+            account (str, optional): アカウント名。指定した場合は EBAY_<ENV>_<ACCOUNT>_* の認証情報を使用
         """
         self.env_type = env_type.lower()
         if self.env_type not in ["sandbox", "production"]:
             logger.warning(f"不明な環境タイプ: {env_type}。サンドボックス環境を使用します。")
             self.env_type = "sandbox"
-            
+        
+        self.account = account
         self.prefix = f"EBAY_{self.env_type.upper()}_"
+        if account:
+            self.prefix += f"{account.upper()}_"
         self.credentials = self._load_credentials()
         self.domain = "api.sandbox.ebay.com" if self.env_type == "sandbox" else "api.ebay.com"
         
-        logger.info(f"eBay {self.env_type.upper()} 環境を使用します。ドメイン: {self.domain}")
+        if calls_per_second is None:
+            calls_per_second = float(os.environ.get(f"{self.prefix}CALLS_PER_SECOND") or EBAY_CALLS_PER_SECOND)
+        self.rate_limiter = RateLimiter(calls_per_second)
+        self._local = threading.local()
+        # Trading APIの呼び出し回数（実行時間・呼び出し回数の上限の判定に使う）
+        self.call_count = 0
+        self._count_lock = threading.Lock()
+        # API名ごとの呼び出し回数と送受信したバイト数（実行結果のサマリーに出力する）
+        self.traffic = TrafficStats()
+        
+        logger.info(f"eBay {self.label.upper()} 環境を使用します。ドメイン: {self.domain}")
+    
+    @property
+    def label(self) -> str:
+        """
+        環境の表示名（"sandbox" や "production:shop2"）
+        
+        Returns:
+            str: 環境タイプとアカウント名
+        """
+        return f"{self.env_type}:{self.account}" if self.account else self.env_type
     
     def _load_credentials(self) -> Dict[str, str]:
         """
@@ -63,9 +285,129 @@ class EbayEnvironment:
             "devid": self.credentials["devid"],
             "certid": self.credentials["certid"],
             "token": self.credentials["token"],
+            "timeout": default_timeout(),
             "config_file": None
         }
     
+    def get_connection(self) -> _TradingConnection:
+        """
+        Trading API接続を取得する
+        接続はスレッドごとに1つ作成して再利用し、Keep-Alive接続をプールする
+        
+        Returns:
+            _TradingConnection: Trading API接続
+        """
+        connection = getattr(self._local, "connection", None)
+        if connection is None:
+            connection = _TradingConnection(**self.get_api_config())
+            connection.session.close()
+            connection.session = _PersistentSession()
+            # 接続プールは全スレッド・画像の転送・Google APIと共有する
+            mount(connection.session)
+            connection.traffic = self.traffic
+            self._local.connection = connection
+        return connection
+    
+    def _begin_call(self) -> None:
+        """
+        呼び出し回数の制限に従って待ち、呼び出し回数を数える
+        """
+        self.rate_limiter.acquire()
+        with self._count_lock:
+            self.call_count += 1
+    
+    def execute(self, verb: str, data: Optional[Dict[str, Any]] = None, **kwargs):
+        """
+        呼び出し回数の制限に従ってTrading APIを呼び出す
+        
+        Args:
+            verb (str): API名（"AddItem" など）
+            data (Dict[str, Any], optional): リクエストデータ
+            **kwargs: Trading.execute に渡す追加の引数
+            
+        Returns:
+            ebaysdk.response.Response: APIレスポンス
+        """
+        self._begin_call()
+        return self.get_connection().execute(verb, data, **kwargs)
+    
+    def execute_fields(self, verb: str, data: Optional[Dict[str, Any]], fields: List[str]) -> Dict[str, Optional[str]]:
+        """
+        Trading APIを呼び出し、レスポンスから指定した要素のテキストだけを返す
+        成功したレスポンスは全体を辞書に変換しないため、execute(...).dict() より速く、メモリの割り当ても少ない
+        
+        Args:
+            verb (str): API名（"AddItem" など）
+            data (Dict[str, Any], optional): リクエストデータ
+            fields (List[str]): 取り出す要素のパス（extract_response_fields を参照）
+            
+        Returns:
+            Dict[str, Optional[str]]: パスごとのテキスト（"Ack" を含む）
+            
+        Raises:
+            ConnectionError: APIがエラーを返した場合（e.response は従来どおり全体を解析済み）
+        """
+        self._begin_call()
+        connection = self.get_connection()
+        connection.fields = fields
+        try:
+            connection.execute(verb, data)
+            return connection.extracted
+        finally:
+            connection.fields = None
+    
+    def execute_streaming(self,
+                          verb: str,
+                          data: Dict[str, Any],
+                          filename: str,
+                          chunks: Iterable[bytes],
+                          size: int,
+                          content_type: str = "application/octet-stream") -> requests.Response:
+        """
+        XMLのリクエストと添付ファイルをmultipart形式で送信する
+        添付ファイルはメモリやディスクに溜めずに、ストリームから読みながら送信する
+        
+        Args:
+            verb (str): API名（"UploadSiteHostedPictures" など）
+            data (Dict[str, Any]): リクエストデータ
+            filename (str): 添付ファイルの名前
+            chunks (Iterable[bytes]): 添付ファイルのデータ
+            size (int): 添付ファイルのバイト数
+            content_type (str): 添付ファイルのContent-Type
+            
+        Returns:
+            requests.Response: HTTPレスポンス（本文はXML）
+        """
+        self._begin_call()
+        connection = self.get_connection()
+        connection.verb = verb
+        
+        boundary = uuid.uuid4().hex
+        headers = connection.build_request_headers(verb)
+        headers["Content-Type"] = f"multipart/form-data; boundary={boundary}"
+        headers["Accept-Encoding"] = "gzip" if EBAY_ACCEPT_GZIP else "identity"
+        head = (
+            f'--{boundary}\r\n'
+            'Content-Disposition: form-data; name="XML Payload"\r\n'
+            'Content-Type: text/xml;charset=utf-8\r\n\r\n'
+        ).encode('utf-8') + connection.build_request_data(verb, data, None).encode('utf-8') + (
+            f'\r\n--{boundary}\r\n'
+            f'Content-Disposition: form-data; name="image"; filename="{filename}"\r\n'
+            f'Content-Type: {content_type}\r\n'
+            'Content-Transfer-Encoding: binary\r\n\r\n'
+        ).encode('utf-8')
+        tail = f'\r\n--{boundary}--\r\n'.encode('utf-8')
+        body = StreamingBody(head, chunks, size, tail)
+        
+        response = connection.session.post(
+            connection.build_request_url(verb),
+            data=body,
+            headers=headers,
+            timeout=connection.timeout
+        )
+        self.traffic.record(verb, len(body), wire_bytes(response), len(response.content or b""))
+        return response
+    
     def is_sandbox(self) -> bool:
         """
         サンドボックス環境かどうかを確認
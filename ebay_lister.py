@@ -5,10 +5,12 @@ import time
 import logging
 import json
 import sys
+import xml.etree.ElementTree as ET
+from xml.parsers.expat import ExpatError
 # typing に Optional を追加
 from typing import Tuple, Dict, Any, Union, List, Optional
+import requests
 from ebaysdk.exception import ConnectionError
-from ebaysdk.trading import Connection as Trading
 
 from config import (
     EBAY_APP_ID, 
@@ -18,18 +20,32 @@ from config import (
     EBAY_LISTING_DEFAULTS,
     get_env_var
 )
-from ebay_env import EbayEnvironment
+from ebay_env import EbayEnvironment, extract_response_fields
+from backpressure import get_image_memory_budget
+from transport import get_session, default_timeout
 
 # ロガーの取得
 logger = logging.getLogger("ebay_listing.ebay_api")
 
-def validate_credentials() -> bool:
+# ストリームでアップロードする際に一度に読み込む画像のバイト数
+STREAM_CHUNK_SIZE = 64 * 1024
+
+def validate_credentials(environment: Optional[EbayEnvironment] = None) -> bool:
     """
     API認証情報の検証
     
+    Args:
+        environment (EbayEnvironment, optional): eBay環境オブジェクト。指定された場合はその環境の認証情報を検証する。
+    
     Returns:
         bool: 認証情報が有効かどうか
     """
+    if environment is not None:
+        if not environment.validate_credentials():
+            logger.error(f"eBay {environment.label} 環境のAPI認証情報が正しく設定されていません")
+            return False
+        return True
+    
     if not all([EBAY_APP_ID, EBAY_DEV_ID, EBAY_CERT_ID, EBAY_AUTH_TOKEN]):
         logger.error("eBay API認証情報が正しく設定されていません")
         return False
@@ -73,54 +89,37 @@ def get_suggested_category(title: str, environment: Optional[EbayEnvironment] =
     Returns:
         Optional[str]: 提案されたカテゴリIDのうち最初のもの。失敗した場合はNone。
     """
-    if not validate_credentials():
+    if not validate_credentials(environment):
         logger.error("カテゴリ提案API呼び出し前に認証情報エラー")
         return None
 
     try:
         env = environment or EbayEnvironment()
-        api_config = env.get_api_config()
         
         env_name = "本番" if env.is_production() else "サンドボックス"
         logger.info(f"タイトル '{title}' に基づいてeBay {env_name} 環境でカテゴリIDを提案させています...")
         
-        # APIに接続
-        api = Trading(**api_config)
-        response = api.execute('GetSuggestedCategories', {'Query': title})
-        response_dict = response.dict()
+        # APIに接続（最初の候補の項目だけを読み取る）
+        fields = env.execute_fields('GetSuggestedCategories', {'Query': title}, [
+            'SuggestedCategoryArray/SuggestedCategory/Category/CategoryID',
+            'SuggestedCategoryArray/SuggestedCategory/Category/CategoryName',
+            'SuggestedCategoryArray/SuggestedCategory/PercentItemFound'
+        ])
 
-        ack_status = response_dict.get('Ack', 'Failure')
+        ack_status = fields.get('Ack') or 'Failure'
         if ack_status == 'Failure':
-            errors = response_dict.get('Errors', [])
-            error_message = _extract_error_message(errors) # 以前追加した補助関数を使う
-            logger.error(f"GetSuggestedCategories APIエラー: {error_message}")
-            return None
-
-        suggested_categories = response_dict.get('SuggestedCategoryArray', {}).get('SuggestedCategory', [])
-
-        if not suggested_categories:
-            logger.warning(f"タイトル '{title}' に対するカテゴリ提案が見つかりませんでした。")
-            return None
-
-        # suggested_categoriesが辞書の場合（候補が1つ）とリストの場合（複数）に対応
-        first_category = None
-        if isinstance(suggested_categories, list):
-            first_category = suggested_categories[0]
-        elif isinstance(suggested_categories, dict):
-            first_category = suggested_categories
-        else:
-            logger.warning("予期しないカテゴリ提案の形式です。")
+            logger.error(f"GetSuggestedCategories APIエラー: Ack={ack_status}")
             return None
 
-        category_id = first_category.get('Category', {}).get('CategoryID')
+        category_id = fields['SuggestedCategoryArray/SuggestedCategory/Category/CategoryID']
 
         if category_id:
-            category_name = first_category.get('Category', {}).get('CategoryName', 'N/A')
-            percent_match = first_category.get('PercentItemFound', 'N/A')
+            category_name = fields['SuggestedCategoryArray/SuggestedCategory/Category/CategoryName'] or 'N/A'
+            percent_match = fields['SuggestedCategoryArray/SuggestedCategory/PercentItemFound'] or 'N/A'
             logger.info(f"提案されたカテゴリID: {category_id} (名前: {category_name}, 一致率: {percent_match}%)")
             return category_id
         else:
-            logger.warning("カテゴリ提案レスポンスにCategoryIDが含まれていません。")
+            logger.warning(f"タイトル '{title}' に対するカテゴリ提案が見つかりませんでした。")
             return None
 
     except ConnectionError as e:
@@ -139,6 +138,287 @@ def get_suggested_category(title: str, environment: Optional[EbayEnvironment] =
         logger.exception(f"カテゴリ提案取得中に予期しないエラーが発生しました。", exc_info=True)
         return None
 
+def _as_list(value) -> list:
+    """
+    APIレスポンスの要素をリストにそろえる補助関数（要素が1つの場合は辞書で返されるため）
+    
+    Args:
+        value: レスポンスの要素
+        
+    Returns:
+        list: 要素のリスト
+    """
+    if value is None:
+        return []
+    return value if isinstance(value, list) else [value]
+
+def upload_external_picture(picture_url: str, environment: Optional[EbayEnvironment] = None) -> Optional[str]:
+    """
+    外部の画像URLをeBayに取得させてアップロードする関数（画像をローカルに転送しない）
+    
+    Args:
+        picture_url (str): 画像のURL（HTTPS）
+        environment (EbayEnvironment, optional): eBay環境オブジェクト。Noneの場合は新しく作成。
+        
+    Returns:
+        str: アップロードされた画像のURL。失敗した場合はNone。
+    """
+    logger.info(f"画像URL '{picture_url}' をeBayに取得させています...")
+    
+    if not validate_credentials(environment):
+        logger.error("API認証情報が無効です")
+        return None
+    
+    try:
+        env = environment or EbayEnvironment()
+        
+        fields = env.execute_fields('UploadSiteHostedPictures', {
+            'PictureName': os.path.basename(picture_url.split('?')[0]) or 'picture',
+            'ExternalPictureURL': picture_url
+        }, ['SiteHostedPictureDetails/FullURL'])
+        
+        full_url = fields['SiteHostedPictureDetails/FullURL']
+        if full_url:
+            logger.info(f"画像のアップロードに成功しました。URL: {full_url}")
+            return full_url
+        else:
+            logger.error("画像URLが見つかりません")
+            return None
+            
+    except ConnectionError as e:
+        logger.error(f"eBay API接続エラー: {str(e)}")
+        try:
+            errors = e.response.dict().get('Errors', [])
+            logger.error(f"APIエラー詳細: {_extract_error_message(errors)}")
+        except Exception:
+            pass
+        return None
+    except Exception as e:
+        logger.error(f"画像URLのアップロード中に予期しないエラーが発生しました: {str(e)}")
+        return None
+
+def upload_image_stream(image_url: str, environment: Optional[EbayEnvironment] = None) -> Optional[str]:
+    """
+    画像URLからダウンロードしたデータを、ディスクに保存せずにそのままeBayにアップロードする関数
+    ダウンロード元がContent-Lengthを返さない場合や圧縮して返す場合はNoneを返す（呼び出し元でダウンロードしてアップロードする）
+    
+    Args:
+        image_url (str): 画像のURL
+        environment (EbayEnvironment, optional): eBay環境オブジェクト。Noneの場合は新しく作成。
+        
+    Returns:
+        str: アップロードされた画像のURL。失敗した場合はNone。
+    """
+    if not validate_credentials(environment):
+        logger.error("API認証情報が無効です")
+        return None
+    
+    try:
+        env = environment or EbayEnvironment()
+        
+        with get_session().get(image_url, stream=True, timeout=default_timeout()) as download:
+            download.raise_for_status()
+            size = download.headers.get('Content-Length')
+            if not size or download.headers.get('Content-Encoding'):
+                logger.info(f"画像のサイズがわからないため、ストリームでのアップロードを行いません: {image_url}")
+                return None
+            
+            logger.info(f"画像 '{image_url}' をダウンロードしながらeBayにアップロードしています...")
+            response = env.execute_streaming(
+                'UploadSiteHostedPictures',
+                {'PictureName': os.path.basename(image_url.split('?')[0]) or 'picture'},
+                filename=os.path.basename(image_url.split('?')[0]) or 'picture',
+                chunks=download.iter_content(chunk_size=STREAM_CHUNK_SIZE),
+                size=int(size),
+                content_type=download.headers.get('Content-Type', 'application/octet-stream')
+            )
+        
+        fields = extract_response_fields(response.content, ['SiteHostedPictureDetails/FullURL'])
+        full_url = fields['SiteHostedPictureDetails/FullURL']
+        if fields['Ack'] != 'Failure' and full_url:
+            logger.info(f"画像のアップロードに成功しました。URL: {full_url}")
+            return full_url
+        
+        # エラーの場合だけレスポンス全体を解析する
+        root = ET.fromstring(response.content)
+        namespace = {'e': 'urn:ebay:apis:eBLBaseComponents'}
+        errors = [{'ErrorCode': error.findtext('e:ErrorCode', 'Unknown', namespace),
+                   'LongMessage': error.findtext('e:LongMessage', 'Unknown error', namespace)}
+                  for error in root.findall('e:Errors', namespace)]
+        logger.error(f"APIエラー詳細: {_extract_error_message(errors)}")
+        return None
+        
+    except (requests.exceptions.RequestException, IOError, ET.ParseError, ExpatError) as e:
+        logger.error(f"画像のストリームでのアップロード中にエラーが発生しました: {str(e)}")
+        return None
+    except Exception as e:
+        logger.error(f"画像のストリームでのアップロード中に予期しないエラーが発生しました: {str(e)}")
+        return None
+
+def get_category_specifics(category_ids: List[str],
+                           environment: Optional[EbayEnvironment] = None,
+                           max_names: int = 30,
+                           max_values_per_name: int = 1000) -> Optional[Dict[str, List[Dict[str, Any]]]]:
+    """
+    カテゴリごとのItem Specificsの定義をGetCategorySpecificsで取得する関数
+    
+    Args:
+        category_ids (List[str]): カテゴリIDのリスト（1回の呼び出しで最大100件）
+        environment (EbayEnvironment, optional): eBay環境オブジェクト。Noneの場合は新しく作成。
+        max_names (int): カテゴリごとに取得する項目の最大数（APIの上限は30）
+        max_values_per_name (int): 項目ごとに取得する推奨値の最大数
+        
+    Returns:
+        Optional[Dict[str, List[Dict[str, Any]]]]: カテゴリIDごとの項目の定義のリスト。失敗した場合はNone。
+            - name (str): 項目名
+            - required (bool): 必須の項目かどうか
+            - selection_only (bool): 推奨値からしか選べない項目かどうか
+            - max_values (int): 指定できる値の最大数
+            - values (List[str]): 推奨値
+    """
+    if not validate_credentials(environment):
+        logger.error("GetCategorySpecifics API呼び出し前に認証情報エラー")
+        return None
+    
+    try:
+        env = environment or EbayEnvironment()
+        logger.info(f"カテゴリ {', '.join(category_ids)} のItem Specificsの定義を取得しています...")
+        
+        response = env.execute('GetCategorySpecifics', {
+            'CategoryID': list(category_ids),
+            'MaxNames': max_names,
+            'MaxValuesPerName': max_values_per_name
+        })
+        response_dict = response.dict()
+        
+        if response_dict.get('Ack', 'Failure') == 'Failure':
+            error_message = _extract_error_message(response_dict.get('Errors', []))
+            logger.error(f"GetCategorySpecifics APIエラー: {error_message}")
+            return None
+        
+        specifics = {}
+        for recommendation in _as_list(response_dict.get('Recommendations')):
+            aspects = []
+            for name_recommendation in _as_list(recommendation.get('NameRecommendation')):
+                rules = name_recommendation.get('ValidationRules') or {}
+                aspects.append({
+                    "name": name_recommendation.get('Name'),
+                    "required": (rules.get('UsageConstraint') == 'Required'
+                                 or int(rules.get('MinValues') or 0) > 0),
+                    "selection_only": rules.get('SelectionMode') == 'SelectionOnly',
+                    "max_values": int(rules.get('MaxValues') or 1),
+                    "values": [value.get('Value') for value in _as_list(name_recommendation.get('ValueRecommendation'))
+                               if value.get('Value')]
+                })
+            specifics[str(recommendation.get('CategoryID'))] = aspects
+        return specifics
+    
+    except ConnectionError as e:
+        logger.error(f"GetCategorySpecifics API接続エラーが発生しました: {e}")
+        try:
+            errors = e.response.dict().get('Errors', [])
+            logger.error(f"APIエラー詳細: {_extract_error_message(errors)}")
+        except Exception:
+            pass
+        return None
+    except Exception as e:
+        logger.error(f"Item Specificsの定義の取得中に予期しないエラーが発生しました: {str(e)}")
+        return None
+
+def get_categories(environment: Optional[EbayEnvironment] = None,
+                   site_id: str = "0") -> Optional[Dict[str, Any]]:
+    """
+    サイトのカテゴリツリー全体をGetCategoriesで取得する関数
+    
+    Args:
+        environment (EbayEnvironment, optional): eBay環境オブジェクト。Noneの場合は新しく作成。
+        site_id (str): カテゴリを取得するサイトのID（"0" はUS）
+        
+    Returns:
+        Optional[Dict[str, Any]]: カテゴリツリー。失敗した場合はNone。
+            - version (str): カテゴリツリーのバージョン
+            - categories (List[Dict[str, Any]]): カテゴリのリスト
+              （category_id, name, parent_id, leaf）
+    """
+    if not validate_credentials(environment):
+        logger.error("GetCategories API呼び出し前に認証情報エラー")
+        return None
+    
+    try:
+        env = environment or EbayEnvironment()
+        logger.info(f"サイト {site_id} のカテゴリツリーを取得しています（数分かかる場合があります）...")
+        
+        response = env.execute('GetCategories', {
+            'CategorySiteID': site_id,
+            'DetailLevel': 'ReturnAll',
+            'ViewAllNodes': 'true'
+        })
+        response_dict = response.dict()
+        
+        if response_dict.get('Ack', 'Failure') == 'Failure':
+            error_message = _extract_error_message(response_dict.get('Errors', []))
+            logger.error(f"GetCategories APIエラー: {error_message}")
+            return None
+        
+        categories = []
+        for category in _as_list((response_dict.get('CategoryArray') or {}).get('Category')):
+            parent_ids = _as_list(category.get('CategoryParentID'))
+            category_id = category.get('CategoryID')
+            parent_id = parent_ids[0] if parent_ids else None
+            categories.append({
+                "category_id": category_id,
+                "name": category.get('CategoryName', ''),
+                # ルートカテゴリは自分自身が親になっている
+                "parent_id": parent_id if parent_id != category_id else None,
+                "leaf": str(category.get('LeafCategory', 'false')).lower() == 'true'
+            })
+        
+        logger.info(f"{len(categories)} 件のカテゴリを取得しました")
+        return {"version": response_dict.get('CategoryVersion'), "categories": categories}
+    
+    except ConnectionError as e:
+        logger.error(f"GetCategories API接続エラーが発生しました: {e}")
+        try:
+            errors = e.response.dict().get('Errors', [])
+            logger.error(f"APIエラー詳細: {_extract_error_message(errors)}")
+        except Exception:
+            pass
+        return None
+    except Exception as e:
+        logger.error(f"カテゴリツリーの取得中に予期しないエラーが発生しました: {str(e)}")
+        return None
+
+def merge_item_specifics(item_specifics: Optional[List[Dict[str, str]]] = None) -> List[Dict[str, str]]:
+    """
+    configのデフォルトItem Specificsに、指定されたItem Specificsを上書きで追加する関数
+    
+    Args:
+        item_specifics (List[Dict[str, str]], optional): カスタムのItem Specifics
+        
+    Returns:
+        List[Dict[str, str]]: デフォルト値とマージしたItem Specifics
+    """
+    name_value_list = []
+    
+    # configからのデフォルトItem Specificsを追加
+    default_specifics = EBAY_LISTING_DEFAULTS.get("item_specifics", [])
+    if default_specifics:
+        name_value_list.extend(default_specifics)
+        
+    # 引数で渡されたカスタムItem Specificsがあれば追加（上書き）
+    if item_specifics:
+        # 重複する名前のItem Specificsは上書き
+        existing_names = [item.get("Name") for item in name_value_list]
+        for specific in item_specifics:
+            name = specific.get("Name")
+            if name in existing_names:
+                # 同名の項目を削除
+                name_value_list = [item for item in name_value_list if item.get("Name") != name]
+            # 新しい項目を追加
+            name_value_list.append(specific)
+    
+    return name_value_list
+
 def upload_image_to_ebay(image_path: str, environment: Optional[EbayEnvironment] = None) -> Optional[str]:
     """
     eBayに画像をアップロードする関数
@@ -152,7 +432,7 @@ def upload_image_to_ebay(image_path: str, environment: Optional[EbayEnvironment]
     """
     logger.info(f"画像 '{image_path}' をeBayにアップロードしています...")
     
-    if not validate_credentials():
+    if not validate_credentials(environment):
         logger.error("API認証情報が無効です")
         return None
 
@@ -162,27 +442,24 @@ def upload_image_to_ebay(image_path: str, environment: Optional[EbayEnvironment]
             return None
             
         env = environment or EbayEnvironment()
-        api_config = env.get_api_config()
-        
-        api = Trading(**api_config)
         
         logger.info(f"画像 '{image_path}' をアップロードしています...")
         
-        with open(image_path, 'rb') as f:
-            image_data = f.read()
-        
-        request_data = {
-            'PictureName': os.path.basename(image_path),
-            'PictureData': image_data
-        }
-        
-        response = api.execute('UploadSiteHostedPictures', request_data)
+        # 並行してアップロードする画像がメモリに読み込まれる合計サイズを上限内に抑える
+        with get_image_memory_budget().reserve(os.path.getsize(image_path)):
+            with open(image_path, 'rb') as f:
+                image_data = f.read()
+            
+            request_data = {
+                'PictureName': os.path.basename(image_path),
+                'PictureData': image_data
+            }
+            
+            fields = env.execute_fields('UploadSiteHostedPictures', request_data,
+                                        ['SiteHostedPictureDetails/FullURL'])
         
         # 成功した場合
-        response_dict = response.dict()
-        
-        site_hosted_picture_details = response_dict.get('SiteHostedPictureDetails', {})
-        full_url = site_hosted_picture_details.get('FullURL')
+        full_url = fields['SiteHostedPictureDetails/FullURL']
         
         if full_url:
             logger.info(f"画像のアップロードに成功しました。URL: {full_url}")
@@ -208,13 +485,125 @@ def upload_image_to_ebay(image_path: str, environment: Optional[EbayEnvironment]
         return None
 
 # --- 既存関数の修正: list_item_on_ebay ---
+def build_item_payload(title: str,
+                       category_id: Optional[str] = None,
+                       item_specifics: List[Dict[str, str]] = None,
+                       picture_urls: List[str] = None,
+                       merge_defaults: bool = True,
+                       seller_profile: Optional[Dict[str, str]] = None,
+                       quantity: Optional[int] = None) -> Dict[str, Any]:
+    """
+    出品する商品の Item 要素を作成する関数
+    AddItem（list_item_on_ebay）と一括出品フィード（feed_export）で同じ項目の対応付けを使う
+    
+    Args:
+        title (str): 出品するアイテムのタイトル
+        category_id (Optional[str], optional): 使用するカテゴリID。Noneの場合はconfigのデフォルト値を使用。
+        item_specifics (List[Dict[str, str]], optional): カスタムのItem Specifics。Noneの場合はデフォルト値を使用。
+        picture_urls (List[str], optional): 商品画像のURL。Noneの場合はデフォルト値を使用。
+        merge_defaults (bool): configのデフォルトItem Specificsをマージするかどうか。
+        seller_profile (Dict[str, str], optional): ビジネスポリシーのID（seller_profiles.resolve_seller_profile の結果）。
+            指定されたポリシーはIDだけを送り、ReturnPolicy / ShippingDetails を出品ごとに含めない。
+        quantity (int, optional): 数量。Noneの場合はconfigのデフォルト値を使用。
+        
+    Returns:
+        Dict[str, Any]: Item 要素
+        
+    Raises:
+        ValueError: カテゴリIDが決まらない場合
+    """
+    # カテゴリIDの決定
+    target_category_id = category_id # 引数で渡されたIDを優先
+    if not target_category_id:
+        # 引数で渡されなかったら、configのデフォルト値を使用
+        target_category_id = EBAY_LISTING_DEFAULTS.get("category_id")
+        if not target_category_id:
+            logger.error("configにcategory_idが設定されておらず、引数も指定されていません。")
+            raise ValueError("category_idがありません。")
+        logger.info(f"引数でカテゴリIDが指定されなかったため、デフォルト値を使用します: {target_category_id}")
+    else:
+        logger.info(f"引数で指定されたカテゴリIDを使用します: {target_category_id}")
+        
+    # Item Specificsの準備（merge_defaults=Falseの場合は検証済みのものをそのまま使う）
+    if merge_defaults:
+        name_value_list = merge_item_specifics(item_specifics)
+    else:
+        name_value_list = list(item_specifics or [])
+    
+    # リクエストパラメータの作成
+    logger.debug(f"出品リクエストを作成しています。タイトル: {title}, カテゴリID: {target_category_id}")
+    item = {
+        'Title': title,
+        'Description': EBAY_LISTING_DEFAULTS.get("description", "No description provided."),
+        'PrimaryCategory': {'CategoryID': target_category_id},
+        'StartPrice': EBAY_LISTING_DEFAULTS.get("price", "9.99"),
+        'Country': EBAY_LISTING_DEFAULTS.get("country", "US"),
+        'Currency': EBAY_LISTING_DEFAULTS.get("currency", "USD"),
+        'DispatchTimeMax': EBAY_LISTING_DEFAULTS.get("dispatch_time_max", 3),
+        'ListingDuration': EBAY_LISTING_DEFAULTS.get("listing_duration", "GTC"),
+        'ListingType': 'FixedPriceItem',
+        'Quantity': quantity or EBAY_LISTING_DEFAULTS.get("quantity", 1),
+        'Site': 'US',
+        'PostalCode': '95125'
+    }
+    
+    # ビジネスポリシーを使う場合はIDだけを指定し、返品・配送の条件は出品ごとに送らない
+    profile = seller_profile or {}
+    seller_profiles = {}
+    if profile.get("payment"):
+        seller_profiles['SellerPaymentProfile'] = {'PaymentProfileID': profile["payment"]}
+    if profile.get("return"):
+        seller_profiles['SellerReturnProfile'] = {'ReturnProfileID': profile["return"]}
+    else:
+        item['ReturnPolicy'] = {
+            'ReturnsAcceptedOption': 'ReturnsAccepted',
+            'RefundOption': 'MoneyBack',
+            'ReturnsWithinOption': 'Days_30',
+            'ShippingCostPaidByOption': 'Buyer'
+        }
+    if profile.get("shipping"):
+        # 発送までの日数は配送ポリシーに含まれる
+        seller_profiles['SellerShippingProfile'] = {'ShippingProfileID': profile["shipping"]}
+        del item['DispatchTimeMax']
+    else:
+        item['ShippingDetails'] = {
+            'ShippingType': 'Flat',
+            'ShippingServiceOptions': {
+                'ShippingServicePriority': '1',
+                'ShippingService': EBAY_LISTING_DEFAULTS.get("shipping_service", "USPSMedia"),
+                'ShippingServiceCost': EBAY_LISTING_DEFAULTS.get("shipping_cost", "2.00")
+            }
+        }
+    if seller_profiles:
+        item['SellerProfiles'] = seller_profiles
+    
+    # Item Specificsを追加（存在する場合のみ）
+    if name_value_list:
+        item['ItemSpecifics'] = {'NameValueList': name_value_list}
+
+    # 画像URLの設定
+    image_urls = picture_urls if picture_urls else ['https://via.placeholder.com/300x200']
+    item['PictureDetails'] = {'PictureURL': image_urls}
+    
+    # ConditionIDがあれば追加（一部のカテゴリでは非対応）
+    condition_id = EBAY_LISTING_DEFAULTS.get("condition_id")
+    if condition_id:
+        item['ConditionID'] = condition_id
+    
+    return item
+
 def list_item_on_ebay(title: str,
                       category_id: Optional[str] = None,
                       item_specifics: List[Dict[str, str]] = None,
                       picture_urls: List[str] = None,
-                      environment: Optional[EbayEnvironment] = None) -> Tuple[bool, str]:
+                      environment: Optional[EbayEnvironment] = None,
+                      merge_defaults: bool = True,
+                      seller_profile: Optional[Dict[str, str]] = None,
+                      quantity: Optional[int] = None,
+                      item_id: Optional[str] = None) -> Tuple[bool, str]:
     """
     eBayに商品を出品する関数
+    item_id を指定した場合は、新しく出品せずにReviseItemで既存の出品を更新する
     
     Args:
         title (str): 出品するアイテムのタイトル
@@ -222,114 +611,50 @@ def list_item_on_ebay(title: str,
         item_specifics (List[Dict[str, str]], optional): カスタムのItem Specifics。Noneの場合はデフォルト値を使用。
         picture_urls (List[str], optional): 商品画像のURL。Noneの場合はデフォルト値を使用。
         environment (EbayEnvironment, optional): eBay環境オブジェクト。Noneの場合は新しく作成。
+        merge_defaults (bool): configのデフォルトItem Specificsをマージするかどうか。
+                               カテゴリの定義で検証済み（必須項目だけをデフォルト値で補った）場合はFalseを指定する。
+        seller_profile (Dict[str, str], optional): 使用するビジネスポリシーのID。Noneの場合は返品・配送の条件を直接指定する。
+        quantity (int, optional): 数量。Noneの場合はconfigのデフォルト値を使用。
+        item_id (str, optional): 更新する出品のアイテムID
         
     Returns:
         Tuple[bool, str]: (成功したかどうかのブール値, アイテムIDまたはエラーメッセージ)
     """
-    if not validate_credentials():
+    if not validate_credentials(environment):
         return False, "API認証情報が無効です"
 
     try:
         env = environment or EbayEnvironment()
-        api_config = env.get_api_config()
         
         env_name = "本番" if env.is_production() else "サンドボックス"
         logger.debug(f"eBay {env_name} 環境のTrading APIに接続しています...")
         
-        # APIに接続
-        api = Trading(**api_config)
-        
-        # カテゴリIDの決定
-        target_category_id = category_id # 引数で渡されたIDを優先
-        if not target_category_id:
-            # 引数で渡されなかったら、configのデフォルト値を使用
-            target_category_id = EBAY_LISTING_DEFAULTS.get("category_id")
-            if not target_category_id:
-                logger.error("configにcategory_idが設定されておらず、引数も指定されていません。")
-                return False, "設定エラー: category_idがありません。"
-            logger.info(f"引数でカテゴリIDが指定されなかったため、デフォルト値を使用します: {target_category_id}")
-        else:
-            logger.info(f"引数で指定されたカテゴリIDを使用します: {target_category_id}")
-            
-        # Item Specificsの準備
-        name_value_list = []
-        
-        # configからのデフォルトItem Specificsを追加
-        default_specifics = EBAY_LISTING_DEFAULTS.get("item_specifics", [])
-        if default_specifics:
-            name_value_list.extend(default_specifics)
-            
-        # 引数で渡されたカスタムItem Specificsがあれば追加（上書き）
-        if item_specifics:
-            # 重複する名前のItem Specificsは上書き
-            existing_names = [item.get("Name") for item in name_value_list]
-            for specific in item_specifics:
-                name = specific.get("Name")
-                if name in existing_names:
-                    # 同名の項目を削除
-                    name_value_list = [item for item in name_value_list if item.get("Name") != name]
-                # 新しい項目を追加
-                name_value_list.append(specific)
-        
-        # リクエストパラメータの作成
-        logger.debug(f"出品リクエストを作成しています。タイトル: {title}, カテゴリID: {target_category_id}")
-        request_data = {
-            'Item': {
-                'Title': title,
-                'Description': EBAY_LISTING_DEFAULTS.get("description", "No description provided."),
-                'PrimaryCategory': {'CategoryID': target_category_id},
-                'StartPrice': EBAY_LISTING_DEFAULTS.get("price", "9.99"),
-                'Country': EBAY_LISTING_DEFAULTS.get("country", "US"),
-                'Currency': EBAY_LISTING_DEFAULTS.get("currency", "USD"),
-                'DispatchTimeMax': EBAY_LISTING_DEFAULTS.get("dispatch_time_max", 3),
-                'ListingDuration': EBAY_LISTING_DEFAULTS.get("listing_duration", "GTC"),
-                'ListingType': 'FixedPriceItem',
-                'Quantity': EBAY_LISTING_DEFAULTS.get("quantity", 1),
-                'ReturnPolicy': {
-                    'ReturnsAcceptedOption': 'ReturnsAccepted',
-                    'RefundOption': 'MoneyBack',
-                    'ReturnsWithinOption': 'Days_30',
-                    'ShippingCostPaidByOption': 'Buyer'
-                },
-                'ShippingDetails': {
-                    'ShippingType': 'Flat',
-                    'ShippingServiceOptions': {
-                        'ShippingServicePriority': '1',
-                        'ShippingService': EBAY_LISTING_DEFAULTS.get("shipping_service", "USPSMedia"),
-                        'ShippingServiceCost': EBAY_LISTING_DEFAULTS.get("shipping_cost", "2.00")
-                    }
-                },
-                'Site': 'US',
-                'PostalCode': '95125'
-            }
-        }
-        
-        # Item Specificsを追加（存在する場合のみ）
-        if name_value_list:
-            request_data['Item']['ItemSpecifics'] = {'NameValueList': name_value_list}
-
-        # 画像URLの設定
-        image_urls = picture_urls if picture_urls else ['https://via.placeholder.com/300x200']
-        request_data['Item']['PictureDetails'] = {'PictureURL': image_urls}
-        
-        # ConditionIDがあれば追加（一部のカテゴリでは非対応）
-        condition_id = EBAY_LISTING_DEFAULTS.get("condition_id")
-        if condition_id:
-            request_data['Item']['ConditionID'] = condition_id
+        try:
+            item = build_item_payload(title, category_id, item_specifics, picture_urls, merge_defaults,
+                                      seller_profile, quantity)
+        except ValueError as e:
+            return False, f"設定エラー: {str(e)}"
+        verb = 'AddItem'
+        if item_id:
+            item['ItemID'] = item_id
+            verb = 'ReviseItem'
+        request_data = {'Item': item}
             
         # APIリクエストを送信
         logger.debug("eBay APIにリクエストを送信しています...")
-        response = api.execute('AddItem', request_data)
+        fields = env.execute_fields(verb, request_data, ['ItemID'])
         
-        # 成功した場合
-        response_dict = response.dict()
-        item_id = response_dict.get('ItemID')
-        if not item_id:
+        # 成功した場合（手数料などの使わない項目は読み取らない）
+        listed_item_id = fields['ItemID'] or item_id
+        if not listed_item_id:
             logger.warning("APIレスポンスにItemIDが含まれていません")
             return False, "APIレスポンスにItemIDが含まれていません"
             
-        logger.info(f"商品が正常に出品されました。ItemID: {item_id}")
-        return True, item_id
+        if item_id:
+            logger.info(f"出品を更新しました。ItemID: {listed_item_id}")
+        else:
+            logger.info(f"商品が正常に出品されました。ItemID: {listed_item_id}")
+        return True, listed_item_id
     
     except ConnectionError as e:
         # APIエラーの場合
@@ -0,0 +1,157 @@
+import queue
+import itertools
+import logging
+import threading
+from typing import Optional, List, Dict, Tuple, Any, Callable, Iterable, Iterator
+
+logger = logging.getLogger("ebay_listing.fanout")
+
+# 前処理済みで、まだすべての出品先での処理が終わっていない商品の最大数
+DEFAULT_MAX_IN_FLIGHT = 8
+
+_END = object()
+
+def parse_targets(value: str) -> List[Tuple[str, Optional[str]]]:
+    """
+    "環境[:アカウント]" のカンマ区切りリストを解析する
+
+    Args:
+        value (str): 出品先の指定（例: "sandbox,production:shop2"）
+
+    Returns:
+        List[Tuple[str, Optional[str]]]: (環境タイプ, アカウント名) のリスト
+
+    Raises:
+        ValueError: 形式が不正な場合
+    """
+    targets = []
+    for part in value.split(','):
+        part = part.strip()
+        if not part:
+            continue
+        env_type, _, account = part.partition(':')
+        if env_type not in ("sandbox", "production"):
+            raise ValueError(f"出品先の環境は sandbox または production で指定してください: {part}")
+        targets.append((env_type, account or None))
+
+    if not targets:
+        raise ValueError("出品先が指定されていません")
+    if len(set(targets)) != len(targets):
+        raise ValueError(f"出品先が重複しています: {value}")
+    return targets
+
+def _iter_queue(work_queue: "queue.Queue",
+                done: Callable[[int], None]) -> Iterator[Tuple[int, Dict[str, str], Any]]:
+    """
+    終了の目印が来るまでキューから取り出す
+    次の商品を取り出すとき（または終了時）に、前の商品の処理が終わったことを done で知らせる
+
+    Args:
+        work_queue (queue.Queue): (通し番号, 商品) のキュー
+        done (Callable[[int], None]): 処理が終わった商品の通し番号を受け取る関数
+
+    Yields:
+        Tuple[int, Dict[str, str], Any]: (行番号, 商品データ, 前処理の結果)
+    """
+    while True:
+        entry = work_queue.get()
+        if entry is _END:
+            return
+        sequence, entry = entry
+        try:
+            yield entry
+        finally:
+            done(sequence)
+
+def fan_out(items: Iterable[Tuple[int, Dict[str, str]]],
+            targets: List[Any],
+            prepare: Callable[[int, Dict[str, str]], Any],
+            worker: Callable[[Any, Iterable[Tuple[int, Dict[str, str], Any]]], Dict[str, int]],
+            label: Callable[[Any], str] = str,
+            max_in_flight: int = DEFAULT_MAX_IN_FLIGHT,
+            release: Optional[Callable[[int, Any], None]] = None) -> Dict[str, Dict[str, int]]:
+    """
+    シートの各行を一度だけ前処理し、複数の出品先へ並行して流す
+    出品先ごとに1つのスレッドとキューを持ち、各出品先は自分の接続プールと呼び出し回数の上限で処理する
+    処理中の商品が max_in_flight に達したら、最も遅い出品先が追いつくまで次の行の読み込み・前処理を待たせる
+
+    Args:
+        items (Iterable[Tuple[int, Dict[str, str]]]): (行番号, 商品データ) の並び
+        targets (List[Any]): 出品先（EbayEnvironment など）
+        prepare (Callable): 行番号と商品データを受け取り、全出品先で共有する前処理結果を返す関数
+        worker (Callable): 出品先と (行番号, 商品データ, 前処理結果) の並びを受け取り、
+                           成功数・失敗数などの集計を返す関数
+        label (Callable): 出品先の表示名を返す関数
+        max_in_flight (int): 前処理を始めてから、すべての出品先での処理が終わるまでの商品の最大数
+        release (Callable, optional): すべての出品先での処理が終わった商品の行番号と前処理結果を受け取る関数
+                                      （前処理で確保したものを解放するために使う）
+
+    Returns:
+        Dict[str, Dict[str, int]]: 出品先の表示名ごとの集計結果
+    """
+    max_in_flight = max(1, max_in_flight)
+    queues = [queue.Queue(maxsize=max_in_flight) for _ in targets]
+    results: Dict[str, Dict[str, int]] = {}
+    slots = threading.Semaphore(max_in_flight)
+    # 通し番号ごとの [処理が終わっていない出品先の数, 行番号, 前処理結果]
+    in_flight: Dict[int, list] = {}
+    in_flight_lock = threading.Lock()
+
+    def done(sequence: int) -> None:
+        with in_flight_lock:
+            entry = in_flight[sequence]
+            entry[0] -= 1
+            if entry[0]:
+                return
+            del in_flight[sequence]
+        try:
+            if release:
+                release(entry[1], entry[2])
+        finally:
+            slots.release()
+
+    def run_worker(target: Any, work_queue: "queue.Queue") -> None:
+        entries = _iter_queue(work_queue, done)
+        try:
+            results[label(target)] = worker(target, entries)
+        except Exception:
+            logger.exception(f"出品先 {label(target)} の処理中に予期しないエラーが発生しました")
+            results[label(target)] = {"success": 0, "failure": 0, "skipped": 0, "aborted": 1}
+        finally:
+            # 前処理側が詰まらないように残りを読み捨てる
+            for _ in entries:
+                pass
+
+    threads = []
+    for target, work_queue in zip(targets, queues):
+        thread = threading.Thread(target=run_worker, args=(target, work_queue),
+                                  name=f"fanout-{label(target)}", daemon=True)
+        thread.start()
+        threads.append(thread)
+
+    rows = iter(items)
+    try:
+        for sequence in itertools.count():
+            # 空きができるまで次の行を読み込まない
+            slots.acquire()
+            try:
+                entry = next(rows, None)
+                if entry is None:
+                    slots.release()
+                    break
+                row_index, item = entry
+                prepared = prepare(row_index, item)
+            except BaseException:
+                slots.release()
+                raise
+            with in_flight_lock:
+                in_flight[sequence] = [len(queues), row_index, prepared]
+            for work_queue in queues:
+                work_queue.put((sequence, (row_index, item, prepared)))
+    finally:
+        for work_queue in queues:
+            work_queue.put(_END)
+        for thread in threads:
+            thread.join()
+
+    return results
@@ -0,0 +1,241 @@
+import os
+import sys
+import gzip
+import logging
+import tempfile
+import xml.etree.ElementTree as ET
+from typing import Optional, List, Dict, Any
+
+from ebaysdk.utils import dict2xml
+
+logger = logging.getLogger("ebay_listing.feed_export")
+
+# 一括出品フィード（Large Merchant Services の BulkDataExchangeRequests 形式）の設定
+FEED_VERSION = "1193"
+FEED_NAMESPACE = "urn:ebay:apis:eBLBaseComponents"
+REQUEST_TAG = "AddFixedPriceItemRequest"
+
+# フィードの検証で使うeBayの上限値
+MAX_TITLE_LENGTH = 80
+MAX_SPECIFIC_LENGTH = 65
+
+class FeedWriter:
+    """
+    一括出品フィードを1件ずつ書き出すクラス
+    商品をメモリに溜めずに書き込み、close() で完成したファイルに置き換える
+    拡張子が .gz の場合はgzipで圧縮する
+    """
+
+    def __init__(self, path: str, site_id: str = "0"):
+        """
+        初期化
+
+        Args:
+            path (str): 出力するフィードファイルのパス（.xml または .xml.gz）
+            site_id (str): 出品するサイトのID（"0" はUS）
+        """
+        self.path = path
+        self.site_id = site_id
+        self.count = 0
+        self._tmp_path = None
+        self._file = None
+
+    def open(self) -> None:
+        """
+        一時ファイルを開き、フィードのヘッダーを書き込む
+        """
+        directory = os.path.dirname(os.path.abspath(self.path))
+        os.makedirs(directory, exist_ok=True)
+        fd, self._tmp_path = tempfile.mkstemp(dir=directory, prefix=".feed.", suffix=".tmp")
+        raw = os.fdopen(fd, 'wb')
+        if self.path.endswith('.gz'):
+            self._file = gzip.GzipFile(fileobj=raw, mode='wb')
+            self._raw = raw
+        else:
+            self._file = raw
+            self._raw = None
+        self._write('<?xml version="1.0" encoding="UTF-8"?>\n'
+                    '<BulkDataExchangeRequests>\n'
+                    f'<Header><Version>{FEED_VERSION}</Version><SiteID>{self.site_id}</SiteID></Header>\n')
+
+    def _write(self, text: str) -> None:
+        self._file.write(text.encode('utf-8'))
+
+    def add(self, message_id: str, item: Dict[str, Any]) -> None:
+        """
+        1商品分の出品リクエストを書き込む
+
+        Args:
+            message_id (str): 結果ファイルとの対応付けに使うID（行番号）
+            item (Dict[str, Any]): build_item_payload で作成した Item 要素
+        """
+        self._write(f'<{REQUEST_TAG} xmlns="{FEED_NAMESPACE}">'
+                    f'<ErrorLanguage>en_US</ErrorLanguage><WarningLevel>High</WarningLevel>'
+                    f'<Version>{FEED_VERSION}</Version><MessageID>{message_id}</MessageID>'
+                    f'{dict2xml({"Item": item}, escape_xml=True)}</{REQUEST_TAG}>\n')
+        self.count += 1
+
+    def close(self) -> None:
+        """
+        フッターを書き込み、一時ファイルを出力先に置き換える
+        """
+        self._write('</BulkDataExchangeRequests>\n')
+        self._close_files()
+        os.replace(self._tmp_path, self.path)
+        logger.info(f"{self.count} 件の出品リクエストをフィード '{self.path}' に書き出しました")
+
+    def abort(self) -> None:
+        """
+        書き込みを中止し、一時ファイルを削除する
+        """
+        self._close_files()
+        if self._tmp_path and os.path.exists(self._tmp_path):
+            os.remove(self._tmp_path)
+
+    def _close_files(self) -> None:
+        self._file.close()
+        if self._raw is not None:
+            self._raw.close()
+
+    def __enter__(self) -> "FeedWriter":
+        self.open()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback) -> None:
+        if exc_type is None:
+            self.close()
+        else:
+            self.abort()
+
+def _local_name(tag: str) -> str:
+    return tag.rsplit('}', 1)[-1]
+
+def _child(element: ET.Element, name: str) -> Optional[ET.Element]:
+    for child in element:
+        if _local_name(child.tag) == name:
+            return child
+    return None
+
+def _children(element: ET.Element, name: str) -> List[ET.Element]:
+    return [child for child in element if _local_name(child.tag) == name]
+
+def _text(element: Optional[ET.Element]) -> str:
+    return (element.text or '').strip() if element is not None else ''
+
+def _check_item(item: Optional[ET.Element]) -> List[str]:
+    """
+    Item 要素をeBayが受け付ける形かどうか検証する
+
+    Args:
+        item (ET.Element): Item 要素
+
+    Returns:
+        List[str]: 問題の一覧
+    """
+    if item is None:
+        return ["Item がありません"]
+
+    problems = []
+    title = _text(_child(item, 'Title'))
+    if not title:
+        problems.append("Title がありません")
+    elif len(title) > MAX_TITLE_LENGTH:
+        problems.append(f"Title が {MAX_TITLE_LENGTH} 文字を超えています")
+
+    category = _child(item, 'PrimaryCategory')
+    if not _text(_child(category, 'CategoryID') if category is not None else None).isdigit():
+        problems.append("PrimaryCategory/CategoryID が不正です")
+
+    try:
+        if float(_text(_child(item, 'StartPrice'))) <= 0:
+            problems.append("StartPrice が0以下です")
+    except ValueError:
+        problems.append("StartPrice が数値ではありません")
+
+    try:
+        if int(_text(_child(item, 'Quantity'))) < 1:
+            problems.append("Quantity が1未満です")
+    except ValueError:
+        problems.append("Quantity が整数ではありません")
+
+    for name in ('Currency', 'Country', 'ListingDuration', 'ListingType'):
+        if not _text(_child(item, name)):
+            problems.append(f"{name} がありません")
+
+    pictures = _child(item, 'PictureDetails')
+    urls = [_text(url) for url in _children(pictures, 'PictureURL')] if pictures is not None else []
+    if not urls:
+        problems.append("PictureDetails/PictureURL がありません")
+    for url in urls:
+        if not url.startswith(('http://', 'https://')):
+            problems.append(f"PictureURL がURLではありません: {url}")
+
+    specifics = _child(item, 'ItemSpecifics')
+    for name_value in _children(specifics, 'NameValueList') if specifics is not None else []:
+        name = _text(_child(name_value, 'Name'))
+        if not name or len(name) > MAX_SPECIFIC_LENGTH:
+            problems.append(f"ItemSpecifics の項目名が不正です: '{name}'")
+        for value in _children(name_value, 'Value'):
+            if len(_text(value)) > MAX_SPECIFIC_LENGTH:
+                problems.append(f"ItemSpecifics '{name}' の値が {MAX_SPECIFIC_LENGTH} 文字を超えています")
+
+    return problems
+
+def validate_feed(path: str, max_errors: int = 100) -> Dict[str, Any]:
+    """
+    一括出品フィードを検証する（アップロード前にローカルで確認するための簡易的な受信側）
+    iterparseで1リクエストずつ読み込んで破棄するため、大きなフィードでもメモリ使用量は増えない
+
+    Args:
+        path (str): フィードファイルのパス
+        max_errors (int): 記録する問題の最大数
+
+    Returns:
+        Dict[str, Any]: 検証結果
+            - requests (int): 出品リクエストの数
+            - invalid (int): 問題のあるリクエストの数
+            - errors (List[str]): 問題の一覧（MessageID付き、最大 max_errors 件）
+    """
+    report = {"requests": 0, "invalid": 0, "errors": []}
+    message_ids = set()
+    opener = gzip.open if path.endswith('.gz') else open
+
+    with opener(path, 'rb') as f:
+        context = ET.iterparse(f, events=('start', 'end'))
+        _, root = next(context)
+        if _local_name(root.tag) != 'BulkDataExchangeRequests':
+            raise ValueError(f"フィードのルート要素が BulkDataExchangeRequests ではありません: {root.tag}")
+
+        for event, element in context:
+            if event != 'end' or _local_name(element.tag) != REQUEST_TAG:
+                continue
+            report["requests"] += 1
+            message_id = _text(_child(element, 'MessageID'))
+            problems = _check_item(_child(element, 'Item'))
+            if not message_id:
+                problems.append("MessageID がありません")
+            elif message_id in message_ids:
+                problems.append("MessageID が重複しています")
+            message_ids.add(message_id)
+
+            if problems:
+                report["invalid"] += 1
+                for problem in problems:
+                    if len(report["errors"]) < max_errors:
+                        report["errors"].append(f"MessageID={message_id}: {problem}")
+            # 検証済みのリクエストを破棄してメモリを解放する
+            root.clear()
+
+    return report
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+    if len(sys.argv) != 2:
+        print("使い方: python feed_export.py <フィードファイル>")
+        sys.exit(2)
+
+    result = validate_feed(sys.argv[1])
+    print(f"出品リクエスト: {result['requests']} 件, 問題のあるリクエスト: {result['invalid']} 件")
+    for error in result["errors"]:
+        print(f"  {error}")
+    sys.exit(0 if result["invalid"] == 0 else 1)
@@ -0,0 +1,76 @@
+import os
+import logging
+import threading
+from typing import Dict
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+logger = logging.getLogger("ebay_listing.file_lock")
+
+class FileLock:
+    """
+    複数のプロセス・スレッドで共有するファイルを排他的に更新するためのロック
+    ロックファイルに対するOSのロック（fcntl.flock / msvcrt.locking）と、プロセス内のスレッド用のロックを組み合わせる
+    """
+
+    # 同じロックファイルを使うスレッド同士はプロセス内のロックで待たせる
+    _thread_locks: Dict[str, threading.Lock] = {}
+    _thread_locks_guard = threading.Lock()
+
+    def __init__(self, path: str):
+        """
+        初期化
+
+        Args:
+            path (str): ロックファイルのパス（存在しない場合は作成する）
+        """
+        self.path = os.path.abspath(path)
+        with FileLock._thread_locks_guard:
+            self._thread_lock = FileLock._thread_locks.setdefault(self.path, threading.Lock())
+        self._fd = None
+
+    def acquire(self) -> None:
+        """
+        ロックを取得する（他のプロセス・スレッドが解放するまで待つ）
+        """
+        self._thread_lock.acquire()
+        try:
+            directory = os.path.dirname(self.path)
+            os.makedirs(directory, exist_ok=True)
+            self._fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644)
+            if fcntl is not None:
+                fcntl.flock(self._fd, fcntl.LOCK_EX)
+            else:
+                msvcrt.locking(self._fd, msvcrt.LK_LOCK, 1)
+        except BaseException:
+            if self._fd is not None:
+                os.close(self._fd)
+                self._fd = None
+            self._thread_lock.release()
+            raise
+
+    def release(self) -> None:
+        """
+        ロックを解放する
+        """
+        try:
+            if fcntl is not None:
+                fcntl.flock(self._fd, fcntl.LOCK_UN)
+            else:
+                os.lseek(self._fd, 0, os.SEEK_SET)
+                msvcrt.locking(self._fd, msvcrt.LK_UNLCK, 1)
+            os.close(self._fd)
+        finally:
+            self._fd = None
+            self._thread_lock.release()
+
+    def __enter__(self) -> "FileLock":
+        self.acquire()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback) -> None:
+        self.release()
@@ -0,0 +1,131 @@
+import os
+import csv
+import json
+import mmap
+import logging
+from contextlib import contextmanager
+from typing import Optional, Dict, Tuple, Iterator
+
+logger = logging.getLogger("ebay_listing.file_reader")
+
+# このサイズ以上のファイルはメモリマップして読み込む
+MMAP_THRESHOLD = 8 * 1024 * 1024
+
+@contextmanager
+def _open_lines(path: str) -> Iterator[Iterator[bytes]]:
+    """
+    ファイルを1行ずつ返すイテレータを開く
+    大きなファイルはメモリマップし、ページキャッシュから直接読み込む
+
+    Args:
+        path (str): ファイルのパス
+
+    Yields:
+        Iterator[bytes]: 改行を含む1行ずつのバイト列
+    """
+    with open(path, 'rb') as f:
+        size = os.fstat(f.fileno()).st_size
+        if size >= MMAP_THRESHOLD:
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+                if hasattr(mapped, 'madvise'):
+                    mapped.madvise(mmap.MADV_SEQUENTIAL)
+                yield iter(mapped.readline, b"")
+        else:
+            yield iter(f)
+
+def _decode_lines(lines: Iterator[bytes]) -> Iterator[str]:
+    """
+    バイト列の行をUTF-8の文字列に変換する（先頭のBOMは取り除く）
+
+    Args:
+        lines (Iterator[bytes]): バイト列の行
+
+    Yields:
+        str: 文字列の行
+    """
+    first = True
+    for line in lines:
+        if first:
+            first = False
+            yield line.decode('utf-8-sig')
+        else:
+            yield line.decode('utf-8')
+
+def _iter_csv(lines: Iterator[str]) -> Iterator[Dict[str, str]]:
+    """
+    CSVの各行をヘッダーをキーとする辞書にする
+
+    Args:
+        lines (Iterator[str]): CSVの行
+
+    Yields:
+        Dict[str, str]: 商品データ
+    """
+    reader = csv.reader(lines)
+    headers = next(reader, None)
+    if not headers:
+        return
+
+    for row in reader:
+        if not any(row):
+            continue
+        row_data = row + [''] * (len(headers) - len(row))
+        yield {headers[i]: row_data[i] for i in range(len(headers))}
+
+def _iter_jsonl(lines: Iterator[str]) -> Iterator[Dict[str, str]]:
+    """
+    JSON Linesの各行を文字列の値を持つ辞書にする
+
+    Args:
+        lines (Iterator[str]): JSON Linesの行
+
+    Yields:
+        Dict[str, str]: 商品データ
+    """
+    for line_number, line in enumerate(lines, start=1):
+        line = line.strip()
+        if not line:
+            continue
+        record = json.loads(line)
+        if not isinstance(record, dict):
+            raise ValueError(f"{line_number}行目がJSONオブジェクトではありません")
+        yield {key: '' if value is None else str(value) for key, value in record.items()}
+
+def iter_file_rows(path: str,
+                   row_index: Optional[int] = None,
+                   row_range: Optional[Tuple[int, int]] = None) -> Iterator[Tuple[int, Dict[str, str]]]:
+    """
+    CSVまたはJSON Linesファイルから商品データを1行ずつ読み込む
+    ファイル全体をメモリに読み込まずに、read_spreadsheet_data と同じ形（ヘッダーをキーとする辞書）で返す
+
+    Args:
+        path (str): ファイルのパス（拡張子 .csv / .jsonl / .ndjson）
+        row_index (int, optional): 読み込む行のインデックス（0から始まり、ヘッダー行は含まない）
+        row_range (Tuple[int, int], optional): 読み込む行の範囲（開始, 終了）。両端を含む
+
+    Yields:
+        Tuple[int, Dict[str, str]]: (行番号, 商品データ)
+
+    Raises:
+        ValueError: 対応していない拡張子の場合
+    """
+    extension = os.path.splitext(path)[1].lower()
+    if extension == '.csv':
+        parse = _iter_csv
+    elif extension in ('.jsonl', '.ndjson'):
+        parse = _iter_jsonl
+    else:
+        raise ValueError(f"対応していないファイル形式です（.csv / .jsonl のみ）: {path}")
+
+    if row_index is not None:
+        row_range = (row_index, row_index)
+
+    logger.info(f"ファイル '{path}' から商品データを読み込みます")
+    with _open_lines(path) as lines:
+        for index, item in enumerate(parse(_decode_lines(lines))):
+            if row_range is not None:
+                if index < row_range[0]:
+                    continue
+                if index > row_range[1]:
+                    return
+            yield index, item
@@ -1,18 +1,24 @@
 import os
 import logging
 import sys
-from typing import Optional, List, Dict, Any, Union
+from typing import Optional, List, Dict, Any, Union, Tuple
 import json
 
 logger = logging.getLogger("ebay_listing.google_sheets_mock")
 
-def read_spreadsheet_data_mock(row_index: Optional[int] = None) -> Union[Dict[str, str], List[Dict[str, str]], None]:
+def read_spreadsheet_data_mock(row_index: Optional[int] = None,
+                              sheet_name: Optional[str] = None,
+                              spreadsheet_id: Optional[str] = None,
+                              row_range: Optional[Tuple[int, int]] = None) -> Union[Dict[str, str], List[Dict[str, str]], None]:
     """
     Google Sheetsからのデータ読み込みをモックする関数
     実際のAPIコールを行わずにテスト用のデータを返す
     
     Args:
         row_index (int, optional): 読み取る行のインデックス。Noneの場合は全行を取得
+        sheet_name (str, optional): シート名（モックでは使用しない）
+        spreadsheet_id (str, optional): スプレッドシートID（モックでは使用しない）
+        row_range (Tuple[int, int], optional): 読み取る行の範囲（開始, 終了）。両端を含む
         
     Returns:
         Union[Dict[str, str], List[Dict[str, str]], None]: 
@@ -61,9 +67,101 @@ def read_spreadsheet_data_mock(row_index: Optional[int] = None) -> Union[Dict[st
             logger.warning(f"指定された行 {row_index} はモックデータの範囲外です")
             return None
     
+    if row_range is not None:
+        mock_data = mock_data[row_range[0]:row_range[1] + 1]
+        if not mock_data:
+            logger.warning(f"指定された範囲 {row_range[0]}-{row_range[1]} はモックデータの範囲外です")
+            return None
+    
     logger.info(f"モックデータから {len(mock_data)} 行を返します")
     return mock_data
 
+def _parse_a1(cell: str) -> Tuple[Optional[int], Optional[int]]:
+    """
+    A1形式のセル（"A2"、"A"、"2"）を0から始まる (列番号, 行番号) にする（省略された部分はNone）
+    """
+    letters = cell.rstrip("0123456789")
+    digits = cell[len(letters):]
+    column = None
+    if letters:
+        column = 0
+        for letter in letters:
+            column = column * 26 + ord(letter) - 64
+        column -= 1
+    return column, int(digits) - 1 if digits else None
+
+class _Request:
+    def __init__(self, result):
+        self._result = result
+
+    def execute(self):
+        if isinstance(self._result, Exception):
+            raise self._result
+        return self._result() if callable(self._result) else self._result
+
+class MockSheetsService:
+    """
+    Sheets APIクライアント（googleapiclient.discovery.Resource）のモック
+    values().get はシートの値を範囲で切り出して返し、values().batchUpdate は書き込みを記録してシートに反映する
+    """
+
+    def __init__(self, rows: List[List[str]], sheet_name: str = "Sheet1", fail_updates: int = 0):
+        """
+        初期化
+
+        Args:
+            rows (List[List[str]]): ヘッダー行を含むシートの値
+            sheet_name (str): シート名
+            fail_updates (int): 失敗させる batchUpdate の回数（最初から順に）
+        """
+        self.rows = [list(row) for row in rows]
+        self.sheet_name = sheet_name
+        self.fail_updates = fail_updates
+        self.gets: List[str] = []
+        self.updates: List[List[Dict[str, Any]]] = []
+
+    def spreadsheets(self):
+        return self
+
+    def values(self):
+        return self
+
+    def _read(self, cell_range: str) -> Dict[str, Any]:
+        # シート名だけの範囲はシート全体
+        _, _, cells = cell_range.partition('!')
+        start, _, end = cells.partition(':')
+        first_column, first_row = _parse_a1(start) if start else (None, None)
+        last_column, last_row = _parse_a1(end or start) if start else (None, None)
+        rows = self.rows[first_row or 0:None if last_row is None else last_row + 1]
+        values = [row[first_column or 0:None if last_column is None else last_column + 1] for row in rows]
+        # APIと同じく、末尾の空のセルと空の行は返さない
+        for row in values:
+            while row and row[-1] == "":
+                row.pop()
+        while values and not values[-1]:
+            values.pop()
+        return {"range": cell_range, "values": values} if values else {"range": cell_range}
+
+    def get(self, spreadsheetId: str, range: str, **kwargs):
+        self.gets.append(range)
+        return _Request(lambda: self._read(range))
+
+    def batchUpdate(self, spreadsheetId: str, body: Dict[str, Any]):
+        if self.fail_updates:
+            self.fail_updates -= 1
+            return _Request(RuntimeError("503 Service Unavailable"))
+        self.updates.append(body["data"])
+        for entry in body["data"]:
+            start, _, end = entry["range"].rpartition('!')[2].partition(':')
+            column, row = _parse_a1(start)
+            for offset, values in enumerate(entry["values"]):
+                while len(self.rows) <= row + offset:
+                    self.rows.append([])
+                target = self.rows[row + offset]
+                target.extend([""] * (column + len(values) - len(target)))
+                target[column:column + len(values)] = values
+        return _Request({"totalUpdatedCells": sum(len(entry["values"]) for entry in body["data"])})
+
 def patch_google_sheets_reader():
     """
     google_sheets_reader モジュールをモック関数でパッチする
@@ -1,17 +1,89 @@
 import os
+import time
+import hashlib
+import json
 import logging
 import sys
-from typing import Optional, List, Dict, Any, Union
+import threading
+from typing import Optional, List, Dict, Any, Union, Tuple, Iterator
 import google.auth
 from googleapiclient.discovery import build
 from googleapiclient.errors import HttpError
 from google.oauth2 import service_account
 
-from config import SPREADSHEET_ID, SHEET_NAME, CELL_RANGE, GOOGLE_CREDENTIALS_FILE
+from config import (
+    SPREADSHEET_ID,
+    SHEET_NAME,
+    CELL_RANGE,
+    GOOGLE_CREDENTIALS_FILE,
+    SHEETS_WRITE_BATCH_ROWS,
+    SHEETS_WRITE_FLUSH_SECONDS,
+    SHEETS_READ_PAGE_ROWS,
+    SHEETS_FINGERPRINT_RANGE,
+    GOOGLE_TOKEN_CACHE
+)
+from google_token_cache import CachedServiceAccountCredentials
+from transport import google_http
 
 # ロガーの取得
 logger = logging.getLogger("ebay_listing.google_sheets")
 
+# 出品結果を書き戻す列のヘッダー
+RESULT_HEADERS = ['ItemID', 'ListingStatus', 'ListingError']
+
+# 認証済みのAPIクライアント（APIとスコープごとに1つ作成して再利用する）
+_services: Dict[Tuple[str, str, Tuple[str, ...]], Any] = {}
+_services_lock = threading.Lock()
+
+def _get_service(api: str, version: str, scopes: List[str]):
+    """
+    認証済みのGoogle APIクライアントを取得する
+    同じプロセス内では作成済みのクライアントを再利用し、認証とディスカバリー文書の読み込みを1回にする
+
+    Args:
+        api (str): API名（"sheets", "drive"）
+        version (str): APIのバージョン
+        scopes (List[str]): 認証スコープ
+
+    Returns:
+        googleapiclient.discovery.Resource: APIクライアント
+    """
+    key = (api, version, tuple(scopes))
+    with _services_lock:
+        if key not in _services:
+            # サービスアカウントの資格情報を使用して認証
+            logger.debug(f"Google認証情報ファイル '{GOOGLE_CREDENTIALS_FILE}' を使用して認証します")
+            # アクセストークンはディスクに保存して、他のプロセスや次回の実行と共有する
+            credentials_class = (CachedServiceAccountCredentials if GOOGLE_TOKEN_CACHE
+                                 else service_account.Credentials)
+            credentials = credentials_class.from_service_account_file(
+                GOOGLE_CREDENTIALS_FILE,
+                scopes=scopes
+            )
+
+            # APIクライアントを構築
+            logger.debug(f"Google {api} APIクライアントを構築しています")
+            # 送信はeBay APIや画像の転送と共有の接続プールで行う
+            _services[key] = build(api, version, http=google_http(credentials))
+        return _services[key]
+
+def _column_letter(index: int) -> str:
+    """
+    0から始まる列番号をA1形式の列名に変換する
+
+    Args:
+        index (int): 列番号（0から始まる）
+
+    Returns:
+        str: 列名（"A", "Z", "AA" など）
+    """
+    letters = ""
+    index += 1
+    while index:
+        index, remainder = divmod(index - 1, 26)
+        letters = chr(65 + remainder) + letters
+    return letters
+
 def read_cell_value() -> Optional[str]:
     """
     Google Sheetsの指定されたセルから値を読み取る関数
@@ -20,16 +92,7 @@ def read_cell_value() -> Optional[str]:
         Optional[str]: セルの値、エラー時はNone
     """
     try:
-        # サービスアカウントの資格情報を使用して認証
-        logger.debug(f"Google認証情報ファイル '{GOOGLE_CREDENTIALS_FILE}' を使用して認証します")
-        credentials = service_account.Credentials.from_service_account_file(
-            GOOGLE_CREDENTIALS_FILE,
-            scopes=['https://www.googleapis.com/auth/spreadsheets.readonly']
-        )
-
-        # Sheets APIクライアントを構築
-        logger.debug("Google Sheets APIクライアントを構築しています")
-        service = build('sheets', 'v4', credentials=credentials)
+        service = _get_service('sheets', 'v4', ['https://www.googleapis.com/auth/spreadsheets.readonly'])
 
         # 値の範囲を取得するAPI呼び出し
         sheet_range = f'{SHEET_NAME}!{CELL_RANGE}'
@@ -58,7 +121,8 @@ def read_cell_value() -> Optional[str]:
 
 def read_spreadsheet_data(row_index: Optional[int] = None, 
                          sheet_name: Optional[str] = None, 
-                         spreadsheet_id: Optional[str] = None) -> Union[Dict[str, str], List[Dict[str, str]], None]:
+                         spreadsheet_id: Optional[str] = None,
+                         row_range: Optional[Tuple[int, int]] = None) -> Union[Dict[str, str], List[Dict[str, str]], None]:
     """
     Google Sheetsから商品データを読み取る関数
     
@@ -66,6 +130,8 @@ def read_spreadsheet_data(row_index: Optional[int] = None,
         row_index (int, optional): 読み取る行のインデックス。Noneの場合は全行を取得
         sheet_name (str, optional): シート名。Noneの場合はconfig.pyのSHEET_NAMEを使用
         spreadsheet_id (str, optional): スプレッドシートID。Noneの場合はconfig.pyのSPREADSHEET_IDを使用
+        row_range (Tuple[int, int], optional): 読み取る行の範囲（開始, 終了）。両端を含む。
+                                               row_indexが指定された場合は無視される
         
     Returns:
         Union[Dict[str, str], List[Dict[str, str]], None]: 
@@ -75,16 +141,7 @@ def read_spreadsheet_data(row_index: Optional[int] = None,
         sheet_name = sheet_name or SHEET_NAME
         spreadsheet_id = spreadsheet_id or SPREADSHEET_ID
         
-        # サービスアカウントの資格情報を使用して認証
-        logger.debug(f"Google認証情報ファイル '{GOOGLE_CREDENTIALS_FILE}' を使用して認証します")
-        credentials = service_account.Credentials.from_service_account_file(
-            GOOGLE_CREDENTIALS_FILE,
-            scopes=['https://www.googleapis.com/auth/spreadsheets.readonly']
-        )
-
-        # Sheets APIクライアントを構築
-        logger.debug("Google Sheets APIクライアントを構築しています")
-        service = build('sheets', 'v4', credentials=credentials)
+        service = _get_service('sheets', 'v4', ['https://www.googleapis.com/auth/spreadsheets.readonly'])
 
         # 値の範囲を取得するAPI呼び出し
         header_range = f'{sheet_name}!1:1'
@@ -100,10 +157,13 @@ def read_spreadsheet_data(row_index: Optional[int] = None,
             logger.warning('スプレッドシートにヘッダーが見つかりませんでした')
             return None
             
+        last_column = _column_letter(len(headers) - 1)
         if row_index is not None:
-            data_range = f'{sheet_name}!A{row_index+2}:{chr(65+len(headers)-1)}{row_index+2}'
+            data_range = f'{sheet_name}!A{row_index+2}:{last_column}{row_index+2}'
+        elif row_range is not None:
+            data_range = f'{sheet_name}!A{row_range[0]+2}:{last_column}{row_range[1]+2}'
         else:
-            data_range = f'{sheet_name}!A2:{chr(65+len(headers)-1)}'
+            data_range = f'{sheet_name}!A2:{last_column}'
             
         logger.debug(f"スプレッドシート '{spreadsheet_id}' のデータ '{data_range}' を取得します")
         data_result = service.spreadsheets().values().get(
@@ -135,6 +195,321 @@ def read_spreadsheet_data(row_index: Optional[int] = None,
         logger.error(f"エラーが発生しました: {str(e)}")
         return None
 
+def iter_spreadsheet_rows(row_range: Optional[Tuple[int, int]] = None,
+                          page_rows: int = SHEETS_READ_PAGE_ROWS,
+                          sheet_name: Optional[str] = None,
+                          spreadsheet_id: Optional[str] = None) -> Iterator[Tuple[int, Dict[str, str]]]:
+    """
+    Google Sheetsから商品データをページごとに読み込むイテレータ
+    次のページは前のページの行をすべて取り出してから読み込むため、処理が遅れている間はシートの読み込みも止まり、
+    シート全体をメモリに保持しない（read_spreadsheet_data と同じく、途中の空の行は空の値の行として返す）
+    
+    Args:
+        row_range (Tuple[int, int], optional): 読み取る行の範囲（開始, 終了）。両端を含む。Noneの場合は全行
+        page_rows (int): 1回のAPI呼び出しで読み込む行数
+        sheet_name (str, optional): シート名。Noneの場合はconfig.pyのSHEET_NAMEを使用
+        spreadsheet_id (str, optional): スプレッドシートID。Noneの場合はconfig.pyのSPREADSHEET_IDを使用
+        
+    Yields:
+        Tuple[int, Dict[str, str]]: (行番号, 商品データ)
+        
+    Raises:
+        HttpError: Google Sheets APIの呼び出しに失敗した場合（途中のページで失敗した場合も含む）
+    """
+    sheet_name = sheet_name or SHEET_NAME
+    spreadsheet_id = spreadsheet_id or SPREADSHEET_ID
+    
+    service = _get_service('sheets', 'v4', ['https://www.googleapis.com/auth/spreadsheets.readonly'])
+    
+    header_result = service.spreadsheets().values().get(
+        spreadsheetId=spreadsheet_id,
+        range=f'{sheet_name}!1:1'
+    ).execute()
+    headers = header_result.get('values', [[]])[0]
+    if not headers:
+        logger.warning('スプレッドシートにヘッダーが見つかりませんでした')
+        return
+    
+    # 読み込む最後の行（シートの行数を超えて読み込まない）
+    metadata = service.spreadsheets().get(
+        spreadsheetId=spreadsheet_id,
+        ranges=[sheet_name],
+        fields='sheets.properties.gridProperties.rowCount'
+    ).execute()
+    row_count = metadata['sheets'][0]['properties']['gridProperties']['rowCount']
+    first_row = row_range[0] if row_range else 0
+    last_row = row_count - 2
+    if row_range:
+        last_row = min(last_row, row_range[1])
+    
+    last_column = _column_letter(len(headers) - 1)
+    # 末尾の空の行はAPIが返さないため、後のページにデータがあった場合に空の値の行として返す
+    next_unreturned = first_row
+    for page_start in range(first_row, last_row + 1, page_rows):
+        page_end = min(page_start + page_rows - 1, last_row)
+        data_range = f'{sheet_name}!A{page_start+2}:{last_column}{page_end+2}'
+        logger.debug(f"スプレッドシート '{spreadsheet_id}' のデータ '{data_range}' を取得します")
+        values = service.spreadsheets().values().get(
+            spreadsheetId=spreadsheet_id,
+            range=data_range
+        ).execute().get('values', [])
+        if not values:
+            continue
+        
+        for index in range(next_unreturned, page_start):
+            yield index, {header: '' for header in headers}
+        for offset, row in enumerate(values):
+            row_data = row + [''] * (len(headers) - len(row))
+            yield page_start + offset, {headers[i]: row_data[i] for i in range(len(headers))}
+        next_unreturned = page_start + len(values)
+
+def get_sheet_fingerprint(sheet_name: Optional[str] = None,
+                          spreadsheet_id: Optional[str] = None) -> Optional[str]:
+    """
+    スプレッドシートが変更されたかどうかを判定するための軽量な指紋を取得する
+    Drive APIでファイルのバージョンと更新日時を取得し、使えない場合はシート全体
+    （SHEETS_FINGERPRINT_RANGE が指定されていればその範囲）の値のハッシュを使う
+    
+    Args:
+        sheet_name (str, optional): シート名。Noneの場合はconfig.pyのSHEET_NAMEを使用
+        spreadsheet_id (str, optional): スプレッドシートID。Noneの場合はconfig.pyのSPREADSHEET_IDを使用
+        
+    Returns:
+        Optional[str]: 指紋。取得できなかった場合はNone。
+    """
+    sheet_name = sheet_name or SHEET_NAME
+    spreadsheet_id = spreadsheet_id or SPREADSHEET_ID
+    
+    try:
+        drive = _get_service('drive', 'v3', ['https://www.googleapis.com/auth/drive.metadata.readonly'])
+        metadata = drive.files().get(
+            fileId=spreadsheet_id,
+            fields='version,modifiedTime',
+            supportsAllDrives=True
+        ).execute()
+        return f"drive:{metadata.get('version')}:{metadata.get('modifiedTime')}"
+    except Exception as e:
+        logger.debug(f"Drive APIで更新日時を取得できませんでした。範囲のハッシュを使用します: {str(e)}")
+    
+    # 範囲が指定されていない場合は、読み込む範囲と同じシート全体の値を使う
+    fingerprint_range = f'{sheet_name}!{SHEETS_FINGERPRINT_RANGE}' if SHEETS_FINGERPRINT_RANGE else sheet_name
+    try:
+        service = _get_service('sheets', 'v4', ['https://www.googleapis.com/auth/spreadsheets.readonly'])
+        result = service.spreadsheets().values().get(
+            spreadsheetId=spreadsheet_id,
+            range=fingerprint_range
+        ).execute()
+        digest = hashlib.sha256(
+            json.dumps(result.get('values', []), ensure_ascii=False).encode('utf-8')
+        ).hexdigest()
+        return f"range:{fingerprint_range}:{digest}"
+    except Exception as e:
+        logger.warning(f"スプレッドシートの指紋を取得できませんでした: {str(e)}")
+        return None
+
+class SheetResultWriter:
+    """
+    出品結果をスプレッドシートに書き戻すクラス
+    結果をメモリに溜め、一定の行数または一定の時間ごとに values().batchUpdate でまとめて書き込む
+    """
+
+    def __init__(self,
+                 sheet_name: Optional[str] = None,
+                 spreadsheet_id: Optional[str] = None,
+                 batch_rows: int = SHEETS_WRITE_BATCH_ROWS,
+                 flush_seconds: float = SHEETS_WRITE_FLUSH_SECONDS,
+                 targets: Optional[List[str]] = None):
+        """
+        初期化
+
+        Args:
+            sheet_name (str, optional): シート名。Noneの場合はconfig.pyのSHEET_NAMEを使用
+            spreadsheet_id (str, optional): スプレッドシートID。Noneの場合はconfig.pyのSPREADSHEET_IDを使用
+            batch_rows (int): この行数の結果が溜まったら書き込む
+            flush_seconds (float): 前回の書き込みからこの秒数が経過したら書き込む
+            targets (List[str], optional): 出品先の表示名。複数の場合は出品先ごとの結果を1つのセルにまとめる
+        """
+        self.sheet_name = sheet_name or SHEET_NAME
+        self.spreadsheet_id = spreadsheet_id or SPREADSHEET_ID
+        self.batch_rows = batch_rows
+        self.flush_seconds = flush_seconds
+        self.targets = targets or []
+        self.pending: Dict[int, List[str]] = {}
+        self._partial: Dict[int, Dict[str, Dict[str, Any]]] = {}
+        self._columns: Optional[List[int]] = None
+        self._header_missing: List[int] = []
+        self._last_flush = time.monotonic()
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._service = None
+
+    def _get_service(self):
+        """
+        書き込み権限付きのSheets APIクライアントを取得する
+        """
+        if self._service is None:
+            self._service = _get_service('sheets', 'v4', ['https://www.googleapis.com/auth/spreadsheets'])
+        return self._service
+
+    def _resolve_columns(self) -> List[int]:
+        """
+        結果を書き込む列を決める
+        ヘッダー行に RESULT_HEADERS があればその列を使い、なければ最後の列の後ろに追加する
+
+        Returns:
+            List[int]: RESULT_HEADERS の各列の列番号（0から始まる）
+        """
+        if self._columns is None:
+            header_result = self._get_service().spreadsheets().values().get(
+                spreadsheetId=self.spreadsheet_id,
+                range=f'{self.sheet_name}!1:1'
+            ).execute()
+            headers = header_result.get('values', [[]])[0]
+
+            columns = []
+            next_column = len(headers)
+            for name in RESULT_HEADERS:
+                if name in headers:
+                    columns.append(headers.index(name))
+                else:
+                    columns.append(next_column)
+                    self._header_missing.append(next_column)
+                    next_column += 1
+            self._columns = columns
+        return self._columns
+
+    def add(self, row_index: int, result: Dict[str, Any], target: Optional[str] = None) -> None:
+        """
+        1行分の出品結果を追加する
+
+        Args:
+            row_index (int): スプレッドシートの行番号（0から始まる）
+            result (Dict[str, Any]): process_item_detailed の戻り値
+            target (str, optional): 出品先の表示名（複数の出品先に出品する場合）
+        """
+        with self._lock:
+            if len(self.targets) > 1:
+                partial = self._partial.setdefault(row_index, {})
+                partial[target] = result
+                if len(partial) < len(self.targets):
+                    return
+                del self._partial[row_index]
+                self.pending[row_index] = self._format_row(
+                    [(name, partial[name]) for name in self.targets if name in partial]
+                )
+            else:
+                self.pending[row_index] = self._format_row([(None, result)])
+
+            due = (len(self.pending) >= self.batch_rows or
+                   time.monotonic() - self._last_flush >= self.flush_seconds)
+
+        if due:
+            self.flush()
+
+    @staticmethod
+    def _format_row(results: List[tuple]) -> List[str]:
+        """
+        出品結果をセルの値に変換する
+
+        Args:
+            results (List[tuple]): (出品先の表示名, 出品結果) のリスト
+
+        Returns:
+            List[str]: RESULT_HEADERS の順に並べたセルの値
+        """
+        cells = [[], [], []]
+        for target, result in results:
+            values = [
+                result.get("item_id") or "",
+                "success" if result.get("success") else "failure",
+                result.get("error") or ""
+            ]
+            for cell, value in zip(cells, values):
+                cell.append(f"{target}: {value}" if target else value)
+        return ["\n".join(cell) for cell in cells]
+
+    def flush(self) -> bool:
+        """
+        溜まっている結果を1回の batchUpdate で書き込む
+        連続した行は1つの範囲にまとめる。書き込みに失敗した結果は次回の書き込みで再送する
+
+        Returns:
+            bool: 書き込みに成功した（または書き込むものがなかった）場合はTrue
+        """
+        with self._flush_lock:
+            return self._flush()
+
+    def _flush(self) -> bool:
+        with self._lock:
+            if not self.pending:
+                self._last_flush = time.monotonic()
+                return True
+            pending = dict(sorted(self.pending.items()))
+            self.pending = {}
+
+        try:
+            columns = self._resolve_columns()
+            data = []
+
+            if self._header_missing:
+                for column, name in zip(columns, RESULT_HEADERS):
+                    if column in self._header_missing:
+                        data.append({
+                            'range': f'{self.sheet_name}!{_column_letter(column)}1',
+                            'values': [[name]]
+                        })
+
+            rows = list(pending)
+            start = 0
+            while start < len(rows):
+                end = start
+                while end + 1 < len(rows) and rows[end + 1] == rows[end] + 1:
+                    end += 1
+                block = rows[start:end + 1]
+                for offset, column in enumerate(columns):
+                    cell_range = (f'{self.sheet_name}!{_column_letter(column)}{block[0] + 2}:'
+                                  f'{_column_letter(column)}{block[-1] + 2}')
+                    data.append({
+                        'range': cell_range,
+                        'values': [[pending[row][offset]] for row in block]
+                    })
+                start = end + 1
+
+            self._get_service().spreadsheets().values().batchUpdate(
+                spreadsheetId=self.spreadsheet_id,
+                body={'valueInputOption': 'RAW', 'data': data}
+            ).execute()
+
+            self._header_missing = []
+            logger.info(f"出品結果 {len(pending)} 行をスプレッドシートに書き込みました")
+            return True
+
+        except Exception as e:
+            logger.error(f"出品結果の書き込みに失敗しました（次回の書き込みで再送します）: {str(e)}")
+            with self._lock:
+                for row, values in pending.items():
+                    self.pending.setdefault(row, values)
+            return False
+
+        finally:
+            self._last_flush = time.monotonic()
+
+    def close(self) -> bool:
+        """
+        残りの結果を書き込む
+
+        Returns:
+            bool: 書き込みに成功した場合はTrue
+        """
+        with self._lock:
+            # 一部の出品先の結果しかない行もここで書き込む
+            for row_index, partial in self._partial.items():
+                self.pending[row_index] = self._format_row(
+                    [(name, partial[name]) for name in self.targets if name in partial]
+                )
+            self._partial = {}
+        return self.flush()
+
 if __name__ == "__main__":
     # テスト用コード
     # ログ設定
@@ -0,0 +1,64 @@
+import time
+import logging
+from datetime import datetime, timedelta, timezone
+from typing import Optional, Dict, Any
+
+from google.oauth2 import service_account
+
+from file_lock import FileLock
+from state_store import load_state, save_state, state_path
+
+logger = logging.getLogger("ebay_listing.google_token_cache")
+
+# アクセストークンを保存する状態の名前（一時ファイルから置き換えるため、ファイルの権限は所有者のみ読み書き可）
+TOKEN_CACHE_STATE = "google_tokens"
+# 有効期限までこの秒数を切った保存済みのトークンは使わずに取得し直す
+TOKEN_REFRESH_MARGIN_SECONDS = 300
+
+class CachedServiceAccountCredentials(service_account.Credentials):
+    """
+    アクセストークンをディスクに保存して、プロセス・実行の間で共有するサービスアカウントの資格情報
+    有効期限が十分に残っている保存済みのトークンがあれば、トークンの取得（JWTの交換）を行わずにそれを使う
+    取得と保存はファイルロックで排他するため、同時に起動したワーカーもトークンを1回だけ取得する
+    """
+
+    def _cache_key(self) -> str:
+        scopes = " ".join(sorted(self._scopes or []))
+        return f"{self.service_account_email}|{self._subject or ''}|{scopes}"
+
+    def _load_cached(self, tokens: Dict[str, Any]) -> bool:
+        entry = tokens.get(self._cache_key())
+        if not entry or entry["expires_at"] - time.time() < TOKEN_REFRESH_MARGIN_SECONDS:
+            return False
+        self.token = entry["token"]
+        # google-auth は有効期限をタイムゾーンなしのUTCで扱う
+        self.expiry = datetime.fromtimestamp(entry["expires_at"], tz=timezone.utc).replace(tzinfo=None)
+        return True
+
+    def refresh(self, request) -> None:
+        """
+        アクセストークンを取得する（保存済みのトークンが使える場合はそれを使う）
+
+        Args:
+            request (google.auth.transport.Request): HTTPリクエストを送る関数
+        """
+        with FileLock(state_path(TOKEN_CACHE_STATE) + ".lock"):
+            tokens = load_state(TOKEN_CACHE_STATE, {})
+            if self._load_cached(tokens):
+                logger.debug(f"保存済みのGoogleのアクセストークンを使用します: {self.service_account_email}")
+                return
+
+            super().refresh(request)
+            logger.debug(f"Googleのアクセストークンを取得しました: {self.service_account_email}")
+
+            now = time.time()
+            expires_at = self._expires_at()
+            tokens = {key: entry for key, entry in tokens.items() if entry["expires_at"] > now}
+            if expires_at is not None:
+                tokens[self._cache_key()] = {"token": self.token, "expires_at": expires_at}
+            save_state(TOKEN_CACHE_STATE, tokens)
+
+    def _expires_at(self) -> Optional[float]:
+        if self.expiry is None:
+            return None
+        return (self.expiry - datetime(1970, 1, 1)) / timedelta(seconds=1)
@@ -0,0 +1,294 @@
+import os
+import json
+import atexit
+import time
+import hashlib
+import logging
+import tempfile
+import threading
+from collections import Counter
+from typing import Optional, Dict, Any, Iterable, List
+
+from config import IMAGE_CACHE_DIR, IMAGE_CACHE_MAX_BYTES
+from file_lock import FileLock
+
+logger = logging.getLogger("ebay_listing.image_cache")
+
+INDEX_FILE = "index.json"
+LOCK_FILE = ".lock"
+# この秒数以内に使われた画像は、アップロード中の可能性があるため容量を超えていても削除しない
+EVICTION_GRACE_SECONDS = 300
+# 索引の最終使用日時がこの秒数より古い画像をキャッシュから使ったときは、すぐに索引に書き込む
+# （他のプロセスに削除されないようにする。新しいものはまとめて書き込む）
+TOUCH_WRITE_SECONDS = EVICTION_GRACE_SECONDS // 2
+
+class ImageCache:
+    """
+    ダウンロードした画像のディスクキャッシュ
+    URLごとに1ファイルを保存し、索引（index.json）でサイズと最終使用日時を管理する
+    合計サイズが上限を超えたら、最後に使われた日時が古いものから削除する（ピン留めされた画像は削除しない）
+    索引の更新はファイルロックで排他するため、複数のワーカープロセスから同時に使える
+    """
+
+    def __init__(self, directory: str = IMAGE_CACHE_DIR, max_bytes: int = IMAGE_CACHE_MAX_BYTES):
+        """
+        初期化
+
+        Args:
+            directory (str): キャッシュのディレクトリ
+            max_bytes (int): キャッシュの合計サイズの上限（バイト）。0の場合は上限なし
+        """
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.index_path = os.path.join(directory, INDEX_FILE)
+        self._file_lock = FileLock(os.path.join(directory, LOCK_FILE))
+        self._lock = threading.Lock()
+        self._entries: Dict[str, Dict[str, Any]] = self._read_index()
+        # 前回の索引の書き込み以降にキャッシュから使った画像の最終使用日時
+        self._touched: Dict[str, float] = {}
+
+    @staticmethod
+    def key(url: str) -> str:
+        """
+        URLからキャッシュのキーを作る
+
+        Args:
+            url (str): 画像のURL
+
+        Returns:
+            str: キー
+        """
+        return hashlib.sha256(url.encode('utf-8')).hexdigest()
+
+    def _read_index(self) -> Dict[str, Dict[str, Any]]:
+        if not os.path.exists(self.index_path):
+            return {}
+        try:
+            with open(self.index_path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError) as e:
+            logger.warning(f"画像キャッシュの索引を読み込めませんでした。作り直します: {str(e)}")
+            return {}
+
+    def _write_index(self, entries: Dict[str, Dict[str, Any]]) -> None:
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, prefix=".index.", suffix=".tmp")
+        try:
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                json.dump(entries, f)
+            os.replace(tmp_path, self.index_path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+
+    def get(self, url: str) -> Optional[str]:
+        """
+        キャッシュされた画像のパスを返す
+
+        Args:
+            url (str): 画像のURL
+
+        Returns:
+            Optional[str]: 画像のパス。キャッシュにない場合はNone。
+        """
+        key = self.key(url)
+        with self._lock:
+            entry = self._entries.get(key)
+        if entry is None:
+            # 他のプロセスが保存した画像かもしれないので、索引を読み直す
+            with self._file_lock:
+                entries = self._read_index()
+            with self._lock:
+                self._entries = entries
+                entry = entries.get(key)
+            if entry is None:
+                return None
+
+        path = os.path.join(self.directory, entry["file"])
+        if not os.path.exists(path):
+            with self._lock:
+                self._entries.pop(key, None)
+            return None
+
+        now = time.time()
+        with self._lock:
+            self._touched[key] = now
+        if now - entry["last_used"] >= TOUCH_WRITE_SECONDS:
+            # 他のプロセスの put() で削除されないように、使ったことを索引に反映する
+            self._update_index({})
+            if not os.path.exists(path):
+                return None
+        return path
+
+    def put(self, url: str, chunks: Iterable[bytes], extension: str = ".jpg") -> str:
+        """
+        画像をキャッシュに保存する
+        一時ファイルに書き込んでから置き換えるため、他のワーカーが書き込み途中のファイルを読むことはない
+
+        Args:
+            url (str): 画像のURL
+            chunks (Iterable[bytes]): 画像のデータ
+            extension (str): 保存するファイルの拡張子
+
+        Returns:
+            str: 保存した画像のパス
+        """
+        os.makedirs(self.directory, exist_ok=True)
+        key = self.key(url)
+        filename = key + extension
+        path = os.path.join(self.directory, filename)
+
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, prefix=".download.", suffix=".tmp")
+        size = 0
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                for chunk in chunks:
+                    if chunk:
+                        f.write(chunk)
+                        size += len(chunk)
+            os.replace(tmp_path, path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+
+        self._update_index({key: {"file": filename, "size": size, "last_used": time.time()}}, keep=key)
+        return path
+
+    def _update_index(self, added: Dict[str, Dict[str, Any]], keep: Optional[str] = None) -> None:
+        """
+        索引に追加・最終使用日時を反映し、上限を超えた分を削除して書き込む
+
+        Args:
+            added (Dict[str, Dict[str, Any]]): 追加するエントリ
+            keep (str, optional): 削除しないキー（今保存した画像）
+        """
+        with self._lock:
+            touched, self._touched = self._touched, {}
+
+        with self._file_lock:
+            entries = self._read_index()
+            entries.update(added)
+            for key, last_used in touched.items():
+                if key in entries:
+                    entries[key]["last_used"] = max(entries[key]["last_used"], last_used)
+
+            for key in self._select_evictions(entries, keep):
+                entry = entries.pop(key)
+                try:
+                    os.remove(os.path.join(self.directory, entry["file"]))
+                except FileNotFoundError:
+                    pass
+                logger.debug(f"画像キャッシュから削除しました: {entry['file']}")
+
+            self._write_index(entries)
+
+        with self._lock:
+            self._entries = entries
+
+    def _select_evictions(self, entries: Dict[str, Dict[str, Any]], keep: Optional[str]) -> List[str]:
+        """
+        合計サイズが上限以下になるまで、最終使用日時が古いものから削除するキーを選ぶ
+
+        Args:
+            entries (Dict[str, Dict[str, Any]]): 索引のエントリ
+            keep (str, optional): 削除しないキー
+
+        Returns:
+            List[str]: 削除するキー
+        """
+        if not self.max_bytes:
+            return []
+
+        total = sum(entry["size"] for entry in entries.values())
+        if total <= self.max_bytes:
+            return []
+
+        now = time.time()
+        evictions = []
+        for key, entry in sorted(entries.items(), key=lambda item: item[1]["last_used"]):
+            if total <= self.max_bytes:
+                break
+            if (key == keep or now - entry["last_used"] < EVICTION_GRACE_SECONDS
+                    or is_pinned(os.path.join(self.directory, entry["file"]))):
+                continue
+            evictions.append(key)
+            total -= entry["size"]
+        return evictions
+
+    def flush(self) -> None:
+        """
+        キャッシュから使った画像の最終使用日時を索引に書き込む
+        """
+        with self._lock:
+            if not self._touched:
+                return
+        self._update_index({})
+
+# 処理中の行が使っている画像（パスごとの参照数）。このプロセスのキャッシュは猶予期間を過ぎても削除しない
+_pinned: Counter = Counter()
+_pinned_lock = threading.Lock()
+
+def pin_images(paths: Iterable[str]) -> None:
+    """
+    画像を使い終わるまでキャッシュから削除されないようにする（unpin_images と対にして呼び出す）
+    前処理した行がアップロードを待っている間に、他の行のダウンロードで削除されないようにするために使う
+    ピン留めはプロセス内だけで有効（他のワーカープロセスのキャッシュは猶予期間だけを守る）
+
+    Args:
+        paths (Iterable[str]): 画像のパス
+    """
+    with _pinned_lock:
+        _pinned.update(os.path.abspath(path) for path in paths)
+
+def unpin_images(paths: Iterable[str]) -> None:
+    """
+    pin_images でピン留めした画像を解放する
+
+    Args:
+        paths (Iterable[str]): 画像のパス
+    """
+    with _pinned_lock:
+        _pinned.subtract(os.path.abspath(path) for path in paths)
+        for path in [path for path, count in _pinned.items() if count <= 0]:
+            del _pinned[path]
+
+def is_pinned(path: str) -> bool:
+    """
+    画像がピン留めされているかどうか
+
+    Args:
+        path (str): 画像のパス
+
+    Returns:
+        bool: ピン留めされている場合はTrue
+    """
+    with _pinned_lock:
+        return _pinned[os.path.abspath(path)] > 0
+
+_caches: Dict[str, ImageCache] = {}
+_caches_lock = threading.Lock()
+
+def get_image_cache(directory: str = IMAGE_CACHE_DIR) -> ImageCache:
+    """
+    ディレクトリごとのキャッシュを取得する（プロセス内で共有する）
+
+    Args:
+        directory (str): キャッシュのディレクトリ
+
+    Returns:
+        ImageCache: 画像キャッシュ
+    """
+    with _caches_lock:
+        if directory not in _caches:
+            cache = ImageCache(directory)
+            # キャッシュから使った画像の最終使用日時を終了時に書き込む
+            atexit.register(_flush_quietly, cache)
+            _caches[directory] = cache
+        return _caches[directory]
+
+def _flush_quietly(cache: ImageCache) -> None:
+    try:
+        cache.flush()
+    except Exception as e:
+        logger.warning(f"画像キャッシュの索引を更新できませんでした: {str(e)}")
@@ -11,28 +11,85 @@ import sys
 import logging
 import time
 import argparse
-from typing import Optional, List, Dict, Any, Union
+import itertools
+from typing import Optional, List, Dict, Any, Union, Tuple, Iterable, Callable
 from dotenv import load_dotenv
 
-from ebay_env import EbayEnvironment
-from google_sheets_reader import read_spreadsheet_data
+from ebay_env import EbayEnvironment, RateLimiter
+from config import (
+    SPREADSHEET_ID,
+    SHEET_NAME,
+    EBAY_FANOUT_TARGETS,
+    EBAY_LISTING_DEFAULTS,
+    CATEGORY_CLASSIFIER_MIN_CONFIDENCE,
+    PICTURE_URL_POLICY,
+    PICTURE_URL_DEFAULT_MODE,
+    IMAGE_CONCURRENCY_PER_ITEM,
+    IMAGE_STREAM_UPLOAD,
+    IMAGE_PENDING_MAX_BYTES,
+    MAX_ITEMS_IN_FLIGHT,
+    SHEETS_READ_PAGE_ROWS,
+    WATCH_INTERVAL_SECONDS,
+    WATCH_RETRY_SECONDS
+)
+from google_sheets_reader import (
+    read_spreadsheet_data,
+    iter_spreadsheet_rows,
+    get_sheet_fingerprint,
+    SheetResultWriter,
+    RESULT_HEADERS
+)
 from ebay_lister import (
     list_item_on_ebay, 
     get_suggested_category, 
-    upload_image_to_ebay
+    upload_image_to_ebay,
+    upload_external_picture,
+    upload_image_stream,
+    get_categories,
+    build_item_payload
 )
+from category_aspects import get_aspect_cache, apply_category_aspects
+from seller_profiles import SELLER_PROFILE_COLUMN, resolve_seller_profile, get_seller_profiles
+from category_index import get_category_classifier, save_category_tree
+from feed_export import FeedWriter, validate_feed
+from utils import map_in_order
+from picture_policy import PICTURE_MODES, parse_picture_policy, picture_mode
+from profiler import RunProfiler, stage, snapshot, profile_output_prefix
+from checkpoint import CheckpointJournal, checkpoint_path
+from dead_letter import DeadLetterQueue, ERROR_CLASS_NAMES, get_dead_letter_queue
+from sharding import parse_shard, parse_rows, select_shard, write_summary, run_coordinator
+from fanout import parse_targets, fan_out
+from backpressure import ByteBudget
+from state_store import load_state, save_state, state_path
+from file_lock import FileLock
+from image_cache import pin_images, unpin_images
+from token_check import check_token
+from traffic import merge_traffic, log_traffic
+from file_reader import iter_file_rows
+from watcher import StopSignal, until_stopped, ListingIndex
+from duplicates import DEDUPE_MODES, dedupe_rows, parse_quantity
+from scheduler import ORDERS, PRIORITY_COLUMN, DEADLINE_COLUMN, WorkBudget, order_items
+
+LOG_FILE = "ebay_listing.log"
 
 # ロガー設定
 logging.basicConfig(
     level=logging.INFO,
     format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
     handlers=[
-        logging.FileHandler("ebay_listing.log", encoding='utf-8'),
+        logging.FileHandler(LOG_FILE, encoding='utf-8'),
         logging.StreamHandler(stream=sys.stdout)
     ]
 )
 logger = logging.getLogger("ebay_listing")
 
+# Item Specificsとして扱わない列
+RESERVED_COLUMNS = ['Item name', 'image', 'Description', 'Price', 'Quantity', 'CategoryID',
+                    SELLER_PROFILE_COLUMN, PRIORITY_COLUMN, DEADLINE_COLUMN] + RESULT_HEADERS
+
+# 1商品の出品（AddItem）を試行する最大回数
+LISTING_MAX_RETRIES = 2
+
 def setup_environment() -> bool:
     """
     環境設定を行う関数
@@ -71,7 +128,7 @@ def setup_environment() -> bool:
 
 
 
-def process_item(item_data: Dict[str, str], ebay_env: EbayEnvironment, max_retries: int = 2) -> bool:
+def process_item(item_data: Dict[str, str], ebay_env: EbayEnvironment, max_retries: int = LISTING_MAX_RETRIES) -> bool:
     """
     eBayに商品を出品する関数
     
@@ -83,61 +140,306 @@ def process_item(item_data: Dict[str, str], ebay_env: EbayEnvironment, max_retri
     Returns:
         bool: 出品が成功したかどうか
     """
-    title = item_data.get('Item name')  # Column A header is "Item name"
-    if not title:
-        logger.error("商品タイトルがありません")
-        return False
+    return process_item_detailed(item_data, ebay_env, max_retries)["success"]
+
+def split_image_refs(item_data: Dict[str, str]) -> List[str]:
+    """
+    image列のカンマ区切りの画像URL/パスを分割する関数
+    
+    Args:
+        item_data (dict): 商品データ
+        
+    Returns:
+        List[str]: 画像URL/パス
+    """
+    image_ref = item_data.get('image')  # Column B header is "image"
+    if not image_ref:
+        return []
+    return [ref.strip() for ref in image_ref.split(',') if ref.strip()]
+
+def estimate_calls(item_data: Dict[str, str], ebay_env: Optional[EbayEnvironment] = None) -> int:
+    """
+    1行の出品に必要なTrading APIの呼び出し回数を多めに見積もる関数（--call-budget の判定に使う）
+    
+    Args:
+        item_data (dict): 商品データ
+        ebay_env (EbayEnvironment, optional): 出品先。指定した場合はItem Specificsの定義のキャッシュを確認する
         
+    Returns:
+        int: AddItem（リトライを含む）、カテゴリの提案（CategoryIDが空の場合）、
+             Item Specificsの定義の取得（キャッシュにない場合）、画像のアップロード
+             （URLから取得させる・ストリームで転送する画像は、失敗したときのアップロードし直しを含む）の合計
+    """
+    calls = LISTING_MAX_RETRIES
     category_id = item_data.get('CategoryID')
     if not category_id:
-        logger.info(f"カテゴリIDの自動取得を試みます: '{title}'")
-        category_id = get_suggested_category(title, ebay_env)
-        if not category_id:
-            logger.warning("カテゴリIDの自動取得に失敗しました。デフォルト値を使用します。")
+        calls += 1
+    if not category_id or ebay_env is None or get_aspect_cache(ebay_env.env_type).cached(category_id) is None:
+        calls += 1
+    for ref in split_image_refs(item_data):
+        if not ref.startswith(('http://', 'https://')):
+            calls += 1
+            continue
+        mode = picture_mode(ref)
+        if mode == "external" or (mode == "download" and IMAGE_STREAM_UPLOAD):
+            calls += 2
+        elif mode == "download":
+            calls += 1
+    return calls
+
+def prepare_item(item_data: Dict[str, str], fetch_images: bool = True, stream_images: bool = True) -> Dict[str, Any]:
+    """
+    出品先のアカウントに依存しない前処理を行う関数
+    項目の解析と画像の取得を行い、複数のアカウントへ出品する場合でも1回だけ実行すればよいようにする
     
+    Args:
+        item_data (dict): 商品データ
+        fetch_images (bool): 画像を取得するかどうか。Falseの場合は pictures を空にする
+        stream_images (bool): IMAGE_STREAM_UPLOAD が有効な場合に、画像をダウンロードせずにアップロード時にストリームで転送するかどうか
+                              複数の出品先で画像を共有する場合はFalseにする（出品先ごとにダウンロードし直さないため）
+        
+    Returns:
+        Dict[str, Any]: 前処理の結果
+            - title (str): 商品タイトル
+            - category_id (str): シートで指定されたカテゴリID（未指定の場合はNone）
+            - seller_profile (str): シートで指定された出品プロファイルの名前（未指定の場合はNone）
+            - quantity (int): シートで指定された数量（未指定の場合はNone）
+            - item_specifics (List[Dict[str, str]]): Item Specifics
+            - pictures (List[Dict[str, str]]): 出品に使う画像（image列の順）
+              mode が "upload" の場合は path（ローカルパス）、"direct" / "external" / "stream" の場合は url（画像URL）を持つ
+            - image_bytes (int): pictures のうちディスクにある画像の合計サイズ（バイト）
+    """
     item_specifics = []
     for key, value in item_data.items():
-        if key not in ['Item name', 'image', 'Description', 'Price', 'Quantity', 'CategoryID'] and value:
+        if key not in RESERVED_COLUMNS and value:
             item_specifics.append({"Name": key, "Value": value})
     
-    picture_urls = []
-    image_ref = item_data.get('image')  # Column B header is "image"
-    if image_ref:
-        for ref in image_ref.split(','):
-            ref = ref.strip()
-            if not ref:
-                continue
-                
-            if ref.startswith(('http://', 'https://')):
-                from utils import download_image_from_url
-                image_path = download_image_from_url(ref)
+    pictures = []
+    if fetch_images:
+        # 画像は並行してダウンロードし、image列の順序を保つ
+        prepared_pictures = map_in_order(lambda ref: prepare_picture(ref, stream=stream_images),
+                                         split_image_refs(item_data), IMAGE_CONCURRENCY_PER_ITEM)
+        pictures = [picture for picture in prepared_pictures if picture]
+    image_bytes = sum(os.path.getsize(picture["path"]) for picture in pictures
+                      if picture["mode"] == "upload" and os.path.exists(picture["path"]))
+    
+    return {
+        "title": item_data.get('Item name'),  # Column A header is "Item name"
+        "category_id": item_data.get('CategoryID') or None,
+        "seller_profile": item_data.get(SELLER_PROFILE_COLUMN) or None,
+        "quantity": parse_quantity(item_data.get('Quantity')),
+        "item_specifics": item_specifics,
+        "pictures": pictures,
+        "image_bytes": image_bytes
+    }
+
+def upload_paths(prepared: Dict[str, Any]) -> List[str]:
+    """
+    前処理の結果のうち、ディスクからアップロードする画像のパスを取得する関数
+    
+    Args:
+        prepared (Dict[str, Any]): prepare_item の結果
+        
+    Returns:
+        List[str]: 画像のパス
+    """
+    return [picture["path"] for picture in prepared["pictures"] if picture["mode"] == "upload"]
+
+def prepare_picture(ref: str, stream: bool = True) -> Optional[Dict[str, str]]:
+    """
+    image列の1つの画像URL/パスを、出品に使える形に準備する関数
+    
+    Args:
+        ref (str): 画像URLまたはローカルパス
+        stream (bool): IMAGE_STREAM_UPLOAD が有効な場合に、キャッシュにない画像をアップロード時にストリームで転送するかどうか
+        
+    Returns:
+        Optional[Dict[str, str]]: prepare_item の pictures の要素。画像を取得できなかった場合はNone。
+    """
+    if ref.startswith(('http://', 'https://')):
+        # ホストごとの設定により、ダウンロードせずにURLのまま使う
+        mode = picture_mode(ref)
+        if mode != "download":
+            return {"mode": mode, "url": ref}
+        from utils import download_image_from_url
+        if IMAGE_STREAM_UPLOAD and stream:
+            # キャッシュにない画像は一時ファイルに保存せず、アップロード時にダウンロードしながら転送する
+            from image_cache import get_image_cache
+            cached_path = get_image_cache().get(ref)
+            if cached_path:
+                return {"mode": "upload", "path": cached_path}
+            return {"mode": "stream", "url": ref}
+        with stage("image_download"):
+            image_path = download_image_from_url(ref)
+    else:
+        image_path = ref
+        
+    if image_path and os.path.exists(image_path):
+        return {"mode": "upload", "path": image_path}
+    return None
+
+def upload_picture(picture: Dict[str, str], ebay_env: EbayEnvironment) -> Optional[str]:
+    """
+    prepare_item で準備した画像を出品に使えるURLにする関数
+    eBayにURLから取得させられなかった場合や、ストリームで転送できなかった場合は、ダウンロードしてアップロードする
+    
+    Args:
+        picture (Dict[str, str]): prepare_item の pictures の要素
+        ebay_env (EbayEnvironment): eBay環境オブジェクト
+        
+    Returns:
+        Optional[str]: 出品に使う画像URL。失敗した場合はNone。
+    """
+    if picture["mode"] == "direct":
+        return picture["url"]
+    
+    if picture["mode"] in ("external", "stream"):
+        with stage("image_upload"):
+            if picture["mode"] == "external":
+                ebay_image_url = upload_external_picture(picture["url"], ebay_env)
             else:
-                image_path = ref
-                
-            if image_path and os.path.exists(image_path):
-                ebay_image_url = upload_image_to_ebay(image_path, ebay_env)
-                if ebay_image_url:
-                    picture_urls.append(ebay_image_url)
+                ebay_image_url = upload_image_stream(picture["url"], ebay_env)
+        if ebay_image_url:
+            return ebay_image_url
+        
+        if picture["mode"] == "external":
+            logger.warning(f"eBayが画像URLを取得できなかったため、ダウンロードしてアップロードします: {picture['url']}")
+        else:
+            logger.warning(f"画像をストリームで転送できなかったため、ダウンロードしてアップロードします: {picture['url']}")
+        from utils import download_image_from_url
+        with stage("image_download"):
+            image_path = download_image_from_url(picture["url"])
+        if not image_path:
+            return None
+        picture = {"mode": "upload", "path": image_path}
+    
+    with stage("image_upload"):
+        return upload_image_to_ebay(picture["path"], ebay_env)
+
+def process_item_detailed(item_data: Dict[str, str],
+                          ebay_env: EbayEnvironment,
+                          max_retries: int = LISTING_MAX_RETRIES,
+                          picture_urls: Optional[List[str]] = None,
+                          prepared: Optional[Dict[str, Any]] = None,
+                          item_id: Optional[str] = None) -> Dict[str, Any]:
+    """
+    eBayに商品を出品し、処理結果の詳細を返す関数
+    item_id を指定した場合は、新しく出品せずにReviseItemで既存の出品を更新する
+    
+    Args:
+        item_data (dict): 商品データ
+        ebay_env (EbayEnvironment): eBay環境オブジェクト
+        max_retries (int): 最大リトライ回数
+        picture_urls (List[str], optional): アップロード済みの画像URL。指定された場合は画像のアップロードを省略する。
+        prepared (Dict[str, Any], optional): prepare_item の結果。Noneの場合はこの関数内で前処理を行う。
+        item_id (str, optional): 更新する出品のアイテムID
+        
+    Returns:
+        Dict[str, Any]: 処理結果
+            - success (bool): 出品が成功したかどうか
+            - item_id (str): 出品されたアイテムID（失敗時はNone。更新の場合は失敗時も更新する出品のID）
+            - picture_urls (List[str]): eBayにアップロードした画像URL
+            - error (str): 最後のエラーメッセージ（成功時はNone）
+            - attempts (int): 出品を試行した回数
+    """
+    result = {"success": False, "item_id": item_id, "picture_urls": [], "error": None, "attempts": 0}
+    
+    if prepared is None:
+        prepared = prepare_item(item_data, fetch_images=picture_urls is None)
+    
+    title = prepared["title"]
+    if not title:
+        logger.error("商品タイトルがありません")
+        result["error"] = "商品タイトルがありません"
+        return result
+        
+    # 出品プロファイルは出品先のアカウントごとに解決する
+    try:
+        seller_profile = resolve_seller_profile(prepared.get("seller_profile"), ebay_env.prefix)
+    except ValueError as e:
+        logger.error(f"設定エラー: {str(e)}")
+        result["error"] = f"設定エラー: {str(e)}"
+        return result
+    
+    category_id = prepared["category_id"]
+    # 出品履歴に記録するのは、シートで指定されたカテゴリとeBayが提案したカテゴリだけにする
+    learn_category = bool(category_id)
+    if not category_id:
+        logger.info(f"カテゴリIDの自動取得を試みます: '{title}'")
+        classifier = get_category_classifier(ebay_env.env_type)
+        with stage("category"):
+            category_id, confidence = classifier.classify(title)
+        if category_id and confidence >= CATEGORY_CLASSIFIER_MIN_CONFIDENCE:
+            logger.info(f"ローカルのカテゴリ分類で推定したカテゴリID: {category_id} (確信度: {confidence:.2f})")
+        else:
+            with stage("category"):
+                category_id = get_suggested_category(title, ebay_env)
+            learn_category = bool(category_id)
+        if not category_id:
+            logger.warning("カテゴリIDの自動取得に失敗しました。デフォルト値を使用します。")
+    
+    item_specifics = prepared["item_specifics"]
+    merge_defaults = True
+    
+    # カテゴリのItem Specificsの定義で検証し、問題があれば画像のアップロードや出品APIを呼ばずに失敗とする
+    with stage("category_aspects"):
+        aspects = get_aspect_cache(ebay_env.env_type).get(
+            category_id or EBAY_LISTING_DEFAULTS.get("category_id"), ebay_env
+        )
+    if aspects is not None:
+        item_specifics, problems = apply_category_aspects(
+            item_specifics, aspects, EBAY_LISTING_DEFAULTS.get("item_specifics")
+        )
+        merge_defaults = False
+        if problems:
+            message = f"Item Specificsエラー: {', '.join(problems)}"
+            logger.error(message)
+            result["error"] = message
+            return result
+    
+    if picture_urls is not None:
+        logger.info(f"アップロード済みの画像 {len(picture_urls)} 件を再利用します")
+        picture_urls = list(picture_urls)
+    else:
+        # 画像は並行してアップロードし、image列の順序を保つ
+        uploaded = map_in_order(lambda picture: upload_picture(picture, ebay_env),
+                                prepared["pictures"], IMAGE_CONCURRENCY_PER_ITEM)
+        picture_urls = [ebay_image_url for ebay_image_url in uploaded if ebay_image_url]
+    result["picture_urls"] = picture_urls
     
     retry_count = 0
     while retry_count < max_retries:
+        result["attempts"] = retry_count + 1
         try:
             env_name = "本番" if ebay_env.is_production() else "サンドボックス"
-            logger.info(f"eBay {env_name} 環境に出品しています... (カテゴリID: {category_id or 'デフォルト'})")
+            if item_id:
+                logger.info(f"eBay {env_name} 環境の出品 {item_id} を更新しています... "
+                            f"(カテゴリID: {category_id or 'デフォルト'})")
+            else:
+                logger.info(f"eBay {env_name} 環境に出品しています... (カテゴリID: {category_id or 'デフォルト'})")
             
-            success, result = list_item_on_ebay(
-                title,
-                category_id=category_id,
-                item_specifics=item_specifics,
-                picture_urls=picture_urls,
-                environment=ebay_env
-            )
+            with stage("add_item"):
+                success, message = list_item_on_ebay(
+                    title,
+                    category_id=category_id,
+                    item_specifics=item_specifics,
+                    picture_urls=picture_urls,
+                    environment=ebay_env,
+                    merge_defaults=merge_defaults,
+                    seller_profile=seller_profile,
+                    quantity=prepared.get("quantity"),
+                    item_id=item_id
+                )
 
             if success:
-                logger.info(f"出品成功: アイテムID = {result}")
-                return True
+                logger.info(f"出品成功: アイテムID = {message}")
+                result.update(success=True, item_id=message, error=None)
+                if learn_category:
+                    get_category_classifier(ebay_env.env_type).record(title, category_id)
+                return result
             else:
-                logger.warning(f"出品リトライ対象: {result}")
+                logger.warning(f"出品リトライ対象: {message}")
+                result["error"] = message
                 retry_count += 1
                 if retry_count < max_retries:
                     wait_time = 2 ** retry_count
@@ -146,6 +448,7 @@ def process_item(item_data: Dict[str, str], ebay_env: EbayEnvironment, max_retri
 
         except Exception as e:
             logger.error(f"eBay出品処理中に予期しないエラーが発生しました: {str(e)}")
+            result["error"] = str(e)
             retry_count += 1
             if retry_count < max_retries:
                 wait_time = 2 ** retry_count
@@ -154,7 +457,7 @@ def process_item(item_data: Dict[str, str], ebay_env: EbayEnvironment, max_retri
 
     # リトライ上限に達した場合
     logger.error("リトライ上限に達したため、出品を断念します。")
-    return False
+    return result
 
 def main() -> int:
     """
@@ -164,50 +467,779 @@ def main() -> int:
         int: 終了コード（0: 成功, 1: 失敗）
     """
     parser = argparse.ArgumentParser(description='eBay出品自動化ツール')
+    parser.add_argument('command', nargs='?', choices=['run', 'redrive'], default='run',
+                       help='run: シートの行を出品する（デフォルト）/ '
+                            'redrive: デッドレターキューに記録された失敗した商品だけを再処理する')
     parser.add_argument('--env', choices=['sandbox', 'production'], default='sandbox',
                        help='使用する環境（sandbox/production）')
     parser.add_argument('--row', type=int, help='処理する特定の行番号（0から始まる）')
+    parser.add_argument('--input',
+                       help='スプレッドシートの代わりに読み込むCSV / JSON Linesファイル（.csv / .jsonl）')
+    parser.add_argument('--rows', help='処理する行の範囲（A-B形式、0から始まり両端を含む）')
+    parser.add_argument('--shard', help='処理するシャード（K/N形式）。行番号をNで割った余りがKの行だけを処理する')
+    parser.add_argument('--workers', type=int,
+                       help='指定した数のワーカープロセスを起動し、シャードに分けて並列に処理する')
+    parser.add_argument('--summary-file', help='実行結果のサマリーを書き出すJSONファイル（ワーカーが内部で使用）')
+    parser.add_argument('--fan-out', action='store_true',
+                       help='シートを1回だけ読み込み、複数のアカウント・環境へ並行して出品する')
+    parser.add_argument('--targets',
+                       help='--fan-out の出品先（"環境[:アカウント]" のカンマ区切り）。'
+                            '省略時は環境変数 EBAY_FANOUT_TARGETS を使用')
+    parser.add_argument('--write-back', action='store_true',
+                       help='出品結果（ItemID・ステータス・エラー）をスプレッドシートにまとめて書き戻す')
+    parser.add_argument('--skip-unchanged', action='store_true',
+                       help='前回の成功した実行からスプレッドシートが変更されていなければ、何もせずに終了する')
+    parser.add_argument('--watch', action='store_true',
+                       help='常駐してスプレッドシートを定期的に確認し、変更・追加された行だけを出品する')
+    parser.add_argument('--watch-interval', type=float, default=WATCH_INTERVAL_SECONDS,
+                       help=f'--watch でスプレッドシートを確認する間隔（秒、デフォルト: {WATCH_INTERVAL_SECONDS}）')
+    parser.add_argument('--export-feed',
+                       help='出品せずに、一括出品フィード（.xml / .xml.gz）を指定したパスに書き出す')
+    parser.add_argument('--build-category-index', action='store_true',
+                       help='出品せずに、カテゴリツリーを取得してオフラインのカテゴリ分類用の索引を作成する')
+    parser.add_argument('--refresh-aspects', action='store_true',
+                       help='出品せずに、カテゴリごとのItem Specificsの定義のキャッシュをまとめて取得し直す')
+    parser.add_argument('--resume', action='store_true',
+                       help='前回の実行のチェックポイントから再開する（出品済みの行とアップロード済みの画像を再利用）')
+    parser.add_argument('--dedupe', choices=DEDUPE_MODES, default='off',
+                       help='出品の前にシート内で重複した行を探す（report: ログに出力する、'
+                            'collapse: 最初の行に数量を合計して1件だけ出品する）')
+    parser.add_argument('--order-by', choices=ORDERS, default='sheet',
+                       help='行を処理する順序（sheet: シートの順、priority: Priority列の大きい順、'
+                            'price: Price列の高い順、deadline: Deadline列の早い順）')
+    parser.add_argument('--time-budget', type=float,
+                       help='新しい行の処理を始められる時間（秒）。超えた行は先送りにして報告する')
+    parser.add_argument('--call-budget', type=int,
+                       help='Trading APIの呼び出し回数の上限。上限内で処理できない行は先送りにして報告する')
+    parser.add_argument('--deferred-report',
+                       help='先送りにした行を書き出すJSONファイル')
+    parser.add_argument('--error-code',
+                       help='redrive で再処理する商品を、eBay APIのエラーコード（カンマ区切り）で絞り込む')
+    parser.add_argument('--error-class',
+                       help=f'redrive で再処理する商品を、エラーの分類（{" / ".join(ERROR_CLASS_NAMES)} の'
+                            'カンマ区切り）で絞り込む')
+    parser.add_argument('--profile', action='store_true',
+                       help='cProfileの統計と処理段階ごとの所要時間をログファイルと同じ場所に出力する'
+                            '（cProfileはメインスレッドだけを計測するため、--fan-out の出品先ごとのスレッドと'
+                            '画像の転送スレッドの処理は統計に含まれない。処理段階ごとの所要時間は全スレッドを集計する）')
+    parser.add_argument('--profile-memory', action='store_true',
+                       help='--profile に加えてtracemallocでメモリ割り当ての上位箇所を出力する')
     args = parser.parse_args()
     
-    os.environ['EBAY_ENVIRONMENT'] = args.env
+    try:
+        args.rows = parse_rows(args.rows) if args.rows else None
+        args.shard = parse_shard(args.shard) if args.shard else None
+        parse_picture_policy(PICTURE_URL_POLICY)
+        get_seller_profiles(f"EBAY_{args.env.upper()}_")
+        if PICTURE_URL_DEFAULT_MODE not in PICTURE_MODES:
+            raise ValueError(f"PICTURE_URL_DEFAULT_MODE は {', '.join(PICTURE_MODES)} のいずれかで指定してください")
+        if args.write_back and args.input:
+            raise ValueError("--write-back は --input と同時には指定できません")
+        if args.export_feed and args.workers and args.workers > 1:
+            # 各ワーカーが同じパスにフィードを書き出すと、最後に終わったワーカーのフィードだけが残る
+            raise ValueError("--export-feed は --workers と同時には指定できません")
+        if args.fan_out or args.targets:
+            args.targets = parse_targets(args.targets or EBAY_FANOUT_TARGETS)
+        if args.command == 'redrive':
+            conflicts = [option for option, value in (
+                ('--workers', args.workers), ('--shard', args.shard), ('--watch', args.watch),
+                ('--write-back', args.write_back), ('--export-feed', args.export_feed),
+                ('--resume', args.resume), ('--skip-unchanged', args.skip_unchanged)
+            ) if value]
+            if conflicts:
+                raise ValueError(f"redrive は {', '.join(conflicts)} と同時には指定できません")
+        elif args.error_code or args.error_class:
+            raise ValueError("--error-code / --error-class は redrive でのみ指定できます")
+        if args.watch and (args.time_budget is not None or args.call_budget is not None):
+            raise ValueError("--time-budget / --call-budget は --watch と同時には指定できません")
+        if args.watch and ((args.workers and args.workers > 1) or args.shard):
+            # 監視の記録はプロセスごとに読み書きするため、複数のプロセスで同じシートを監視すると記録を上書きし合う
+            raise ValueError("--watch は --workers / --shard と同時には指定できません")
+        if args.error_code:
+            args.error_code = [code.strip() for code in args.error_code.split(',') if code.strip()]
+        if args.error_class:
+            args.error_class = [name.strip() for name in args.error_class.split(',') if name.strip()]
+            unknown = [name for name in args.error_class if name not in ERROR_CLASS_NAMES]
+            if unknown:
+                raise ValueError(f"--error-class は {', '.join(ERROR_CLASS_NAMES)} のいずれかで指定してください: "
+                                 f"{', '.join(unknown)}")
+    except ValueError as e:
+        parser.error(str(e))
     
-    logger.info(f"プログラムを開始します（環境: {args.env}）")
+    if args.workers and args.workers > 1 and args.shard is None:
+        # 認証トークンはワーカーを起動する前に1回だけ確認する（ワーカーは保存された結果を使う）
+        for env_type, account in args.targets or [(args.env, None)]:
+            if not check_token(EbayEnvironment(env_type, account=account)):
+                logger.error("認証情報が無効なため、ワーカーを起動せずに終了します")
+                return 1
+        logger.info(f"{args.workers} 個のワーカープロセスで並列に処理します")
+        exit_code, totals = run_coordinator(args.workers)
+        logger.info(f"全ワーカーの処理が完了しました。成功: {totals['success']}, 失敗: {totals['failure']}, "
+                    f"スキップ: {totals['skipped']}"
+                    + (f", 先送り: {totals['deferred']}" if totals['deferred'] else ""))
+        log_traffic(totals["traffic"])
+        return exit_code
     
-    # 環境設定
-    if not setup_environment():
-        return 1
+    if not (args.profile or args.profile_memory):
+        return run(args)
     
-    ebay_env = EbayEnvironment(args.env)
-    if not ebay_env.validate_credentials():
-        logger.error(f"eBay {args.env} 環境の認証情報が無効です")
-        return 1
+    profiler = RunProfiler(profile_output_prefix(LOG_FILE, args.shard), trace_memory=args.profile_memory)
+    profiler.start()
+    try:
+        return run(args)
+    finally:
+        profiler.stop()
+        profiler.write_reports()
+
+def process_items(items: Iterable[Tuple[int, Dict[str, str], Optional[Dict[str, Any]]]],
+                  ebay_env: EbayEnvironment,
+                  journal: CheckpointJournal,
+                  total: Optional[int] = None,
+                  writer: Optional[SheetResultWriter] = None,
+                  dead_letters: Optional[DeadLetterQueue] = None,
+                  source: str = "",
+                  done: Optional[Callable[[int], None]] = None,
+                  revise: Optional[Dict[int, str]] = None) -> Dict[str, int]:
+    """
+    商品を順番に出品し、結果をチェックポイントに記録する関数
+    リトライ上限に達して失敗した商品は、行のデータとエラーをデッドレターキューに記録する
     
-    # データ取得
-    if args.row is not None:
-        item_data = read_spreadsheet_data(row_index=args.row)
+    Args:
+        items (Iterable): (行番号, 商品データ, 前処理の結果) の並び。前処理の結果がNoneの場合は出品時に前処理する
+        ebay_env (EbayEnvironment): eBay環境オブジェクト
+        journal (CheckpointJournal): チェックポイントジャーナル
+        total (int, optional): 商品の総数（ログ表示用）
+        writer (SheetResultWriter, optional): 出品結果をスプレッドシートに書き戻すライター
+        dead_letters (DeadLetterQueue, optional): 失敗した商品を記録するデッドレターキュー
+        source (str): 入力元（デッドレターキューで行を識別するために使う）
+        done (Callable[[int], None], optional): 処理が終わった行の行番号を受け取る関数
+        revise (Dict[int, str], optional): 既存の出品を更新する行の、行番号ごとのアイテムID
+        
+    Returns:
+        Dict[str, int]: 成功数・失敗数・スキップ数
+    """
+    counts = {"success": 0, "failure": 0, "skipped": 0}
+    
+    for i, (row_index, item, prepared) in enumerate(items):
+        if journal.is_completed(row_index):
+            counts["skipped"] += 1
+            continue
+        
+        logger.info(f"[{ebay_env.label}] 商品 {i+1}/{total or '?'} を処理しています...")
+        
+        image_ref = item.get('image', '')
+        try:
+            result = process_item_detailed(
+                item, ebay_env,
+                picture_urls=journal.reusable_picture_urls(row_index, image_ref),
+                prepared=prepared,
+                item_id=revise.get(row_index) if revise else None
+            )
+        finally:
+            if done:
+                done(row_index)
+        journal.record(row_index, result, image_ref)
+        if dead_letters:
+            dead_letters.record(source, row_index, item, result)
+        if writer:
+            writer.add(row_index, result, ebay_env.label)
+        
+        if result["success"]:
+            counts["success"] += 1
+        else:
+            counts["failure"] += 1
+    
+    if counts["skipped"]:
+        logger.info(f"[{ebay_env.label}] チェックポイントにより出品済みの {counts['skipped']} 件をスキップしました")
+    return counts
+
+def load_items(args: argparse.Namespace) -> Optional[Iterable[Tuple[int, Dict[str, str]]]]:
+    """
+    コマンドライン引数に従って処理対象の行を読み込む関数
+    --input 指定時はファイルを1行ずつ、それ以外はスプレッドシートをページごとに読み込むイテレータを返す
+    （SHEETS_READ_PAGE_ROWS が0の場合はスプレッドシートの全行を一度に読み込む）
+    
+    Args:
+        args (argparse.Namespace): コマンドライン引数
+        
+    Returns:
+        Optional[Iterable[Tuple[int, Dict[str, str]]]]: (行番号, 商品データ) の並び。失敗した場合はNone。
+    """
+    if args.input:
+        if not os.path.exists(args.input):
+            logger.error(f"入力ファイルが見つかりません: {args.input}")
+            return None
+        items = iter_file_rows(args.input, row_index=args.row, row_range=args.rows)
+    elif args.row is not None:
+        with stage("sheet_read"):
+            item_data = read_spreadsheet_data(row_index=args.row)
         if not item_data:
             logger.error(f"スプレッドシートの行 {args.row} からのデータ取得に失敗しました")
-            return 1
-        items = [item_data]
+            return None
+        items = [(args.row, item_data)]
+    elif SHEETS_READ_PAGE_ROWS > 0:
+        # ページごとに読み込み、前のページの行を処理するまで次のページを読み込まない
+        items = iter_spreadsheet_rows(row_range=args.rows)
+        try:
+            with stage("sheet_read"):
+                first = next(items, None)
+        except Exception as e:
+            logger.error(f"スプレッドシートからのデータ取得に失敗しました: {str(e)}")
+            return None
+        if first is None:
+            logger.error("スプレッドシートからのデータ取得に失敗しました")
+            return None
+        items = itertools.chain([first], items)
     else:
-        items = read_spreadsheet_data()
-        if not items:
+        with stage("sheet_read"):
+            rows = read_spreadsheet_data(row_range=args.rows)
+        if not rows:
             logger.error("スプレッドシートからのデータ取得に失敗しました")
-            return 1
+            return None
+        first_row = args.rows[0] if args.rows else 0
+        items = list(enumerate(rows, start=first_row))
+    
+    # 重複した行はシャードに分ける前に探す（別のシャードに分かれた重複も見つけるため）
+    if args.dedupe != "off":
+        items = dedupe_rows(items, args.dedupe,
+                            ignore=RESULT_HEADERS + [PRIORITY_COLUMN, DEADLINE_COLUMN],
+                            default_quantity=EBAY_LISTING_DEFAULTS.get("quantity", 1))
+    
+    if args.shard:
+        materialized = isinstance(items, list)
+        items = select_shard(items, *args.shard)
+        if materialized:
+            items = list(items)
+            logger.info(f"シャード {args.shard[0]}/{args.shard[1]} の {len(items)} 件を処理します")
+        else:
+            logger.info(f"シャード {args.shard[0]}/{args.shard[1]} に割り当てられた行を処理します")
+    
+    return items
+
+def input_source(args: argparse.Namespace) -> str:
+    """
+    入力元を表す文字列を返す関数（実行のキーやデッドレターキューで行を識別するために使う）
+    
+    Args:
+        args (argparse.Namespace): コマンドライン引数
+        
+    Returns:
+        str: 入力ファイルのパス、またはスプレッドシートID|シート名
+    """
+    return args.input or f"{SPREADSHEET_ID}|{SHEET_NAME}"
+
+def get_fingerprint(args: argparse.Namespace) -> Optional[str]:
+    """
+    入力データが変更されたかどうかを判定するための指紋を取得する関数
+    
+    Args:
+        args (argparse.Namespace): コマンドライン引数
+        
+    Returns:
+        Optional[str]: 指紋。取得できなかった場合はNone。
+    """
+    if args.input:
+        try:
+            stat = os.stat(args.input)
+        except OSError:
+            return None
+        return f"file:{stat.st_mtime_ns}:{stat.st_size}"
+    return get_sheet_fingerprint()
+
+def create_environments(args: argparse.Namespace,
+                        targets: List[Tuple[str, Optional[str]]]) -> Optional[List[EbayEnvironment]]:
+    """
+    出品先ごとのeBay環境オブジェクトを作成する関数
+    
+    Args:
+        args (argparse.Namespace): コマンドライン引数
+        targets (List[Tuple[str, Optional[str]]]): (環境タイプ, アカウント名) のリスト
+        
+    Returns:
+        Optional[List[EbayEnvironment]]: eBay環境オブジェクトのリスト。認証情報が無効な場合はNone。
+    """
+    environments = []
+    for env_type, account in targets:
+        ebay_env = EbayEnvironment(env_type, account=account)
+        if args.shard:
+            # シャードごとにTrading APIの呼び出し回数の上限を分け合う
+            ebay_env.rate_limiter = RateLimiter(ebay_env.rate_limiter.calls_per_second / args.shard[1])
+        if not ebay_env.validate_credentials():
+            logger.error(f"eBay {ebay_env.label} 環境の認証情報が無効です")
+            return None
+        # 認証トークンが無効な場合は、全商品がリトライ上限まで失敗する前に終了する
+        if not check_token(ebay_env):
+            logger.error(f"eBay {ebay_env.label} 環境の認証情報が無効なため、処理を始めずに終了します")
+            return None
+        environments.append(ebay_env)
+    return environments
+
+def report_traffic(environments: List[EbayEnvironment]) -> Dict[str, Dict[str, int]]:
+    """
+    全出品先のTrading APIの呼び出し回数と送受信したバイト数を合計してログに出力する関数
     
-    success_count = 0
-    failure_count = 0
+    Args:
+        environments (List[EbayEnvironment]): 出品先のeBay環境オブジェクト
+        
+    Returns:
+        Dict[str, Dict[str, int]]: API名ごとの値（実行結果のサマリーに含める）
+    """
+    traffic = merge_traffic(ebay_env.traffic.as_dict() for ebay_env in environments)
+    log_traffic(traffic)
+    return traffic
+
+def run_pass(args: argparse.Namespace,
+             environments: List[EbayEnvironment],
+             items: List[Tuple[int, Dict[str, str]]],
+             writer: Optional[SheetResultWriter] = None,
+             stop: Optional[StopSignal] = None,
+             resume: bool = False,
+             budget: Optional[WorkBudget] = None,
+             checkpoint_name: str = "checkpoint",
+             revise: Optional[Dict[str, Dict[int, str]]] = None) -> Tuple[Dict[str, int], Dict[str, CheckpointJournal]]:
+    """
+    読み込んだ行を全出品先へ出品する関数
     
-    for i, item in enumerate(items):
-        logger.info(f"商品 {i+1}/{len(items)} を処理しています...")
+    Args:
+        args (argparse.Namespace): コマンドライン引数
+        environments (List[EbayEnvironment]): 出品先のeBay環境オブジェクト
+        items (List[Tuple[int, Dict[str, str]]]): (行番号, 商品データ) のリスト
+        writer (SheetResultWriter, optional): 出品結果をスプレッドシートに書き戻すライター
+        stop (StopSignal, optional): 停止シグナル。停止が要求されたら新しい行の処理を止める
+        resume (bool): チェックポイントから再開するかどうか
+        budget (WorkBudget, optional): 実行時間・呼び出し回数の上限。上限内で処理できない行は先送りにする
+        checkpoint_name (str): チェックポイントのファイル名の先頭
+        revise (Dict[str, Dict[int, str]], optional): 出品先の表示名ごとの、既存の出品を更新する行のアイテムID
         
-        if process_item(item, ebay_env):
-            success_count += 1
+    Returns:
+        Tuple[Dict[str, int], Dict[str, CheckpointJournal]]: (全出品先の集計結果, 出品先ごとのチェックポイント)
+    """
+    # チェックポイント（--resume 指定時は前回の続きから処理する）
+    journals = {}
+    for ebay_env in environments:
+        journal = CheckpointJournal(checkpoint_path(ebay_env.env_type, args.shard, ebay_env.account,
+                                                    checkpoint_name))
+        journal.start({
+            "spreadsheet_id": SPREADSHEET_ID,
+            "sheet_name": SHEET_NAME,
+            "input": args.input,
+            "env": ebay_env.label,
+            "row": args.row,
+            "rows": list(args.rows) if args.rows else None,
+            "shard": list(args.shard) if args.shard else None
+        }, resume=resume)
+        journals[ebay_env.label] = journal
+    
+    # リトライ上限に達した商品は出品先ごとのデッドレターキューに記録する（redrive で再処理できる）
+    source = input_source(args)
+    dead_letters = {ebay_env.label: get_dead_letter_queue(ebay_env.label) for ebay_env in environments}
+    
+    # ファイルから読み込む場合は件数が事前にわからない
+    total = len(items) if isinstance(items, list) else None
+    entries = until_stopped(items, stop) if stop else items
+    if budget:
+        entries = budget.admit(
+            entries, is_done=lambda row_index: all(journal.is_completed(row_index) for journal in journals.values())
+        )
+    
+    try:
+        if len(environments) == 1:
+            ebay_env = environments[0]
+            counts = {ebay_env.label: process_items(
+                ((row_index, item, None) for row_index, item in entries),
+                ebay_env, journals[ebay_env.label], total=total, writer=writer,
+                dead_letters=dead_letters[ebay_env.label], source=source,
+                done=budget.release if budget else None,
+                revise=(revise or {}).get(ebay_env.label)
+            )}
         else:
-            failure_count += 1
+            # シートの読み込みと前処理（項目の解析・画像の取得）は全出品先で共有する
+            # ダウンロード済みでアップロード待ちの画像が上限に達したら、次の行の読み込み・ダウンロードを待たせる
+            pending_images = ByteBudget(IMAGE_PENDING_MAX_BYTES, "アップロード待ちの画像")
+            
+            def prepare(row_index: int, item: Dict[str, str]) -> Optional[Dict[str, Any]]:
+                if all(journal.is_completed(row_index) for journal in journals.values()):
+                    return None
+                prepared = prepare_item(item, stream_images=False)
+                # アップロードを待っている間に、他の行のダウンロードで画像がキャッシュから削除されないようにする
+                pin_images(upload_paths(prepared))
+                pending_images.acquire(prepared["image_bytes"])
+                return prepared
+            
+            def release(row_index: int, prepared: Optional[Dict[str, Any]]) -> None:
+                if prepared:
+                    pending_images.release(prepared["image_bytes"])
+                    unpin_images(upload_paths(prepared))
+                # 呼び出し回数の見積もりは、すべての出品先での処理が終わってから解放する
+                if budget:
+                    budget.release(row_index)
+            
+            counts = fan_out(
+                entries, environments, prepare,
+                lambda env, queued: process_items(queued, env, journals[env.label], total=total,
+                                                  writer=writer, dead_letters=dead_letters[env.label],
+                                                  source=source, revise=(revise or {}).get(env.label)),
+                label=lambda env: env.label,
+                max_in_flight=MAX_ITEMS_IN_FLIGHT,
+                release=release
+            )
+            if pending_images.waits:
+                logger.info(f"アップロード待ちの画像が上限に達したため、行の前処理を {pending_images.waits} 回待たせました")
+    finally:
+        for journal in journals.values():
+            journal.close()
+        if writer:
+            writer.close()
+    
+    totals = {"success": 0, "failure": 0, "skipped": 0}
+    for label, result in counts.items():
+        if len(counts) > 1:
+            logger.info(f"[{label}] 成功: {result['success']}, 失敗: {result['failure']}")
+        for key in totals:
+            totals[key] += result.get(key, 0)
+        if result.get("aborted"):
+            totals["failure"] += 1
+    
+    return totals, journals
+
+def watch(args: argparse.Namespace,
+          environments: List[EbayEnvironment],
+          writer: Optional[SheetResultWriter]) -> int:
+    """
+    スプレッドシートを定期的に確認し、追加された行を出品し、内容が変更された出品済みの行を更新し続ける関数
+    行は行番号ではなく、書き戻したItemID列と行の内容で出品と対応付ける（ListingIndex）ため、
+    行の挿入・削除で出品し直すことはなく、出品済みの行の変更はReviseItemで既存の出品を更新する
+    Sheets APIクライアント、Trading APIの接続プールなどはプロセスが動いている間ずっと再利用する
+    SIGTERM / SIGINT を受け取ると、処理中の出品を終えてから停止する
+    
+    Args:
+        args (argparse.Namespace): コマンドライン引数
+        environments (List[EbayEnvironment]): 出品先のeBay環境オブジェクト
+        writer (SheetResultWriter, optional): 出品結果をスプレッドシートに書き戻すライター
+        
+    Returns:
+        int: 終了コード（0: 正常に停止, 1: 失敗）
+    """
+    state_name = "watch_listings_" + "_".join(env.label.replace(':', '-') for env in environments)
+    labels = [env.label for env in environments]
+    index = ListingIndex(load_state(state_name, {}), labels, RESULT_HEADERS[0])
+    stop = StopSignal()
+    stop.install()
+    
+    logger.info(f"監視モードを開始します（確認間隔: {args.watch_interval}秒）")
+    
+    last_fingerprint = None
+    retry_at = None
+    try:
+        while not stop.requested:
+            fingerprint = get_fingerprint(args)
+            retry_due = retry_at is not None and time.monotonic() >= retry_at
+            # 常駐中に認証トークンが失効・取り消された場合は停止する（確認結果は一定時間再利用する）
+            if not all(check_token(ebay_env) for ebay_env in environments):
+                logger.error("認証情報が無効になったため、監視モードを停止します")
+                return 1
+            if fingerprint is None or fingerprint != last_fingerprint or retry_due:
+                items = load_items(args)
+                if items is not None:
+                    changed = index.plan(items, RESULT_HEADERS)
+                    if changed:
+                        revised = sum(len(rows) for rows in index.revise.values())
+                        logger.info(f"変更・追加された {len(changed)} 行を処理します（既存の出品の更新: {revised} 件）")
+                        # 通常の実行のチェックポイントを上書きしないように、監視モード用のジャーナルを使う
+                        totals, journals = run_pass(args, environments, changed, writer, stop,
+                                                    checkpoint_name="watch_checkpoint", revise=index.revise)
+                        
+                        # 成功した出品先だけを記録する（失敗した出品先は次回も再試行し、出品済みなら更新する）
+                        for row_index, _ in changed:
+                            for label, journal in journals.items():
+                                if journal.is_completed(row_index) and journal.entries[row_index].get("item_id"):
+                                    index.record(label, row_index, journal.entries[row_index]["item_id"])
+                        save_state(state_name, index.as_state())
+                        
+                        logger.info(f"処理が完了しました。成功: {totals['success']}, 失敗: {totals['failure']}")
+                        # 失敗した行はシートが変更されなくても一定時間後に再試行する
+                        retry_at = time.monotonic() + WATCH_RETRY_SECONDS if totals["failure"] else None
+                    else:
+                        retry_at = None
+                last_fingerprint = fingerprint
+            
+            stop.wait(args.watch_interval)
+    finally:
+        stop.restore()
+    
+    report_traffic(environments)
+    logger.info("監視モードを停止しました")
+    return 0
+
+def export_feed(args: argparse.Namespace) -> int:
+    """
+    行を出品せずに、一括出品フィード（Large Merchant Services形式）に書き出す関数
+    AddItemと同じ項目の対応付け（build_item_payload）を使い、1行ずつ書き出すためメモリ使用量は行数に依存しない
+    eBay APIは呼び出さないため、カテゴリはシートの指定・ローカルのカテゴリ分類・デフォルト値の順に決め、
+    画像はURLで指定されたものだけを使う
+    
+    Args:
+        args (argparse.Namespace): コマンドライン引数
+        
+    Returns:
+        int: 終了コード（0: 成功, 1: 失敗）
+    """
+    items = load_items(args)
+    if items is None:
+        return 1
+    
+    classifier = get_category_classifier(args.env)
+    aspect_cache = get_aspect_cache(args.env)
+    # 出品プロファイルは --env の出品先の設定を使う
+    feed_prefix = f"EBAY_{args.env.upper()}_"
+    totals = {"success": 0, "failure": 0, "skipped": 0}
+    
+    with FeedWriter(args.export_feed) as feed:
+        for row_index, item_data in items:
+            prepared = prepare_item(item_data, fetch_images=False)
+            title = prepared["title"]
+            if not title:
+                logger.error(f"行 {row_index}: 商品タイトルがありません")
+                totals["failure"] += 1
+                continue
+            
+            category_id = prepared["category_id"]
+            if not category_id:
+                category_id, confidence = classifier.classify(title)
+                if confidence < CATEGORY_CLASSIFIER_MIN_CONFIDENCE:
+                    category_id = None
+            
+            picture_urls = []
+            for ref in split_image_refs(item_data):
+                if ref.startswith(('http://', 'https://')):
+                    picture_urls.append(ref)
+                else:
+                    logger.warning(f"行 {row_index}: ローカルの画像はフィードに含められないため除外します: {ref}")
+            
+            item_specifics = prepared["item_specifics"]
+            merge_defaults = True
+            aspects = aspect_cache.cached(category_id or EBAY_LISTING_DEFAULTS.get("category_id"))
+            if aspects is not None:
+                item_specifics, problems = apply_category_aspects(
+                    item_specifics, aspects, EBAY_LISTING_DEFAULTS.get("item_specifics")
+                )
+                merge_defaults = False
+                if problems:
+                    logger.error(f"行 {row_index}: Item Specificsエラー: {', '.join(problems)}")
+                    totals["failure"] += 1
+                    continue
+            
+            try:
+                seller_profile = resolve_seller_profile(prepared["seller_profile"], feed_prefix)
+                payload = build_item_payload(title, category_id, item_specifics, picture_urls, merge_defaults,
+                                             seller_profile, prepared["quantity"])
+            except ValueError as e:
+                logger.error(f"行 {row_index}: 設定エラー: {str(e)}")
+                totals["failure"] += 1
+                continue
+            feed.add(str(row_index), payload)
+            totals["success"] += 1
+    
+    # 簡易的な受信側でフィードを読み込み、アップロード前に問題を確認する
+    report = validate_feed(args.export_feed)
+    for error in report["errors"]:
+        logger.error(f"フィードの検証エラー: {error}")
+    logger.info(f"フィードの書き出しが完了しました。書き出し: {totals['success']}, 失敗: {totals['failure']}, "
+                f"検証で問題のあったリクエスト: {report['invalid']}")
+    
+    if args.summary_file:
+        write_summary(args.summary_file, totals)
+    return 0 if totals["failure"] == 0 and report["invalid"] == 0 else 1
+
+def build_category_index(environments: List[EbayEnvironment]) -> int:
+    """
+    カテゴリツリーをGetCategoriesで取得し、オフラインのカテゴリ分類用の索引として保存する関数
+    
+    Args:
+        environments (List[EbayEnvironment]): eBay環境オブジェクト
+        
+    Returns:
+        int: 終了コード（0: 成功, 1: 失敗）
+    """
+    exit_code = 0
+    for env_type in sorted({ebay_env.env_type for ebay_env in environments}):
+        ebay_env = next(env for env in environments if env.env_type == env_type)
+        tree = get_categories(ebay_env)
+        if tree is None:
+            logger.error(f"[{env_type}] カテゴリツリーの取得に失敗しました")
+            exit_code = 1
+            continue
+        count = save_category_tree(env_type, tree)
+        logger.info(f"[{env_type}] {count} 件のカテゴリの索引を作成しました（バージョン: {tree.get('version')}）")
+    return exit_code
+
+def refresh_category_aspects(args: argparse.Namespace, environments: List[EbayEnvironment]) -> int:
+    """
+    カテゴリごとのItem Specificsの定義のキャッシュをまとめて取得し直す関数
+    キャッシュ済みのカテゴリ、デフォルトのカテゴリ、シートでCategoryIDが指定されたカテゴリが対象
+    
+    Args:
+        args (argparse.Namespace): コマンドライン引数
+        environments (List[EbayEnvironment]): eBay環境オブジェクト
+        
+    Returns:
+        int: 終了コード（0: 成功, 1: 失敗）
+    """
+    category_ids = {EBAY_LISTING_DEFAULTS.get("category_id")}
+    items = load_items(args)
+    if items is not None:
+        category_ids.update(item.get('CategoryID') for _, item in items)
+    
+    exit_code = 0
+    for env_type in sorted({ebay_env.env_type for ebay_env in environments}):
+        ebay_env = next(env for env in environments if env.env_type == env_type)
+        cache = get_aspect_cache(env_type)
+        targets = category_ids | set(cache.cached_categories())
+        targets.discard(None)
+        targets.discard('')
+        refreshed = cache.refresh(targets, ebay_env)
+        logger.info(f"[{env_type}] {len(targets)} 件のカテゴリのうち {refreshed} 件のItem Specificsの定義を更新しました")
+        if refreshed < len(targets):
+            exit_code = 1
+    return exit_code
+
+def redrive(args: argparse.Namespace, environments: List[EbayEnvironment]) -> int:
+    """
+    デッドレターキューに記録された失敗した商品だけを、記録された行のデータで再処理する関数
+    シートは読み込まないため、eBayの一時的な障害から復旧した後にシート全体を処理し直す必要がない
+    
+    Args:
+        args (argparse.Namespace): コマンドライン引数（error_code / error_class で対象を絞り込む）
+        environments (List[EbayEnvironment]): 出品先のeBay環境オブジェクト
+        
+    Returns:
+        int: 終了コード（0: 成功, 1: 失敗）
+    """
+    totals = {"success": 0, "failure": 0, "skipped": 0}
+    for ebay_env in environments:
+        queue = get_dead_letter_queue(ebay_env.label)
+        entries = queue.pending(error_codes=args.error_code, error_classes=args.error_class)
+        logger.info(f"[{ebay_env.label}] デッドレターキューの {len(entries)} 件を再処理します")
+        
+        for i, entry in enumerate(entries):
+            logger.info(f"[{ebay_env.label}] 商品 {i+1}/{len(entries)} を再処理しています "
+                        f"(行 {entry['row_index']}, 前回のエラー: {entry['error']})")
+            result = process_item_detailed(entry["item"], ebay_env, item_id=entry.get("item_id"))
+            queue.record(entry["source"], entry["row_index"], entry["item"], result)
+            totals["success" if result["success"] else "failure"] += 1
+        
+        remaining = queue.compact()
+        logger.info(f"[{ebay_env.label}] デッドレターキューに残っている商品: {remaining} 件")
+    
+    logger.info(f"再処理が完了しました。成功: {totals['success']}, 失敗: {totals['failure']}")
+    totals["traffic"] = report_traffic(environments)
+    if args.summary_file:
+        write_summary(args.summary_file, totals)
+    return 0 if totals["failure"] == 0 else 1
+
+def run(args: argparse.Namespace) -> int:
+    """
+    出品処理を実行する関数
+    
+    Args:
+        args (argparse.Namespace): コマンドライン引数
+        
+    Returns:
+        int: 終了コード（0: 成功, 1: 失敗）
+    """
+    os.environ['EBAY_ENVIRONMENT'] = args.env
+    
+    targets = args.targets or [(args.env, None)]
+    labels = [f"{env_type}:{account}" if account else env_type for env_type, account in targets]
+    logger.info(f"プログラムを開始します（環境: {', '.join(labels)}）")
+    
+    # 前回の成功した実行からスプレッドシートが変更されていなければ何もせずに終了する
+    fingerprint = None
+    source = input_source(args)
+    run_key = "|".join(str(part) for part in (source, ",".join(labels),
+                                               args.row, args.rows, args.shard))
+    if args.skip_unchanged and not args.watch:
+        fingerprint = get_fingerprint(args)
+        last_runs = load_state("last_successful_runs", {})
+        if fingerprint and last_runs.get(run_key) == fingerprint:
+            logger.info("前回の実行から入力データが変更されていないため、処理をスキップします")
+            if args.summary_file:
+                write_summary(args.summary_file, {"success": 0, "failure": 0, "skipped": 0})
+            return 0
+    
+    # 一括出品フィードの書き出し（eBay APIを呼び出さないため認証情報は不要）
+    if args.export_feed:
+        return export_feed(args)
+    
+    # 環境設定
+    if not args.targets and not setup_environment():
+        return 1
+    
+    environments = create_environments(args, targets)
+    if environments is None:
+        return 1
+    
+    if args.build_category_index:
+        return build_category_index(environments)
+    if args.refresh_aspects:
+        return refresh_category_aspects(args, environments)
+    if args.command == 'redrive':
+        return redrive(args, environments)
+    
+    # 出品結果の書き戻し（--write-back 指定時）
+    writer = SheetResultWriter(targets=labels) if args.write_back else None
+    
+    if args.watch:
+        return watch(args, environments, writer)
+    
+    # データ取得
+    items = load_items(args)
+    if items is None:
+        return 1
+    
+    snapshot("after_sheet_read")
+    
+    # 優先する順に並べ替え、実行時間・呼び出し回数の上限内で処理できる行だけを出品する
+    items = order_items(items, args.order_by)
+    budget = None
+    if args.time_budget is not None or args.call_budget is not None:
+        max_calls = args.call_budget
+        if max_calls is not None and args.shard:
+            # 呼び出し回数の上限はシャードごとに分け合う
+            max_calls //= args.shard[1]
+        budget = WorkBudget(
+            max_seconds=args.time_budget,
+            max_calls=max_calls,
+            call_counter=lambda: sum(ebay_env.call_count for ebay_env in environments),
+            estimate_calls=lambda item: sum(estimate_calls(item, ebay_env) for ebay_env in environments)
+        )
+    
+    totals, _ = run_pass(args, environments, items, writer, resume=args.resume, budget=budget)
+    if budget:
+        report_path = args.deferred_report
+        if report_path and args.shard:
+            # ワーカーごとに別のファイルに書き出す
+            root, ext = os.path.splitext(report_path)
+            report_path = f"{root}_shard{args.shard[0]}of{args.shard[1]}{ext}"
+        budget.report(report_path)
+        totals["deferred"] = len(budget.deferred)
     
-    logger.info(f"処理が完了しました。成功: {success_count}, 失敗: {failure_count}")
-    return 0 if failure_count == 0 else 1
+    logger.info(f"処理が完了しました。成功: {totals['success']}, 失敗: {totals['failure']}")
+    totals["traffic"] = report_traffic(environments)
+    # 先送りにした行がある場合は、次回の実行で処理できるように記録しない
+    if args.skip_unchanged and fingerprint and totals["failure"] == 0 and not totals.get("deferred"):
+        # 書き戻しでスプレッドシートが更新されるため、その後の指紋を記録する
+        if writer:
+            fingerprint = get_fingerprint(args)
+        if fingerprint:
+            # --workers の各シャードが同時に書き込んでも、他のシャードの記録を消さないように排他する
+            with FileLock(state_path("last_successful_runs") + ".lock"):
+                last_runs = load_state("last_successful_runs", {})
+                last_runs[run_key] = fingerprint
+                save_state("last_successful_runs", last_runs)
+    if args.summary_file:
+        write_summary(args.summary_file, totals)
+    return 0 if totals["failure"] == 0 else 1
 
 if __name__ == "__main__":
     exit_code = main()
@@ -0,0 +1,74 @@
+import logging
+from functools import lru_cache
+from urllib.parse import urlparse
+from typing import List, Tuple
+
+from config import PICTURE_URL_POLICY, PICTURE_URL_DEFAULT_MODE
+
+logger = logging.getLogger("ebay_listing.picture_policy")
+
+# direct: PictureDetailsにURLをそのまま指定する
+# external: UploadSiteHostedPicturesのExternalPictureURLでeBayに取得させる
+# download: ダウンロードしてからアップロードする（従来の動作）
+PICTURE_MODES = ("direct", "external", "download")
+
+def parse_picture_policy(value: str) -> List[Tuple[str, str]]:
+    """
+    "ホスト=モード" のカンマ区切りリストを解析する
+
+    Args:
+        value (str): 画像URLのホストごとの扱い（例: "cdn.example.com=direct,*.example.net=external"）
+
+    Returns:
+        List[Tuple[str, str]]: (ホスト, モード) のリスト。ホストが "*." で始まる場合はサブドメインにも一致する
+
+    Raises:
+        ValueError: 形式が不正な場合
+    """
+    policy = []
+    for part in value.split(','):
+        part = part.strip()
+        if not part:
+            continue
+        host, separator, mode = part.partition('=')
+        host, mode = host.strip().lower(), mode.strip().lower()
+        if not separator or not host:
+            raise ValueError(f"画像URLの扱いは \"ホスト=モード\" の形式で指定してください: {part}")
+        if mode not in PICTURE_MODES:
+            raise ValueError(f"画像URLの扱いは {', '.join(PICTURE_MODES)} のいずれかで指定してください: {part}")
+        policy.append((host, mode))
+    return policy
+
+def _host_matches(host: str, pattern: str) -> bool:
+    if pattern.startswith("*."):
+        return host == pattern[2:] or host.endswith(pattern[1:])
+    return host == pattern
+
+def picture_mode(url: str,
+                 policy: List[Tuple[str, str]] = None,
+                 default: str = PICTURE_URL_DEFAULT_MODE) -> str:
+    """
+    画像URLをどのように出品に使うかを決める
+
+    Args:
+        url (str): 画像URL
+        policy (List[Tuple[str, str]], optional): (ホスト, モード) のリスト。Noneの場合は PICTURE_URL_POLICY を使用
+        default (str): どのホストにも一致しない場合のモード
+
+    Returns:
+        str: "direct"、"external"、"download" のいずれか
+    """
+    parsed = urlparse(url)
+    # eBayに取得させるのはHTTPSのURLだけにする
+    if parsed.scheme != "https":
+        return "download"
+
+    host = (parsed.hostname or "").lower()
+    for pattern, mode in policy if policy is not None else _configured_policy():
+        if _host_matches(host, pattern):
+            return mode
+    return default
+
+@lru_cache(maxsize=None)
+def _configured_policy() -> List[Tuple[str, str]]:
+    return parse_picture_policy(PICTURE_URL_POLICY)
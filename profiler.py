@@ -0,0 +1,222 @@
+import os
+import io
+import time
+import logging
+import threading
+import cProfile
+import pstats
+import tracemalloc
+from contextlib import contextmanager
+from typing import Optional, List, Dict, Tuple, Iterator
+
+logger = logging.getLogger("ebay_listing.profiler")
+
+# 実行中のプロファイラ（--profile 指定時のみ設定される）
+_active_profiler: Optional["RunProfiler"] = None
+
+class RunProfiler:
+    """
+    出品処理全体のプロファイルを取得するクラス
+    cProfileの統計、処理段階ごとの所要時間、tracemallocのスナップショットを収集する
+    """
+
+    def __init__(self, output_prefix: str, trace_memory: bool = False, top_allocations: int = 25):
+        """
+        初期化
+
+        Args:
+            output_prefix (str): 出力ファイルのパス（拡張子なし）
+            trace_memory (bool): tracemallocによるメモリ割り当ての追跡を行うかどうか
+            top_allocations (int): レポートに出力するメモリ割り当て箇所の数
+        """
+        self.output_prefix = output_prefix
+        self.trace_memory = trace_memory
+        self.top_allocations = top_allocations
+        self.profile = cProfile.Profile()
+        self.stages: Dict[str, List[float]] = {}
+        self.snapshots: List[tuple] = []
+        self._lock = threading.Lock()
+        self._started_at = 0.0
+        self._elapsed = 0.0
+
+    def start(self) -> None:
+        """
+        プロファイルの取得を開始する
+        """
+        global _active_profiler
+
+        if self.trace_memory:
+            tracemalloc.start()
+            self.snapshot("start")
+
+        self._started_at = time.perf_counter()
+        self.profile.enable()
+        _active_profiler = self
+        logger.info(f"プロファイルの取得を開始しました（メモリ追跡: {'有効' if self.trace_memory else '無効'}）")
+
+    def stop(self) -> None:
+        """
+        プロファイルの取得を停止する
+        """
+        global _active_profiler
+
+        self.profile.disable()
+        self._elapsed = time.perf_counter() - self._started_at
+        _active_profiler = None
+
+        if self.trace_memory:
+            self.snapshot("end")
+            tracemalloc.stop()
+
+    def snapshot(self, label: str) -> None:
+        """
+        tracemallocのスナップショットを取得する
+
+        Args:
+            label (str): スナップショットの名前
+        """
+        if self.trace_memory and tracemalloc.is_tracing():
+            self.snapshots.append((label, tracemalloc.take_snapshot()))
+
+    def record_stage(self, name: str, elapsed: float) -> None:
+        """
+        処理段階の所要時間を記録する
+
+        Args:
+            name (str): 処理段階の名前
+            elapsed (float): 所要時間（秒）
+        """
+        with self._lock:
+            self.stages.setdefault(name, []).append(elapsed)
+
+    def format_stages(self) -> str:
+        """
+        処理段階ごとの所要時間を表形式の文字列にする
+
+        Returns:
+            str: 処理段階ごとの集計結果
+        """
+        lines = [f"全体の所要時間: {self._elapsed:.3f}秒", ""]
+        lines.append(f"{'stage':<24}{'count':>8}{'total(s)':>12}{'avg(s)':>12}{'max(s)':>12}{'share':>8}")
+        ordered = sorted(self.stages.items(), key=lambda kv: sum(kv[1]), reverse=True)
+        for name, samples in ordered:
+            total = sum(samples)
+            share = (total / self._elapsed * 100) if self._elapsed else 0.0
+            lines.append(
+                f"{name:<24}{len(samples):>8}{total:>12.3f}{total / len(samples):>12.3f}"
+                f"{max(samples):>12.3f}{share:>7.1f}%"
+            )
+        return "\n".join(lines) + "\n"
+
+    def format_memory(self) -> str:
+        """
+        メモリ割り当ての上位箇所を文字列にする
+
+        Returns:
+            str: スナップショットごとの上位割り当て箇所と、開始時からの増加分
+        """
+        lines = []
+        for label, snap in self.snapshots:
+            lines.append(f"=== スナップショット: {label} ===")
+            for stat in snap.statistics('lineno')[:self.top_allocations]:
+                lines.append(str(stat))
+            lines.append("")
+
+        if len(self.snapshots) >= 2:
+            first, last = self.snapshots[0][1], self.snapshots[-1][1]
+            lines.append(f"=== 増加分: {self.snapshots[0][0]} -> {self.snapshots[-1][0]} ===")
+            for stat in last.compare_to(first, 'lineno')[:self.top_allocations]:
+                lines.append(str(stat))
+
+        return "\n".join(lines) + "\n"
+
+    def write_reports(self) -> List[str]:
+        """
+        プロファイル結果をファイルに書き出す
+        .prof ファイルは snakeviz や pstats でそのまま読み込める
+
+        Returns:
+            List[str]: 書き出したファイルのパス
+        """
+        directory = os.path.dirname(self.output_prefix)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        written = []
+
+        prof_path = f"{self.output_prefix}.prof"
+        self.profile.dump_stats(prof_path)
+        written.append(prof_path)
+
+        stats_path = f"{self.output_prefix}_stats.txt"
+        buffer = io.StringIO()
+        stats = pstats.Stats(self.profile, stream=buffer)
+        stats.sort_stats('cumulative').print_stats(40)
+        stats.sort_stats('tottime').print_stats(40)
+        with open(stats_path, 'w', encoding='utf-8') as f:
+            f.write(buffer.getvalue())
+        written.append(stats_path)
+
+        stages_path = f"{self.output_prefix}_stages.txt"
+        with open(stages_path, 'w', encoding='utf-8') as f:
+            f.write(self.format_stages())
+        written.append(stages_path)
+
+        if self.snapshots:
+            memory_path = f"{self.output_prefix}_memory.txt"
+            with open(memory_path, 'w', encoding='utf-8') as f:
+                f.write(self.format_memory())
+            written.append(memory_path)
+
+        for path in written:
+            logger.info(f"プロファイル結果を書き出しました: {path}")
+
+        return written
+
+@contextmanager
+def stage(name: str) -> Iterator[None]:
+    """
+    処理段階の所要時間を計測するコンテキストマネージャ
+    プロファイラが有効でない場合は何もしない
+
+    Args:
+        name (str): 処理段階の名前（"category", "image_upload" など）
+    """
+    profiler = _active_profiler
+    if profiler is None:
+        yield
+        return
+
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        profiler.record_stage(name, time.perf_counter() - started)
+
+def snapshot(label: str) -> None:
+    """
+    メモリ追跡が有効な場合にスナップショットを取得する
+
+    Args:
+        label (str): スナップショットの名前
+    """
+    if _active_profiler is not None:
+        _active_profiler.snapshot(label)
+
+def profile_output_prefix(log_file: str, shard: Optional[Tuple[int, int]] = None) -> str:
+    """
+    ログファイルと同じ場所に置くプロファイル出力ファイルのパスを作る
+
+    Args:
+        log_file (str): ログファイルのパス
+        shard (Tuple[int, int], optional): (シャード番号, シャード数)。
+                                           同じ秒に起動したワーカーが同じファイルに書き出さないように名前に含める
+
+    Returns:
+        str: 出力ファイルのパス（拡張子なし）
+    """
+    base = os.path.splitext(log_file)[0]
+    prefix = f"{base}_profile_{time.strftime('%Y%m%d-%H%M%S')}"
+    if shard:
+        prefix += f"_shard{shard[0]}of{shard[1]}"
+    return prefix
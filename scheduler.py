@@ -0,0 +1,212 @@
+import re
+import json
+import time
+import logging
+import threading
+from datetime import datetime, timezone
+from typing import Optional, List, Dict, Tuple, Any, Callable, Iterable, Iterator
+
+logger = logging.getLogger("ebay_listing.scheduler")
+
+# 優先度・期限を指定する列（価格は Price 列を使う）
+PRIORITY_COLUMN = "Priority"
+DEADLINE_COLUMN = "Deadline"
+PRICE_COLUMN = "Price"
+
+# --order-by で指定できる並び順
+ORDERS = ("sheet", "priority", "price", "deadline")
+
+def _parse_number(value: Optional[str]) -> Optional[float]:
+    if not value:
+        return None
+    try:
+        return float(re.sub(r"[^0-9.\-]", "", str(value)))
+    except ValueError:
+        return None
+
+def parse_deadline(value: Optional[str]) -> Optional[float]:
+    """
+    Deadline列の値（ISO 8601形式の日付または日時）をUNIX時刻にする
+
+    Args:
+        value (str, optional): Deadline列の値（例: "2024-05-31"、"2024-05-31T18:00"）
+
+    Returns:
+        Optional[float]: UNIX時刻。空または解析できない場合はNone（日付だけの場合はその日の終わり）
+    """
+    if not value:
+        return None
+    text = str(value).strip()
+    try:
+        deadline = datetime.fromisoformat(text)
+    except ValueError:
+        logger.warning(f"Deadline列の値を日時として解析できません: {text}")
+        return None
+    if len(text) <= 10:
+        deadline = deadline.replace(hour=23, minute=59, second=59)
+    if deadline.tzinfo is None:
+        return deadline.timestamp()
+    return deadline.astimezone(timezone.utc).timestamp()
+
+def sort_key(order_by: str) -> Callable[[Tuple[int, Dict[str, str]]], Tuple]:
+    """
+    並び順ごとのソートキーを返す（値が同じ場合・値がない行はシートの順）
+
+    Args:
+        order_by (str): "priority"（Priority列の大きい順）、"price"（Price列の高い順）、"deadline"（Deadline列の早い順）
+
+    Returns:
+        Callable: (行番号, 商品データ) を受け取るソートキー
+    """
+    def key(entry: Tuple[int, Dict[str, str]]) -> Tuple:
+        row_index, item = entry
+        if order_by == "priority":
+            value = _parse_number(item.get(PRIORITY_COLUMN))
+            return (value is None, -(value or 0), row_index)
+        if order_by == "price":
+            value = _parse_number(item.get(PRICE_COLUMN))
+            return (value is None, -(value or 0), row_index)
+        value = parse_deadline(item.get(DEADLINE_COLUMN))
+        return (value is None, value or 0, row_index)
+    return key
+
+def order_items(items: Iterable[Tuple[int, Dict[str, str]]], order_by: str) -> Iterable[Tuple[int, Dict[str, str]]]:
+    """
+    処理する行を並べ替える
+    シートの順（"sheet"）以外は全行を読み込んでから並べ替えるため、ファイルから読み込む場合もメモリに保持する
+
+    Args:
+        items (Iterable[Tuple[int, Dict[str, str]]]): (行番号, 商品データ) の並び
+        order_by (str): ORDERS のいずれか
+
+    Returns:
+        Iterable[Tuple[int, Dict[str, str]]]: 並べ替えた (行番号, 商品データ) の並び
+    """
+    if order_by == "sheet":
+        return items
+    ordered = sorted(items, key=sort_key(order_by))
+    logger.info(f"{len(ordered)} 件の行を {order_by} の順に並べ替えました")
+    return ordered
+
+class WorkBudget:
+    """
+    実行時間とTrading APIの呼び出し回数の上限
+    上限内で処理できない行は処理せずに「先送り」として記録し、実行の最後に報告する
+    """
+
+    def __init__(self,
+                 max_seconds: Optional[float] = None,
+                 max_calls: Optional[int] = None,
+                 call_counter: Optional[Callable[[], int]] = None,
+                 estimate_calls: Optional[Callable[[Dict[str, str]], int]] = None):
+        """
+        初期化
+
+        Args:
+            max_seconds (float, optional): 新しい行の処理を始められる時間（秒、開始時から）。Noneの場合は上限なし
+            max_calls (int, optional): Trading APIの呼び出し回数の上限。Noneの場合は上限なし
+            call_counter (Callable[[], int], optional): これまでの呼び出し回数を返す関数
+            estimate_calls (Callable[[Dict[str, str]], int], optional): 1行の処理に必要な呼び出し回数の見積もり
+        """
+        self.max_seconds = max_seconds
+        self.max_calls = max_calls
+        self.call_counter = call_counter or (lambda: 0)
+        self.estimate_calls = estimate_calls or (lambda item: 1)
+        self.started_at = time.monotonic()
+        self._calls_at_start = self.call_counter()
+        self.deferred: List[Dict[str, Any]] = []
+        # 処理を始めたがまだ終わっていない行ごとの、見積もった呼び出し回数
+        # 呼び出し回数の判定では、これから行われる呼び出しとして数える
+        self._reserved: Dict[int, int] = {}
+        self._lock = threading.Lock()
+
+    def calls_used(self) -> int:
+        """
+        開始してからの呼び出し回数
+        """
+        return self.call_counter() - self._calls_at_start
+
+    def calls_reserved(self) -> int:
+        """
+        処理中の行のために確保している呼び出し回数
+        """
+        with self._lock:
+            return sum(self._reserved.values())
+
+    def _deferral_reason(self, estimate: int) -> Optional[str]:
+        if self.max_seconds is not None and time.monotonic() - self.started_at >= self.max_seconds:
+            return "time"
+        if self.max_calls is not None and self.calls_used() + self.calls_reserved() + estimate > self.max_calls:
+            return "calls"
+        return None
+
+    def release(self, row_index: int) -> None:
+        """
+        処理が終わった行のために確保した呼び出し回数を解放する（実際の呼び出しは call_counter で数える）
+
+        Args:
+            row_index (int): 行番号
+        """
+        with self._lock:
+            self._reserved.pop(row_index, None)
+
+    def admit(self,
+              items: Iterable[Tuple[int, Dict[str, str]]],
+              is_done: Optional[Callable[[int], bool]] = None) -> Iterator[Tuple[int, Dict[str, str]]]:
+        """
+        上限内で処理できる行だけを返すイテレータ
+        呼び出し回数の上限を超える行は先送りにし、より少ない呼び出しで済む後続の行は引き続き処理する
+        返した行の見積もりは release() が呼ばれるまで確保するため、
+        並行して処理中の行の呼び出しが終わっていなくても上限を超えて行を受け入れない
+
+        Args:
+            items (Iterable[Tuple[int, Dict[str, str]]]): (行番号, 商品データ) の並び（優先する順）
+            is_done (Callable[[int], bool], optional): 処理済み（チェックポイントで完了済み）の行かどうか。
+                                                       処理済みの行は上限にかかわらずそのまま返す
+
+        Yields:
+            Tuple[int, Dict[str, str]]: 処理する (行番号, 商品データ)
+        """
+        for row_index, item in items:
+            if is_done and is_done(row_index):
+                yield row_index, item
+                continue
+            estimate = self.estimate_calls(item)
+            reason = self._deferral_reason(estimate)
+            if reason:
+                self.deferred.append({
+                    "row_index": row_index,
+                    "title": item.get('Item name'),
+                    "priority": item.get(PRIORITY_COLUMN) or None,
+                    "price": item.get(PRICE_COLUMN) or None,
+                    "deadline": item.get(DEADLINE_COLUMN) or None,
+                    "reason": reason
+                })
+                continue
+            with self._lock:
+                self._reserved[row_index] = estimate
+            yield row_index, item
+
+    def report(self, path: Optional[str] = None) -> None:
+        """
+        先送りにした行をログに出力し、指定された場合はJSONファイルに書き出す
+
+        Args:
+            path (str, optional): 書き出すJSONファイルのパス
+        """
+        elapsed = time.monotonic() - self.started_at
+        logger.info(f"実行時間: {elapsed:.1f}秒, Trading APIの呼び出し: {self.calls_used()} 回")
+        if self.deferred:
+            reasons = {"time": "時間の上限", "calls": "呼び出し回数の上限"}
+            logger.warning(f"{len(self.deferred)} 件の行を先送りにしました")
+            for entry in self.deferred:
+                logger.warning(f"  行 {entry['row_index']}: {entry['title']} ({reasons[entry['reason']]})")
+
+        if path:
+            with open(path, 'w', encoding='utf-8') as f:
+                json.dump({
+                    "elapsed_seconds": round(elapsed, 1),
+                    "calls_used": self.calls_used(),
+                    "deferred": self.deferred
+                }, f, ensure_ascii=False, indent=2)
+            logger.info(f"先送りにした行を '{path}' に書き出しました")
@@ -0,0 +1,84 @@
+import os
+import logging
+from functools import lru_cache
+from typing import Optional, Dict
+
+from config import EBAY_SELLER_PROFILE_DEFAULT
+
+logger = logging.getLogger("ebay_listing.seller_profiles")
+
+# 行ごとに使う出品プロファイルを指定する列
+SELLER_PROFILE_COLUMN = "SellerProfile"
+# プロファイルに含まれるビジネスポリシーの種類（設定値の ":" 区切りの順）
+POLICY_KINDS = ("payment", "return", "shipping")
+
+def parse_seller_profiles(value: str) -> Dict[str, Dict[str, str]]:
+    """
+    "名前=支払いポリシーID:返品ポリシーID:配送ポリシーID" のカンマ区切りリストを解析する
+
+    Args:
+        value (str): 出品プロファイルの設定（例: "default=111:222:333,bulky=111:222:444"）
+                     使わないポリシーのIDは空にできる（例: "noreturn=111::333"）
+
+    Returns:
+        Dict[str, Dict[str, str]]: プロファイル名ごとの {"payment": ID, "return": ID, "shipping": ID}
+
+    Raises:
+        ValueError: 形式が不正な場合
+    """
+    profiles = {}
+    for part in value.split(','):
+        part = part.strip()
+        if not part:
+            continue
+        name, separator, ids = part.partition('=')
+        name = name.strip()
+        policy_ids = [policy_id.strip() for policy_id in ids.split(':')]
+        if not separator or not name or len(policy_ids) != len(POLICY_KINDS):
+            raise ValueError(
+                f"出品プロファイルは \"名前=支払いポリシーID:返品ポリシーID:配送ポリシーID\" の形式で指定してください: {part}"
+            )
+        if not any(policy_ids):
+            raise ValueError(f"ビジネスポリシーのIDを少なくとも1つ指定してください: {part}")
+        if not all(policy_id.isdigit() for policy_id in policy_ids if policy_id):
+            raise ValueError(f"ビジネスポリシーのIDは数字で指定してください: {part}")
+        profiles[name] = dict(zip(POLICY_KINDS, policy_ids))
+    return profiles
+
+@lru_cache(maxsize=None)
+def get_seller_profiles(prefix: str) -> Dict[str, Dict[str, str]]:
+    """
+    出品先ごとの出品プロファイルを取得する
+    <prefix>SELLER_PROFILES（例: EBAY_PRODUCTION_SHOP2_SELLER_PROFILES）、なければ EBAY_SELLER_PROFILES を使う
+
+    Args:
+        prefix (str): 出品先の環境変数の接頭辞（EbayEnvironment.prefix）
+
+    Returns:
+        Dict[str, Dict[str, str]]: プロファイル名ごとのビジネスポリシーのID
+    """
+    return parse_seller_profiles(os.environ.get(f"{prefix}SELLER_PROFILES") or
+                                 os.environ.get("EBAY_SELLER_PROFILES", ""))
+
+def resolve_seller_profile(name: Optional[str], prefix: str) -> Optional[Dict[str, str]]:
+    """
+    行で指定された（またはデフォルトの）出品プロファイルのビジネスポリシーのIDを返す
+
+    Args:
+        name (str, optional): SellerProfile列の値。空の場合は EBAY_SELLER_PROFILE_DEFAULT を使う
+        prefix (str): 出品先の環境変数の接頭辞（EbayEnvironment.prefix）
+
+    Returns:
+        Optional[Dict[str, str]]: {"payment": ID, "return": ID, "shipping": ID}。
+                                  プロファイルを使わない場合はNone（返品・配送の条件を出品ごとに指定する）
+
+    Raises:
+        ValueError: 指定されたプロファイルが設定されていない場合
+    """
+    name = (name or EBAY_SELLER_PROFILE_DEFAULT).strip()
+    if not name:
+        return None
+    profile = get_seller_profiles(prefix).get(name)
+    if profile is None:
+        raise ValueError(f"出品プロファイル '{name}' が {prefix}SELLER_PROFILES / EBAY_SELLER_PROFILES に設定されていません")
+    return profile
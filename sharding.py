@@ -0,0 +1,175 @@
+import os
+import sys
+import json
+import logging
+import subprocess
+import tempfile
+from typing import Optional, List, Dict, Any, Tuple, Iterable, Iterator, TypeVar
+
+from traffic import merge_traffic
+
+logger = logging.getLogger("ebay_listing.sharding")
+
+T = TypeVar("T")
+
+def parse_shard(value: str) -> Tuple[int, int]:
+    """
+    "K/N" 形式のシャード指定を解析する
+
+    Args:
+        value (str): シャード指定（例: "0/4"）
+
+    Returns:
+        Tuple[int, int]: (シャード番号K, シャード数N)
+
+    Raises:
+        ValueError: 形式が不正な場合
+    """
+    try:
+        index, count = (int(part) for part in value.split('/'))
+    except ValueError:
+        raise ValueError(f"シャード指定は K/N 形式で指定してください: {value}")
+
+    if count < 1 or not 0 <= index < count:
+        raise ValueError(f"シャード番号は 0 以上 N 未満で指定してください: {value}")
+    return index, count
+
+def parse_rows(value: str) -> Tuple[int, int]:
+    """
+    "A-B" 形式の行範囲指定を解析する（0から始まる行番号、両端を含む）
+
+    Args:
+        value (str): 行範囲指定（例: "100-199"）
+
+    Returns:
+        Tuple[int, int]: (開始行, 終了行)
+
+    Raises:
+        ValueError: 形式が不正な場合
+    """
+    try:
+        start, end = (int(part) for part in value.split('-'))
+    except ValueError:
+        raise ValueError(f"行範囲は A-B 形式で指定してください: {value}")
+
+    if start < 0 or end < start:
+        raise ValueError(f"行範囲の指定が不正です: {value}")
+    return start, end
+
+def shard_of(row_index: int, shard_count: int) -> int:
+    """
+    行をシャードに割り当てる
+    行番号だけで決まるため、どのプロセス・どのマシンで実行しても同じ結果になる
+
+    Args:
+        row_index (int): 行番号（0から始まる）
+        shard_count (int): シャード数
+
+    Returns:
+        int: 割り当てられたシャード番号
+    """
+    return row_index % shard_count
+
+def select_shard(items: Iterable[Tuple[int, T]], shard_index: int, shard_count: int) -> Iterator[Tuple[int, T]]:
+    """
+    (行番号, 商品データ) の並びから、指定したシャードに属する行だけを取り出す
+
+    Args:
+        items (Iterable[Tuple[int, T]]): (行番号, 商品データ) の並び
+        shard_index (int): シャード番号
+        shard_count (int): シャード数
+
+    Yields:
+        Tuple[int, T]: シャードに属する行
+    """
+    for row, item in items:
+        if shard_of(row, shard_count) == shard_index:
+            yield row, item
+
+def write_summary(path: str, summary: Dict[str, Any]) -> None:
+    """
+    実行結果のサマリーをJSONファイルに書き出す（コーディネーターが集計に使う）
+
+    Args:
+        path (str): 書き出し先のパス
+        summary (Dict[str, Any]): 成功数・失敗数など（と "traffic": Trading APIの送受信量）のサマリー
+    """
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(summary, f)
+
+def _strip_options(argv: List[str], options: List[str]) -> List[str]:
+    """
+    引数リストから値付きオプションを取り除く
+
+    Args:
+        argv (List[str]): 引数リスト
+        options (List[str]): 取り除くオプション名（"--workers" など）
+
+    Returns:
+        List[str]: オプションを取り除いた引数リスト
+    """
+    result = []
+    skip_next = False
+    for arg in argv:
+        if skip_next:
+            skip_next = False
+            continue
+        if arg in options:
+            skip_next = True
+            continue
+        if any(arg.startswith(f"{option}=") for option in options):
+            continue
+        result.append(arg)
+    return result
+
+def run_coordinator(worker_count: int, argv: Optional[List[str]] = None, script: Optional[str] = None) -> Tuple[int, Dict[str, Any]]:
+    """
+    N個のワーカープロセスを起動し、シートをシャードに分けて並列に処理する
+    各ワーカーは独自のプロセスとして動くため、接続プールと呼び出し回数の上限の割り当てもワーカーごとに持つ
+
+    Args:
+        worker_count (int): ワーカープロセスの数
+        argv (List[str], optional): ワーカーに渡す引数。Noneの場合は sys.argv[1:] を使用
+        script (str, optional): 実行するスクリプト。Noneの場合は main.py を使用
+
+    Returns:
+        Tuple[int, Dict[str, Any]]: (終了コード, 全ワーカーの集計結果と "traffic": API名ごとの送受信量)
+    """
+    base_args = _strip_options(argv if argv is not None else sys.argv[1:], ["--workers", "--shard", "--summary-file"])
+    script = script or os.path.join(os.path.dirname(os.path.abspath(__file__)), "main.py")
+
+    totals = {"success": 0, "failure": 0, "skipped": 0, "deferred": 0}
+    traffics = []
+    exit_code = 0
+
+    with tempfile.TemporaryDirectory(prefix="ebay_shards_") as tmp_dir:
+        workers = []
+        for index in range(worker_count):
+            summary_path = os.path.join(tmp_dir, f"shard_{index}.json")
+            command = [sys.executable, script, *base_args,
+                       "--shard", f"{index}/{worker_count}",
+                       "--summary-file", summary_path]
+            logger.info(f"ワーカー {index}/{worker_count} を起動します")
+            workers.append((index, summary_path, subprocess.Popen(command)))
+
+        for index, summary_path, process in workers:
+            code = process.wait()
+            if code != 0:
+                exit_code = 1
+
+            if not os.path.exists(summary_path):
+                logger.error(f"ワーカー {index} の結果が取得できませんでした（終了コード: {code}）")
+                exit_code = 1
+                continue
+
+            with open(summary_path, 'r', encoding='utf-8') as f:
+                summary = json.load(f)
+            for key in totals:
+                totals[key] += summary.get(key, 0)
+            traffics.append(summary.get("traffic", {}))
+            logger.info(f"ワーカー {index} が終了しました（終了コード: {code}, 成功: {summary.get('success', 0)}, "
+                        f"失敗: {summary.get('failure', 0)}）")
+
+    # Trading APIの送受信量はAPI名ごとに合計する
+    totals["traffic"] = merge_traffic(traffics)
+    return exit_code, totals
@@ -0,0 +1,67 @@
+import os
+import json
+import logging
+import tempfile
+from typing import Any
+
+from config import STATE_DIR
+
+logger = logging.getLogger("ebay_listing.state_store")
+
+def state_path(name: str) -> str:
+    """
+    状態ファイルのパスを取得する
+
+    Args:
+        name (str): 状態の名前（拡張子なし）
+
+    Returns:
+        str: 状態ファイルのパス
+    """
+    return os.path.join(STATE_DIR, f"{name}.json")
+
+def load_state(name: str, default: Any = None) -> Any:
+    """
+    JSONで保存された状態を読み込む
+
+    Args:
+        name (str): 状態の名前
+        default (Any): 状態がない、または読み込めない場合に返す値
+
+    Returns:
+        Any: 保存されている状態
+    """
+    path = state_path(name)
+    if not os.path.exists(path):
+        return default
+
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError) as e:
+        logger.warning(f"状態ファイル '{path}' を読み込めませんでした: {str(e)}")
+        return default
+
+def save_state(name: str, data: Any) -> None:
+    """
+    状態をJSONで保存する
+    一時ファイルに書き込んでから置き換えるため、途中で停止しても壊れたファイルは残らない
+
+    Args:
+        name (str): 状態の名前
+        data (Any): 保存する状態（JSONに変換できる値）
+    """
+    path = state_path(name)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), prefix=f".{name}.", suffix=".tmp")
+    try:
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            json.dump(data, f, ensure_ascii=False)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
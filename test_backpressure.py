@@ -0,0 +1,88 @@
+"""
+前処理済みの画像の上限（ByteBudget）と、処理中の画像のキャッシュへのピン留めのテスト
+"""
+
+import os
+import threading
+
+import pytest
+
+import image_cache
+from backpressure import ByteBudget
+from image_cache import ImageCache, EVICTION_GRACE_SECONDS, pin_images, unpin_images
+
+def _start(target, *args):
+    thread = threading.Thread(target=target, args=args, daemon=True)
+    thread.start()
+    return thread
+
+def test_acquire_waits_until_released():
+    """
+    上限を超える場合は、保持している分が解放されるまで acquire を待たせる
+    """
+    budget = ByteBudget(100, "テスト")
+    budget.acquire(60)
+    thread = _start(budget.acquire, 50)
+    thread.join(0.05)
+    assert thread.is_alive()
+    assert budget.waits == 1
+
+    budget.release(60)
+    thread.join(1)
+    assert not thread.is_alive()
+    assert budget.used == 50
+
+def test_oversized_request_is_accepted_when_empty():
+    """
+    1つで上限を超える大きさのものは、他に何も保持していなければ待たずに受け入れる
+    """
+    budget = ByteBudget(100)
+    budget.acquire(500)
+    assert budget.used == 500
+
+    thread = _start(budget.acquire, 1)
+    thread.join(0.05)
+    assert thread.is_alive()
+    budget.release(500)
+    thread.join(1)
+    assert budget.used == 1 and budget.waits == 1
+
+def test_unlimited_and_reserve():
+    """
+    上限が0の場合は何も数えず、reserve は with ブロックを抜けると解放する
+    """
+    unlimited = ByteBudget(0)
+    unlimited.acquire(10 ** 9)
+    assert unlimited.used == 0
+
+    budget = ByteBudget(100)
+    with pytest.raises(RuntimeError):
+        with budget.reserve(80):
+            assert budget.used == 80
+            raise RuntimeError
+    assert budget.used == 0
+
+def test_pinned_images_are_not_evicted(tmp_path, monkeypatch):
+    """
+    ピン留めされた画像は猶予期間を過ぎても削除せず、解放された後は通常どおり古いものから削除する
+    """
+    now = [1_000_000.0]
+    monkeypatch.setattr(image_cache.time, "time", lambda: now[0])
+    cache = ImageCache(str(tmp_path), max_bytes=150)
+    a = cache.put("https://example.com/a.jpg", [b"x" * 100])
+    pin_images([a, a])
+
+    now[0] += EVICTION_GRACE_SECONDS * 2
+    b = cache.put("https://example.com/b.jpg", [b"x" * 100])
+    assert os.path.exists(a) and os.path.exists(b)
+
+    # 同じ画像を使う行がすべて終わるまで削除しない
+    unpin_images([a])
+    now[0] += EVICTION_GRACE_SECONDS * 2
+    c = cache.put("https://example.com/c.jpg", [b"x" * 100])
+    assert os.path.exists(a) and not os.path.exists(b)
+
+    unpin_images([a])
+    now[0] += EVICTION_GRACE_SECONDS * 2
+    cache.put("https://example.com/d.jpg", [b"x" * 100])
+    assert not os.path.exists(a) and not os.path.exists(c)
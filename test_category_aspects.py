@@ -0,0 +1,79 @@
+"""
+カテゴリのItem Specificsの定義に従った出品前の検証のテスト
+"""
+
+import time
+import threading
+
+import category_aspects
+import state_store
+from category_aspects import CategoryAspectCache, apply_category_aspects
+
+ASPECTS = [
+    {"name": "Brand", "required": True, "selection_only": False, "values": ["Canon", "Nikon"]},
+    {"name": "Type", "required": True, "selection_only": True, "values": ["Digital", "Film"]},
+    {"name": "Model", "required": True, "selection_only": False, "values": []},
+    {"name": "Material", "required": False, "selection_only": False, "values": []},
+]
+
+def test_names_are_normalized_and_unknown_names_removed():
+    """
+    項目名の大文字・小文字をカテゴリの定義に合わせ、カテゴリにない項目を取り除く
+    """
+    specifics, problems = apply_category_aspects(
+        [{"Name": "brand", "Value": "Canon"}, {"Name": "TYPE", "Value": "Film"},
+         {"Name": "Model", "Value": "AE-1"}, {"Name": "Color", "Value": "Black"}],
+        ASPECTS)
+
+    assert specifics == [{"Name": "Brand", "Value": "Canon"}, {"Name": "Type", "Value": "Film"},
+                         {"Name": "Model", "Value": "AE-1"}]
+    assert problems == []
+
+def test_selection_only_values_are_checked():
+    """
+    選択肢からしか選べない項目の値が選択肢にない場合は問題として返す
+    """
+    specifics, problems = apply_category_aspects(
+        [{"Name": "Brand", "Value": "Leica"}, {"Name": "Type", "Value": "Instant"},
+         {"Name": "Model", "Value": "M6"}],
+        ASPECTS)
+
+    # 自由入力できる項目は選択肢にない値でもよい
+    assert specifics == [{"Name": "Brand", "Value": "Leica"}, {"Name": "Model", "Value": "M6"}]
+    assert problems == ["'Type' の値 'Instant' は選択肢にありません"]
+
+def test_defaults_fill_only_missing_required_aspects():
+    """
+    足りない必須項目だけをデフォルト値で補い、必須でない項目や行で指定された項目には使わない
+    """
+    defaults = [{"Name": "Brand", "Value": "Unbranded"}, {"Name": "Material", "Value": "Metal"},
+                {"Name": "Type", "Value": "Digital"}]
+    specifics, problems = apply_category_aspects([{"Name": "Type", "Value": "Film"}], ASPECTS, defaults)
+
+    assert specifics == [{"Name": "Type", "Value": "Film"}, {"Name": "Brand", "Value": "Unbranded"}]
+    assert problems == ["必須のItem Specifics 'Model' がありません"]
+
+def test_concurrent_refreshes_keep_each_others_categories(monkeypatch, tmp_path):
+    """
+    複数のプロセス（ここでは別々のキャッシュ）が同時に取得し直しても、互いが保存したカテゴリを消さない
+    """
+    monkeypatch.setattr(state_store, "STATE_DIR", str(tmp_path))
+    monkeypatch.setattr(category_aspects, "get_category_specifics",
+                        lambda chunk, environment, *limits: {category_id: ASPECTS for category_id in chunk})
+    load_state = category_aspects.load_state
+
+    def slow_load_state(name, default):
+        # 読み込みから保存までの間に他のキャッシュが保存する状況を作る
+        state = load_state(name, default)
+        time.sleep(0.01)
+        return state
+    monkeypatch.setattr(category_aspects, "load_state", slow_load_state)
+
+    caches = [CategoryAspectCache("sandbox") for _ in range(8)]
+    threads = [threading.Thread(target=cache.refresh, args=([str(i)], None)) for i, cache in enumerate(caches)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert sorted(state_store.load_state("category_aspects_sandbox", {})) == [str(i) for i in range(8)]
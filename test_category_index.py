@@ -0,0 +1,107 @@
+"""
+オフラインのカテゴリ分類（カテゴリツリーの索引と出品履歴）のテスト
+小さな固定のカテゴリツリーを使い、eBay APIは呼び出さない
+"""
+
+import pytest
+
+import category_index
+import state_store
+from category_index import (CategoryTreeIndex, CategoryLedger, CategoryClassifier,
+                            save_category_tree, get_category_classifier)
+
+CATEGORIES = [
+    ["1", "Cameras & Photo", None, 0],
+    ["10", "Digital Cameras", "1", 1],
+    ["11", "Film Cameras", "1", 1],
+    ["12", "Camera Lenses", "1", 1],
+    ["2", "Toys & Hobbies", None, 0],
+    ["20", "Action Figures", "2", 1],
+]
+
+@pytest.fixture
+def state_dir(monkeypatch, tmp_path):
+    monkeypatch.setattr(state_store, "STATE_DIR", str(tmp_path))
+    monkeypatch.setattr(category_index, "STATE_DIR", str(tmp_path))
+    monkeypatch.setattr(category_index, "_classifiers", {})
+    return tmp_path
+
+def test_tree_index_paths_and_leaves():
+    """
+    パスは上位カテゴリ名をルートから順に並べ、出品できるのは葉カテゴリだけ
+    """
+    index = CategoryTreeIndex(CATEGORIES)
+    assert index.path("10") == "Cameras & Photo > Digital Cameras"
+    assert index.is_leaf("10")
+    assert not index.is_leaf("1")
+
+def test_tree_index_prefers_fully_matched_leaf():
+    """
+    葉カテゴリ名のトークンがすべてタイトルに含まれるカテゴリを選び、差が十分あれば確信度を下げない
+    """
+    index = CategoryTreeIndex(CATEGORIES)
+    category_id, confidence = index.classify("Canon EOS digital cameras body")
+    assert category_id == "10"
+    assert 0.5 < confidence <= 1.0
+
+    assert index.classify("Star Wars action figure")[0] == "20"
+    assert index.classify("Vintage teapot") == (None, 0.0)
+
+def test_tree_index_halves_confidence_when_ambiguous(monkeypatch):
+    """
+    1位と2位のスコアの差が MIN_MARGIN より小さい場合は、あいまいとして確信度を半分にする
+    """
+    index = CategoryTreeIndex(CATEGORIES)
+    ambiguous_id, ambiguous = index.classify("camera")
+    assert ambiguous_id in {"10", "11", "12"}
+
+    monkeypatch.setattr(category_index, "MIN_MARGIN", 0.0)
+    assert index.classify("camera") == (ambiguous_id, ambiguous * 2)
+
+def test_ledger_exact_and_similar_titles(tmp_path):
+    """
+    トークンが同じタイトルは確信度1.0、似ているタイトルはJaccard係数を確信度として返し、履歴はファイルから読み直せる
+    """
+    path = str(tmp_path / "ledger.jsonl")
+    ledger = CategoryLedger(path)
+    ledger.record("Canon EOS 5D Mark II", "10")
+    ledger.record("Nikon F3 film body", "11")
+
+    assert ledger.classify("canon eos 5d mark ii") == ("10", 1.0)
+    category_id, confidence = ledger.classify("Canon EOS 5D")
+    assert category_id == "10"
+    assert confidence == pytest.approx(3 / 5)
+    assert ledger.classify("Teapot") == (None, 0.0)
+
+    assert CategoryLedger(path).classify("nikon f3 film body") == ("11", 1.0)
+
+def test_classifier_uses_the_more_confident_source(state_dir):
+    """
+    出品履歴とカテゴリツリーの索引のうち、確信度の高い方の推定を使う
+    """
+    classifier = CategoryClassifier("sandbox")
+    assert classifier.index is None
+    assert classifier.classify("Canon digital camera") == (None, 0.0)
+
+    save_category_tree("sandbox", {"version": "1", "categories": [
+        {"category_id": c, "name": n, "parent_id": p, "leaf": bool(leaf)} for c, n, p, leaf in CATEGORIES]})
+    classifier = CategoryClassifier("sandbox")
+    assert classifier.classify("Canon digital camera")[0] == "10"
+
+    # 履歴と完全に一致するタイトルは、索引の推定より優先する
+    classifier.record("Canon digital camera", 12)
+    assert classifier.classify("Canon digital camera") == ("12", 1.0)
+
+def test_saving_the_tree_rebuilds_the_shared_classifier(state_dir):
+    """
+    カテゴリツリーを保存し直すと、共有している分類器を作り直して新しい索引を使う
+    """
+    classifier = get_category_classifier("sandbox")
+    assert get_category_classifier("sandbox") is classifier
+    assert classifier.index is None
+
+    assert save_category_tree("sandbox", {"version": "1", "categories": [
+        {"category_id": "10", "name": "Digital Cameras", "parent_id": None, "leaf": True}]}) == 1
+    rebuilt = get_category_classifier("sandbox")
+    assert rebuilt is not classifier
+    assert rebuilt.classify("digital camera")[0] == "10"
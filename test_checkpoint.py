@@ -0,0 +1,93 @@
+"""
+チェックポイント（中断からの再開）のテスト
+"""
+
+import json
+
+from checkpoint import CheckpointJournal, checkpoint_path
+
+RUN_INFO = {"spreadsheet_id": "sheet", "env": "sandbox", "shard": None}
+
+def _record_rows(path, run_info=RUN_INFO):
+    journal = CheckpointJournal(path)
+    journal.start(run_info)
+    journal.record(0, {"success": True, "item_id": "111", "picture_urls": ["https://i.ebayimg.com/a.jpg"]},
+                   image_ref="a.jpg")
+    journal.record(1, {"success": False, "error": "timeout", "picture_urls": ["https://i.ebayimg.com/b.jpg"]},
+                   image_ref="b.jpg")
+    journal.close()
+
+def test_resume_replays_journal(tmp_path):
+    """
+    再開時に出品済みの行とアップロード済みの画像URLを読み込む
+    """
+    path = str(tmp_path / "checkpoint.jsonl")
+    _record_rows(path)
+
+    journal = CheckpointJournal(path)
+    journal.start(RUN_INFO, resume=True)
+    try:
+        assert journal.completed_rows() == [0]
+        assert journal.is_completed(0)
+        assert not journal.is_completed(1)
+        # 失敗した行もアップロード済みの画像は再利用する（image列が同じ場合だけ）
+        assert journal.reusable_picture_urls(1, "b.jpg") == ["https://i.ebayimg.com/b.jpg"]
+        assert journal.reusable_picture_urls(1, "changed.jpg") is None
+
+        # 再開後の記録は追記される
+        journal.record(1, {"success": True, "item_id": "222", "picture_urls": []}, image_ref="b.jpg")
+    finally:
+        journal.close()
+
+    journal = CheckpointJournal(path)
+    journal.start(RUN_INFO, resume=True)
+    journal.close()
+    assert journal.completed_rows() == [0, 1]
+
+def test_resume_ignores_truncated_last_line(tmp_path):
+    """
+    書き込み途中で停止した最終行は無視して再開する
+    """
+    path = str(tmp_path / "checkpoint.jsonl")
+    _record_rows(path)
+    with open(path, 'a', encoding='utf-8') as f:
+        f.write('{"type": "item", "row_index": 2, "outc')
+
+    journal = CheckpointJournal(path)
+    journal.start(RUN_INFO, resume=True)
+    journal.close()
+    assert journal.completed_rows() == [0]
+
+def test_resume_with_different_run_starts_over(tmp_path):
+    """
+    実行条件が異なるチェックポイントからは再開せず、新しく作り直す
+    """
+    path = str(tmp_path / "checkpoint.jsonl")
+    _record_rows(path)
+
+    journal = CheckpointJournal(path)
+    journal.start({**RUN_INFO, "env": "production"}, resume=True)
+    journal.close()
+    assert journal.completed_rows() == []
+    with open(path, 'r', encoding='utf-8') as f:
+        records = [json.loads(line) for line in f]
+    assert [record["type"] for record in records] == ["run"]
+
+def test_start_without_resume_truncates(tmp_path):
+    """
+    --resume を指定しない場合は前回の記録を使わない
+    """
+    path = str(tmp_path / "checkpoint.jsonl")
+    _record_rows(path)
+
+    journal = CheckpointJournal(path)
+    journal.start(RUN_INFO)
+    journal.close()
+    assert journal.completed_rows() == []
+
+def test_checkpoint_path_per_account_and_shard():
+    """
+    アカウントとシャードごとに別のファイルを使う
+    """
+    assert checkpoint_path("sandbox").endswith("checkpoint_sandbox.jsonl")
+    assert checkpoint_path("production", (1, 4), "shop2").endswith("checkpoint_production_shop2_shard1of4.jsonl")
@@ -0,0 +1,120 @@
+"""
+失敗した商品の記録（デッドレターキュー）と redrive のテスト
+"""
+
+import json
+import argparse
+
+import pytest
+
+import main
+from dead_letter import DeadLetterQueue
+from traffic import TrafficStats
+
+ITEM = {"Item name": "Camera", "Price": "100"}
+API_ERROR = "eBay APIエラー: コード=21916, メッセージ=Picture is too small."
+CONNECTION_ERROR = "eBay API接続エラー: timeout"
+
+def _failure(error, attempts=3, item_id=None):
+    return {"success": False, "item_id": item_id, "error": error, "attempts": attempts}
+
+def _success(item_id="111"):
+    return {"success": True, "item_id": item_id, "error": None, "attempts": 1}
+
+@pytest.fixture
+def path(tmp_path):
+    return str(tmp_path / "dead_letters_sandbox.jsonl")
+
+def test_failures_are_recorded_and_resolved(path):
+    """
+    失敗した行はデータ・エラー・分類・エラーコードとともに記録し、後で成功した行は解決済みにする
+    一度も失敗していない行の成功は記録しない
+    """
+    queue = DeadLetterQueue(path)
+    queue.record("sheet|Sheet1", 2, ITEM, _failure(API_ERROR))
+    queue.record("sheet|Sheet1", 3, ITEM, _success())
+
+    [entry] = queue.pending()
+    assert (entry["row_index"], entry["item"], entry["error_class"], entry["error_codes"]) == (
+        2, ITEM, "api", ["21916"])
+
+    queue.record("sheet|Sheet1", 2, ITEM, _success())
+    assert queue.pending() == []
+    with open(path, encoding='utf-8') as f:
+        assert [json.loads(line)["type"] for line in f] == ["failed", "resolved"]
+
+    assert queue.compact() == 0
+
+def test_pending_is_filtered_by_class_and_code(path):
+    """
+    エラーの分類・エラーコードで絞り込み、入力元・行番号の順に返す
+    """
+    queue = DeadLetterQueue(path)
+    queue.record("sheet|Sheet1", 5, ITEM, _failure(CONNECTION_ERROR))
+    queue.record("sheet|Sheet1", 1, ITEM, _failure(API_ERROR))
+    queue.record("sheet|Sheet1", 3, ITEM, _failure("予期しないエラー"))
+
+    assert [entry["row_index"] for entry in queue.pending()] == [1, 3, 5]
+    assert [entry["row_index"] for entry in queue.pending(error_classes=["connection", "unexpected"])] == [3, 5]
+    assert [entry["row_index"] for entry in queue.pending(error_codes=["21916"])] == [1]
+    assert queue.pending(error_codes=["240"]) == []
+
+def test_attempts_accumulate_across_runs(path):
+    """
+    解決されるまでの試行回数は、実行（別のプロセス）をまたいで合計する
+    """
+    DeadLetterQueue(path).record("sheet|Sheet1", 2, ITEM, _failure(CONNECTION_ERROR, attempts=3))
+    queue = DeadLetterQueue(path)
+    queue.record("sheet|Sheet1", 2, ITEM, _failure(CONNECTION_ERROR, attempts=2))
+    assert queue.pending()[0]["attempts"] == 5
+
+    queue.record("sheet|Sheet1", 2, ITEM, _success())
+    queue.record("sheet|Sheet1", 2, ITEM, _failure(CONNECTION_ERROR, attempts=1))
+    assert queue.pending()[0]["attempts"] == 1
+
+def test_only_a_truncated_final_line_is_skipped(path):
+    """
+    書き込み途中で停止した最終行だけを無視し、次の追記の前に取り除く
+    最終行以外の読み込めない行は、記録を失わないようにエラーにする
+    """
+    queue = DeadLetterQueue(path)
+    queue.record("sheet|Sheet1", 1, ITEM, _failure(API_ERROR))
+    with open(path, 'a', encoding='utf-8') as f:
+        f.write('{"type": "failed", "key": "sheet|Sheet1#2", "item": {"Item name": "カメ')
+
+    queue = DeadLetterQueue(path)
+    assert [entry["row_index"] for entry in queue.pending()] == [1]
+    queue.record("sheet|Sheet1", 3, ITEM, _failure(API_ERROR))
+    assert [entry["row_index"] for entry in queue.pending()] == [1, 3]
+
+    with open(path, 'a', encoding='utf-8') as f:
+        f.write('{"type": \n')
+        f.write(json.dumps({"type": "resolved", "key": "sheet|Sheet1#1"}) + "\n")
+    with pytest.raises(ValueError):
+        DeadLetterQueue(path)
+
+class FakeEnvironment:
+    label = "sandbox"
+
+    def __init__(self):
+        self.traffic = TrafficStats()
+
+def test_redrive_resolves_entries(path, monkeypatch):
+    """
+    redrive は記録された行のデータで再処理し、成功した行を解決済みにする（更新に失敗した出品は同じ出品を更新する）
+    """
+    queue = DeadLetterQueue(path)
+    queue.record("sheet|Sheet1", 1, ITEM, _failure(CONNECTION_ERROR, item_id="999"))
+    queue.record("sheet|Sheet1", 2, ITEM, _failure(API_ERROR))
+    monkeypatch.setattr(main, "get_dead_letter_queue", lambda label: queue)
+
+    calls = []
+    def process(item, ebay_env, item_id=None):
+        calls.append(item_id)
+        return _success(item_id or "222")
+    monkeypatch.setattr(main, "process_item_detailed", process)
+
+    args = argparse.Namespace(error_code=None, error_class=["connection"], summary_file=None)
+    assert main.redrive(args, [FakeEnvironment()]) == 0
+    assert calls == ["999"]
+    assert [entry["row_index"] for entry in queue.pending()] == [2]
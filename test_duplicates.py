@@ -0,0 +1,57 @@
+"""
+シート内の重複した行の検出・集約のテスト
+"""
+
+from duplicates import dedupe_rows, parse_quantity
+
+ROWS = [
+    (0, {"Item name": "Vintage Camera!", "image": "a.jpg, b.jpg", "Brand": "Canon", "Quantity": "2"}),
+    (1, {"Item name": "Blue Mug", "image": "c.jpg", "Brand": "Acme", "Quantity": ""}),
+    (2, {"Item name": "vintage  camera", "image": "b.jpg,a.jpg", "Brand": " CANON ", "Quantity": "3"}),
+    (3, {"Item name": "Vintage Camera", "image": "a.jpg,b.jpg", "Brand": "Nikon", "Quantity": "1"}),
+    (4, {"Item name": "Blue Mug", "image": "c.jpg", "Brand": "Acme", "Quantity": "x"}),
+]
+
+def test_report_keeps_all_rows():
+    """
+    report では重複を報告するだけで、すべての行を出品する
+    """
+    assert dedupe_rows(ROWS, "report") == ROWS
+
+def test_collapse_merges_duplicates_and_sums_quantity():
+    """
+    collapse では重複した行を最初の行にまとめ、数量を合計する
+    タイトルの記号・空白・大文字小文字、その他の列の空白・大文字小文字、画像の順序は無視する
+    """
+    result = dedupe_rows(ROWS, "collapse", default_quantity=1)
+
+    assert [row for row, _ in result] == [0, 1, 3]
+    items = dict(result)
+    assert items[0]["Quantity"] == "5"
+    # 空・整数でない数量はデフォルトの数量として数える
+    assert items[1]["Quantity"] == "2"
+    # Item Specificsが異なる行は別の商品
+    assert items[3]["Quantity"] == "1"
+    # 元の行のデータは変更しない
+    assert ROWS[0][1]["Quantity"] == "2"
+
+def test_ignored_columns_are_not_compared():
+    """
+    比較に含めない列（書き戻した出品結果など）が異なっても重複とみなす
+    """
+    rows = [
+        (0, {"Item name": "Lamp", "ItemID": "111"}),
+        (1, {"Item name": "Lamp", "ItemID": ""}),
+    ]
+    assert [row for row, _ in dedupe_rows(rows, "collapse")] == [0, 1]
+    assert [row for row, _ in dedupe_rows(rows, "collapse", ignore=["ItemID"])] == [0]
+
+def test_parse_quantity():
+    """
+    Quantity列の値を1以上の整数にする
+    """
+    assert parse_quantity("3") == 3
+    assert parse_quantity(" 2.0 ") == 2
+    assert parse_quantity("0") is None
+    assert parse_quantity("") is None
+    assert parse_quantity(None) is None
@@ -0,0 +1,106 @@
+"""
+複数の出品先への並行処理（fan_out）のテスト
+"""
+
+import threading
+
+import pytest
+
+from fanout import fan_out, parse_targets
+
+def test_parse_targets():
+    """
+    "環境[:アカウント]" のリストを解析する
+    """
+    assert parse_targets("sandbox, production:shop2") == [("sandbox", None), ("production", "shop2")]
+    for value in ("", "staging", "sandbox,sandbox"):
+        with pytest.raises(ValueError):
+            parse_targets(value)
+
+def test_each_row_is_prepared_once_and_sent_to_every_target():
+    """
+    各行は一度だけ前処理し、すべての出品先に同じ前処理結果を渡す
+    すべての出品先での処理が終わった行は行番号と前処理結果を release に渡す
+    """
+    rows = [(row, {"Item name": f"item {row}"}) for row in range(5)]
+    prepared_rows = []
+    received = {}
+    released = []
+    lock = threading.Lock()
+
+    def prepare(row_index, item):
+        prepared_rows.append(row_index)
+        return f"prepared {row_index}"
+
+    def worker(target, entries):
+        for row_index, item, prepared in entries:
+            with lock:
+                received.setdefault(target, []).append((row_index, prepared))
+        return {"success": len(received[target]), "failure": 0}
+
+    def release(row_index, prepared):
+        with lock:
+            released.append((row_index, prepared))
+
+    results = fan_out(rows, ["a", "b"], prepare, worker, max_in_flight=2, release=release)
+
+    assert prepared_rows == [0, 1, 2, 3, 4]
+    expected = [(row, f"prepared {row}") for row in range(5)]
+    assert received == {"a": expected, "b": expected}
+    assert sorted(released) == expected
+    assert results == {"a": {"success": 5, "failure": 0}, "b": {"success": 5, "failure": 0}}
+
+def test_slow_target_limits_rows_in_flight():
+    """
+    最も遅い出品先が追いつくまで、max_in_flight を超えて前処理しない
+    """
+    rows = [(row, {}) for row in range(6)]
+    in_flight = [0]
+    peak = [0]
+    lock = threading.Lock()
+    resume_slow = threading.Event()
+
+    def prepare(row_index, item):
+        with lock:
+            in_flight[0] += 1
+            peak[0] = max(peak[0], in_flight[0])
+            if in_flight[0] == 2:
+                resume_slow.set()
+        return row_index
+
+    def release(row_index, prepared):
+        with lock:
+            in_flight[0] -= 1
+
+    def worker(target, entries):
+        count = 0
+        for _ in entries:
+            if target == "slow":
+                resume_slow.wait(timeout=5)
+            count += 1
+        return {"success": count}
+
+    results = fan_out(rows, ["fast", "slow"], prepare, worker, max_in_flight=2, release=release)
+
+    assert peak[0] == 2
+    assert in_flight[0] == 0
+    assert results["slow"] == {"success": 6}
+
+def test_failing_target_does_not_block_others():
+    """
+    出品先の1つが例外で止まっても、他の出品先はすべての行を処理する
+    """
+    rows = [(row, {}) for row in range(4)]
+
+    def worker(target, entries):
+        count = 0
+        for _ in entries:
+            if target == "broken":
+                raise RuntimeError("接続エラー")
+            count += 1
+        return {"success": count}
+
+    results = fan_out(rows, ["ok", "broken"], lambda row_index, item: None, worker, max_in_flight=1)
+
+    assert results["ok"] == {"success": 4}
+    assert results["broken"]["aborted"] == 1
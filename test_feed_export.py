@@ -0,0 +1,63 @@
+"""
+一括出品フィードの書き出しと検証のテスト
+"""
+
+import os
+
+import pytest
+
+from ebay_lister import build_item_payload
+from feed_export import FeedWriter, validate_feed
+
+def _item(title="Test item", category_id="1234"):
+    return build_item_payload(title, category_id, [{"Name": "Brand", "Value": "X"}],
+                              ["https://i.example.com/a.jpg"], merge_defaults=False)
+
+@pytest.mark.parametrize("name", ["feed.xml", "feed.xml.gz"])
+def test_written_feed_is_valid(tmp_path, name):
+    """
+    書き出したフィードが検証を通る（gzip圧縮したフィードも読み込める）
+    """
+    path = str(tmp_path / name)
+    with FeedWriter(path) as writer:
+        writer.add("0", _item())
+        writer.add("1", _item(title="Title with <special> & characters"))
+
+    assert validate_feed(path) == {"requests": 2, "invalid": 0, "errors": []}
+    assert os.listdir(str(tmp_path)) == [name]
+
+def test_invalid_requests_are_reported(tmp_path):
+    """
+    問題のあるリクエストをMessageID付きで報告する
+    """
+    path = str(tmp_path / "feed.xml")
+    bad = _item(title="x" * 81, category_id="abc")
+    bad["Quantity"] = "0"
+    del bad["PictureDetails"]
+    with FeedWriter(path) as writer:
+        writer.add("0", _item())
+        writer.add("0", _item())
+        writer.add("2", bad)
+
+    report = validate_feed(path)
+    assert report["requests"] == 3
+    assert report["invalid"] == 2
+    assert report["errors"] == [
+        "MessageID=0: MessageID が重複しています",
+        "MessageID=2: Title が 80 文字を超えています",
+        "MessageID=2: PrimaryCategory/CategoryID が不正です",
+        "MessageID=2: Quantity が1未満です",
+        "MessageID=2: PictureDetails/PictureURL がありません",
+    ]
+
+def test_failed_export_leaves_no_file(tmp_path):
+    """
+    書き出しの途中でエラーになった場合は、不完全なフィードを残さない
+    """
+    path = str(tmp_path / "feed.xml")
+    with pytest.raises(RuntimeError):
+        with FeedWriter(path) as writer:
+            writer.add("0", _item())
+            raise RuntimeError("中断")
+
+    assert os.listdir(str(tmp_path)) == []
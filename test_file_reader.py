@@ -0,0 +1,60 @@
+"""
+CSV・JSON Linesファイルからの商品データの読み込みのテスト
+"""
+
+import json
+
+import pytest
+
+from file_reader import iter_file_rows
+
+def test_csv_rows(tmp_path):
+    """
+    ヘッダーをキーとする辞書にし、空の行は飛ばし、足りない列は空文字にする
+    """
+    path = tmp_path / "items.csv"
+    path.write_bytes("\ufeffItem name,image,Brand\n"
+                     "Camera,a.jpg,Canon\n"
+                     ",,\n"
+                     "\"Mug, blue\",b.jpg\n".encode('utf-8'))
+
+    assert list(iter_file_rows(str(path))) == [
+        (0, {"Item name": "Camera", "image": "a.jpg", "Brand": "Canon"}),
+        (1, {"Item name": "Mug, blue", "image": "b.jpg", "Brand": ""}),
+    ]
+
+def test_jsonl_rows(tmp_path):
+    """
+    値を文字列にし（nullは空文字）、空の行は飛ばす
+    """
+    path = tmp_path / "items.jsonl"
+    path.write_text(json.dumps({"Item name": "Camera", "Price": 12.5, "Brand": None}) + "\n"
+                    "\n"
+                    + json.dumps({"Item name": "カメラ"}, ensure_ascii=False) + "\n", encoding='utf-8')
+
+    assert list(iter_file_rows(str(path))) == [
+        (0, {"Item name": "Camera", "Price": "12.5", "Brand": ""}),
+        (1, {"Item name": "カメラ"}),
+    ]
+
+def test_row_index_and_range(tmp_path):
+    """
+    指定した行・範囲だけを返し、行番号はファイル内の位置のままにする
+    """
+    path = tmp_path / "items.jsonl"
+    path.write_text("".join(json.dumps({"Item name": f"item {i}"}) + "\n" for i in range(10)), encoding='utf-8')
+
+    assert [row for row, _ in iter_file_rows(str(path), row_index=3)] == [3]
+    assert [row for row, _ in iter_file_rows(str(path), row_range=(7, 20))] == [7, 8, 9]
+
+def test_invalid_files(tmp_path):
+    """
+    対応していない拡張子と、JSONオブジェクトでない行はエラーにする
+    """
+    with pytest.raises(ValueError):
+        list(iter_file_rows(str(tmp_path / "items.xlsx")))
+
+    path = tmp_path / "items.jsonl"
+    path.write_text('["not", "an", "object"]\n', encoding='utf-8')
+    with pytest.raises(ValueError):
+        list(iter_file_rows(str(path)))
@@ -0,0 +1,97 @@
+"""
+Googleのアクセストークンをディスクに保存して共有する資格情報（CachedServiceAccountCredentials）のテスト
+トークンの取得（JWTの交換）は呼び出さず、取得した回数を数えるスタブに置き換える
+"""
+
+import time
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from google.auth import crypt
+from google.oauth2 import service_account
+
+import state_store
+from google_token_cache import CachedServiceAccountCredentials, TOKEN_CACHE_STATE, TOKEN_REFRESH_MARGIN_SECONDS
+
+SCOPES = ["https://www.googleapis.com/auth/spreadsheets.readonly"]
+
+class FakeSigner(crypt.Signer):
+    """
+    秘密鍵を使わずに署名したことにする署名器
+    """
+
+    @property
+    def key_id(self):
+        return None
+
+    def sign(self, message):
+        return b"signature"
+
+@pytest.fixture
+def grants(monkeypatch, tmp_path):
+    monkeypatch.setattr(state_store, "STATE_DIR", str(tmp_path))
+    issued = []
+    grants_lifetime = [3600]
+
+    def jwt_grant(request, token_uri, assertion):
+        issued.append(assertion)
+        expiry = datetime.now(timezone.utc).replace(tzinfo=None) + timedelta(seconds=grants_lifetime[0])
+        return f"token-{len(issued)}", expiry, {}
+    monkeypatch.setattr(service_account._client, "jwt_grant", jwt_grant)
+    return issued, grants_lifetime
+
+def _credentials(scopes=SCOPES, email="lister@example.iam.gserviceaccount.com"):
+    return CachedServiceAccountCredentials(FakeSigner(), email, "https://oauth2.googleapis.com/token", scopes=scopes)
+
+def test_token_is_shared_through_the_state_file(grants):
+    """
+    取得したトークンは保存し、別のプロセス（別の資格情報）は取得し直さずに同じトークンと有効期限を使う
+    """
+    issued, _ = grants
+    first = _credentials()
+    first.refresh(None)
+    assert first.token == "token-1"
+
+    second = _credentials()
+    second.refresh(None)
+    assert len(issued) == 1
+    assert second.token == "token-1"
+    assert abs((second.expiry - first.expiry).total_seconds()) < 1
+    assert second.valid
+
+def test_token_close_to_expiry_is_refreshed(grants):
+    """
+    有効期限まで TOKEN_REFRESH_MARGIN_SECONDS を切った保存済みのトークンは使わずに取得し直す
+    """
+    issued, lifetime = grants
+    lifetime[0] = TOKEN_REFRESH_MARGIN_SECONDS - 10
+    _credentials().refresh(None)
+
+    lifetime[0] = 3600
+    credentials = _credentials()
+    credentials.refresh(None)
+    assert len(issued) == 2
+    assert credentials.token == "token-2"
+    assert [entry["token"] for entry in state_store.load_state(TOKEN_CACHE_STATE).values()] == ["token-2"]
+
+def test_tokens_are_kept_per_account_and_scopes(grants):
+    """
+    サービスアカウントとスコープごとに別のトークンを保存し、有効期限を過ぎたものは保存時に取り除く
+    """
+    issued, _ = grants
+    _credentials().refresh(None)
+    _credentials(scopes=SCOPES + ["https://www.googleapis.com/auth/drive.metadata.readonly"]).refresh(None)
+    _credentials(email="other@example.iam.gserviceaccount.com").refresh(None)
+    assert len(issued) == 3
+
+    tokens = state_store.load_state(TOKEN_CACHE_STATE)
+    assert len(tokens) == 3
+    expired = next(iter(tokens))
+    tokens[expired]["expires_at"] = time.time() - 1
+    tokens["stale|old|scope"] = {"token": "old", "expires_at": time.time() - 1}
+    state_store.save_state(TOKEN_CACHE_STATE, tokens)
+
+    _credentials(email="new@example.iam.gserviceaccount.com").refresh(None)
+    tokens = state_store.load_state(TOKEN_CACHE_STATE)
+    assert expired not in tokens and "stale|old|scope" not in tokens
+    assert len(tokens) == 3
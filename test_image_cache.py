@@ -0,0 +1,90 @@
+"""
+ダウンロードした画像のディスクキャッシュ（ImageCache）のテスト
+時刻を固定して、容量の上限による削除と猶予期間を確認する
+"""
+
+import os
+
+import pytest
+
+import image_cache
+from image_cache import ImageCache, EVICTION_GRACE_SECONDS
+
+class Clock:
+    """
+    image_cache が参照する time.time() を置き換える時計
+    """
+
+    def __init__(self, now=1_000_000.0):
+        self.now = now
+
+    def time(self):
+        return self.now
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(image_cache.time, "time", clock.time)
+    return clock
+
+def _put(cache, name, size=100):
+    return cache.put(f"https://example.com/{name}.jpg", [b"x" * size])
+
+def test_oldest_images_are_evicted_to_stay_within_max_bytes(tmp_path, clock):
+    """
+    合計サイズが上限を超えたら、最終使用日時が古いものから上限以下になるまで削除する
+    """
+    cache = ImageCache(str(tmp_path), max_bytes=250)
+    paths = []
+    for name in ("a", "b", "c"):
+        paths.append(_put(cache, name))
+        clock.now += EVICTION_GRACE_SECONDS * 2
+
+    assert [os.path.exists(path) for path in paths] == [False, True, True]
+    assert sum(entry["size"] for entry in cache._read_index().values()) <= 250
+    assert cache.get("https://example.com/a.jpg") is None
+
+def test_recently_used_and_kept_images_are_not_evicted(tmp_path, clock):
+    """
+    今保存した画像と、猶予期間内に使われた画像は、上限を超えていても削除しない
+    猶予期間が過ぎたら、次の保存で上限以下になるまで削除する
+    """
+    cache = ImageCache(str(tmp_path), max_bytes=150)
+    a = _put(cache, "a")
+    clock.now += EVICTION_GRACE_SECONDS / 3
+    b = _put(cache, "b")
+    assert os.path.exists(a) and os.path.exists(b)
+
+    clock.now += EVICTION_GRACE_SECONDS * 2
+    c = _put(cache, "c")
+    assert [os.path.exists(path) for path in (a, b, c)] == [False, False, True]
+
+def test_cache_hit_refreshes_last_used(tmp_path, clock):
+    """
+    キャッシュから使った画像は最終使用日時が更新され、先に保存した画像より後に削除される
+    """
+    cache = ImageCache(str(tmp_path), max_bytes=250)
+    a = _put(cache, "a")
+    clock.now += EVICTION_GRACE_SECONDS
+    b = _put(cache, "b")
+    clock.now += EVICTION_GRACE_SECONDS
+    assert cache.get("https://example.com/a.jpg") == a
+
+    clock.now += EVICTION_GRACE_SECONDS * 2
+    _put(cache, "c")
+    assert os.path.exists(a)
+    assert not os.path.exists(b)
+
+def test_new_instance_reads_the_saved_index(tmp_path, clock):
+    """
+    別のインスタンス（別のワーカープロセス）は保存された索引を読み込み、後から保存された画像も索引を読み直して使う
+    """
+    first = ImageCache(str(tmp_path), max_bytes=0)
+    a = _put(first, "a")
+
+    second = ImageCache(str(tmp_path), max_bytes=0)
+    assert second.get("https://example.com/a.jpg") == a
+
+    b = _put(first, "b")
+    assert second.get("https://example.com/b.jpg") == b
+    assert second.get("https://example.com/missing.jpg") is None
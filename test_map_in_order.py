@@ -0,0 +1,66 @@
+"""
+共有のスレッドプールで並行に実行する map_in_order のテスト
+"""
+
+import time
+import threading
+
+import pytest
+
+from utils import map_in_order
+
+def test_results_keep_input_order():
+    """
+    後の要素が先に終わっても、結果は入力と同じ順序で返す
+    """
+    def slow_for_small(n):
+        time.sleep(0.01 * (5 - n))
+        return n * 10
+
+    assert map_in_order(slow_for_small, range(5), max_concurrency=5) == [0, 10, 20, 30, 40]
+
+def test_concurrency_is_limited_per_call():
+    """
+    同時に実行する数は max_concurrency を超えない
+    """
+    lock = threading.Lock()
+    running = []
+    peak = []
+
+    def track(n):
+        with lock:
+            running.append(n)
+            peak.append(len(running))
+        time.sleep(0.01)
+        with lock:
+            running.remove(n)
+        return n
+
+    assert map_in_order(track, range(12), max_concurrency=3) == list(range(12))
+    assert max(peak) <= 3
+
+def test_single_item_or_no_concurrency_runs_in_caller_thread():
+    """
+    要素が1つか max_concurrency が1以下の場合は、スレッドプールを使わずに呼び出し元のスレッドで実行する
+    """
+    caller = threading.get_ident()
+    assert map_in_order(lambda n: threading.get_ident(), [1], max_concurrency=4) == [caller]
+    assert map_in_order(lambda n: threading.get_ident(), [1, 2], max_concurrency=1) == [caller, caller]
+    assert map_in_order(lambda n: n, [], max_concurrency=4) == []
+
+def test_exception_waits_for_running_calls():
+    """
+    例外は呼び出し元に伝え、その前に実行中の処理が終わるまで待つ
+    """
+    finished = []
+
+    def fail_first(n):
+        if n == 0:
+            raise ValueError("failed")
+        time.sleep(0.05)
+        finished.append(n)
+        return n
+
+    with pytest.raises(ValueError):
+        map_in_order(fail_first, range(3), max_concurrency=3)
+    assert sorted(finished) == [1, 2]
@@ -0,0 +1,45 @@
+"""
+画像URLのホストごとの扱い（direct / external / download）のテスト
+"""
+
+import pytest
+
+from picture_policy import parse_picture_policy, picture_mode
+
+def test_parse_picture_policy():
+    """
+    "ホスト=モード" のリストを解析する（大文字・小文字と空白は無視する）
+    """
+    assert parse_picture_policy(" CDN.example.com=Direct, *.example.net=external,") == [
+        ("cdn.example.com", "direct"),
+        ("*.example.net", "external"),
+    ]
+    assert parse_picture_policy("") == []
+
+@pytest.mark.parametrize("value", ["cdn.example.com", "=direct", "cdn.example.com=upload"])
+def test_parse_picture_policy_rejects_invalid(value):
+    """
+    形式・モードが不正な場合はエラーにする
+    """
+    with pytest.raises(ValueError):
+        parse_picture_policy(value)
+
+def test_picture_mode():
+    """
+    最初に一致したホストのモードを使い、一致しない場合はデフォルトのモードを使う
+    """
+    policy = parse_picture_policy("cdn.example.com=direct,*.example.net=external,example.net=download")
+
+    assert picture_mode("https://cdn.example.com/a.jpg", policy) == "direct"
+    assert picture_mode("https://img.example.net/a.jpg", policy) == "external"
+    # "*." はそのホスト自体にも一致する
+    assert picture_mode("https://example.net/a.jpg", policy) == "external"
+    assert picture_mode("https://other.example.com/a.jpg", policy, default="download") == "download"
+    assert picture_mode("https://other.example.com/a.jpg", policy, default="external") == "external"
+
+def test_non_https_urls_are_downloaded():
+    """
+    HTTPSでないURLはeBayに取得させず、ダウンロードしてからアップロードする
+    """
+    policy = parse_picture_policy("cdn.example.com=direct")
+    assert picture_mode("http://cdn.example.com/a.jpg", policy) == "download"
@@ -0,0 +1,90 @@
+"""
+Trading APIのレスポンスから必要な要素だけを取り出す処理のテスト
+ebaysdkのレスポンス（Response.dict()）と同じ値になることを確認する
+"""
+
+import requests
+from ebaysdk.response import Response
+
+from ebay_env import extract_response_fields
+
+ADD_ITEM_RESPONSE = b"""<?xml version="1.0" encoding="UTF-8"?>
+<AddItemResponse xmlns="urn:ebay:apis:eBLBaseComponents">
+  <Timestamp>2024-05-01T00:00:00.000Z</Timestamp>
+  <Ack>Warning</Ack>
+  <Errors>
+    <ShortMessage>Shipping policy</ShortMessage>
+    <ErrorCode>21919456</ErrorCode>
+    <SeverityCode>Warning</SeverityCode>
+  </Errors>
+  <Version>1193</Version>
+  <ItemID>110552734129</ItemID>
+  <StartTime>2024-05-01T00:00:00.000Z</StartTime>
+  <EndTime>2024-05-31T00:00:00.000Z</EndTime>
+  <Fees>
+    <Fee><Name>AuctionLengthFee</Name><Fee currencyID="USD">0.0</Fee></Fee>
+    <Fee><Name>ListingFee</Name><Fee currencyID="USD">0.35</Fee></Fee>
+  </Fees>
+</AddItemResponse>
+"""
+
+UPLOAD_RESPONSE = b"""<?xml version="1.0" encoding="UTF-8"?>
+<UploadSiteHostedPicturesResponse xmlns="urn:ebay:apis:eBLBaseComponents">
+  <Ack>Success</Ack>
+  <SiteHostedPictureDetails>
+    <PictureName>a.jpg</PictureName>
+    <BaseURL>https://i.ebayimg.com/00/s/base.jpg</BaseURL>
+    <FullURL>https://i.ebayimg.com/00/s/full.jpg?set_id=8800005007</FullURL>
+    <PictureSetMember><MemberURL>https://i.ebayimg.com/00/s/member0.jpg</MemberURL></PictureSetMember>
+    <PictureSetMember><MemberURL>https://i.ebayimg.com/00/s/member1.jpg</MemberURL></PictureSetMember>
+  </SiteHostedPictureDetails>
+</UploadSiteHostedPicturesResponse>
+"""
+
+def _sdk_response(content: bytes, verb: str) -> dict:
+    response = requests.Response()
+    response._content = content
+    response.status_code = 200
+    return Response(response, verb=verb).dict()
+
+def test_add_item_fields_match_sdk_response():
+    """
+    AddItemのItemIDとAckがebaysdkのレスポンスと一致する
+    """
+    expected = _sdk_response(ADD_ITEM_RESPONSE, "AddItem")
+    fields = extract_response_fields(ADD_ITEM_RESPONSE, ["ItemID", "Errors/ErrorCode"])
+
+    assert fields == {
+        "Ack": expected["Ack"],
+        "ItemID": expected["ItemID"],
+        "Errors/ErrorCode": expected["Errors"]["ErrorCode"],
+    }
+
+def test_picture_url_matches_sdk_response():
+    """
+    アップロードした画像のFullURLがebaysdkのレスポンスと一致し、
+    同じパスの要素が複数ある場合は最初のものを使う
+    """
+    expected = _sdk_response(UPLOAD_RESPONSE, "UploadSiteHostedPictures")["SiteHostedPictureDetails"]
+    fields = extract_response_fields(UPLOAD_RESPONSE, [
+        "SiteHostedPictureDetails/FullURL",
+        "SiteHostedPictureDetails/PictureSetMember/MemberURL",
+    ])
+
+    assert fields["Ack"] == "Success"
+    assert fields["SiteHostedPictureDetails/FullURL"] == expected["FullURL"]
+    assert fields["SiteHostedPictureDetails/PictureSetMember/MemberURL"] == expected["PictureSetMember"][0]["MemberURL"]
+
+def test_missing_fields_are_none():
+    """
+    レスポンスにない要素はNoneにする
+    """
+    fields = extract_response_fields(UPLOAD_RESPONSE, ["ItemID"])
+    assert fields == {"Ack": "Success", "ItemID": None}
+
+def test_stops_after_all_fields_are_found():
+    """
+    必要な要素がすべて見つかったら、後半の要素は解析しない（後半が壊れていてもエラーにならない）
+    """
+    truncated = ADD_ITEM_RESPONSE.split(b"<Fees>")[0] + b"<Fees><Fee><broken"
+    assert extract_response_fields(truncated, ["ItemID"]) == {"Ack": "Warning", "ItemID": "110552734129"}
@@ -0,0 +1,86 @@
+"""
+優先度・期限による並べ替えと、実行時間・呼び出し回数の上限のテスト
+"""
+
+from scheduler import order_items, WorkBudget
+
+ROWS = [
+    (0, {"Item name": "a", "Priority": "1", "Price": "$10.00", "Deadline": "2030-01-02"}),
+    (1, {"Item name": "b", "Priority": "", "Price": "5", "Deadline": ""}),
+    (2, {"Item name": "c", "Priority": "5", "Price": "1,200", "Deadline": "2030-01-01T09:00"}),
+    (3, {"Item name": "d", "Priority": "5", "Price": "", "Deadline": "2030-01-01"}),
+]
+
+def _rows(items):
+    return [row for row, _ in items]
+
+def test_order_items():
+    """
+    並び順ごとに並べ替え、値が同じ行と値がない行はシートの順にする
+    """
+    assert order_items(ROWS, "sheet") is ROWS
+    assert _rows(order_items(ROWS, "priority")) == [2, 3, 0, 1]
+    assert _rows(order_items(ROWS, "price")) == [2, 0, 1, 3]
+    # 日付だけの期限はその日の終わり
+    assert _rows(order_items(ROWS, "deadline")) == [2, 3, 0, 1]
+
+def test_call_budget_defers_rows_that_do_not_fit():
+    """
+    呼び出し回数の上限を超える行は先送りにし、少ない呼び出しで済む後続の行は処理する
+    """
+    calls = [0]
+    estimates = {"a": 3, "b": 5, "c": 1, "d": 2}
+    budget = WorkBudget(max_calls=6, call_counter=lambda: calls[0],
+                        estimate_calls=lambda item: estimates[item["Item name"]])
+
+    admitted = []
+    for row_index, item in budget.admit(ROWS):
+        admitted.append(row_index)
+        calls[0] += estimates[item["Item name"]]
+        budget.release(row_index)
+
+    assert admitted == [0, 2, 3]
+    assert [entry["row_index"] for entry in budget.deferred] == [1]
+    assert budget.deferred[0]["reason"] == "calls"
+    assert budget.calls_used() == 6
+
+def test_call_budget_reserves_rows_in_flight():
+    """
+    処理が終わっていない行の見積もりは、呼び出しがまだ行われていなくても確保する
+    """
+    budget = WorkBudget(max_calls=5, call_counter=lambda: 0, estimate_calls=lambda item: 2)
+
+    admitted = budget.admit(ROWS)
+    assert next(admitted)[0] == 0
+    assert next(admitted)[0] == 1
+    assert budget.calls_reserved() == 4
+    # 2件が処理中のため、3件目は上限を超える
+    budget.release(0)
+    assert next(admitted)[0] == 2
+    assert list(admitted) == []
+    assert [entry["row_index"] for entry in budget.deferred] == [3]
+
+def test_time_budget_and_completed_rows():
+    """
+    時間の上限を過ぎたら新しい行を処理しないが、処理済みの行はそのまま返す
+    """
+    budget = WorkBudget(max_seconds=0)
+    admitted = list(budget.admit(ROWS, is_done=lambda row_index: row_index == 2))
+
+    assert _rows(admitted) == [2]
+    assert [entry["reason"] for entry in budget.deferred] == ["time"] * 3
+
+def test_report_writes_deferred_rows(tmp_path):
+    """
+    先送りにした行をJSONファイルに書き出す
+    """
+    import json
+
+    budget = WorkBudget(max_calls=0, estimate_calls=lambda item: 1)
+    list(budget.admit(ROWS[:1]))
+    path = tmp_path / "deferred.json"
+    budget.report(str(path))
+
+    report = json.loads(path.read_text(encoding='utf-8'))
+    assert report["deferred"][0]["row_index"] == 0
+    assert report["deferred"][0]["priority"] == "1"
@@ -0,0 +1,31 @@
+"""
+出品プロファイル（ビジネスポリシーの組み合わせ）の設定の解析のテスト
+"""
+
+import pytest
+
+from seller_profiles import parse_seller_profiles
+
+def test_parse_seller_profiles():
+    """
+    プロファイル名ごとに支払い・返品・配送ポリシーのIDを返す
+    """
+    assert parse_seller_profiles("default=111:222:333, noreturn=111::444") == {
+        "default": {"payment": "111", "return": "222", "shipping": "333"},
+        "noreturn": {"payment": "111", "return": "", "shipping": "444"},
+    }
+    assert parse_seller_profiles("") == {}
+
+@pytest.mark.parametrize("value", [
+    "default",
+    "=111:222:333",
+    "default=111:222",
+    "default=::",
+    "default=111:abc:333",
+])
+def test_parse_seller_profiles_rejects_invalid(value):
+    """
+    形式が不正、IDが1つもない、IDが数字でない場合はエラーにする
+    """
+    with pytest.raises(ValueError):
+        parse_seller_profiles(value)
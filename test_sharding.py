@@ -0,0 +1,56 @@
+"""
+シャーディング（行の分割）のテスト
+"""
+
+import pytest
+
+from sharding import parse_shard, parse_rows, select_shard
+
+def test_parse_shard():
+    """
+    K/N 形式のシャード指定を解析する
+    """
+    assert parse_shard("0/4") == (0, 4)
+    assert parse_shard("3/4") == (3, 4)
+
+@pytest.mark.parametrize("value", ["4/4", "-1/4", "0/0", "1", "a/b", "1/2/3"])
+def test_parse_shard_rejects_invalid(value):
+    """
+    範囲外・形式が不正なシャード指定はエラーにする
+    """
+    with pytest.raises(ValueError):
+        parse_shard(value)
+
+def test_parse_rows():
+    """
+    A-B 形式の行範囲を解析する（両端を含む）
+    """
+    assert parse_rows("100-199") == (100, 199)
+    assert parse_rows("5-5") == (5, 5)
+    with pytest.raises(ValueError):
+        parse_rows("9-3")
+
+def test_select_shard_partitions_rows():
+    """
+    すべての行がちょうど1つのシャードに入り、割り当ては行番号だけで決まる
+    """
+    rows = [(row, {"Item name": f"item {row}"}) for row in range(10)]
+    shards = [list(select_shard(rows, index, 3)) for index in range(3)]
+
+    assert [row for row, _ in shards[0]] == [0, 3, 6, 9]
+    assert [row for row, _ in shards[1]] == [1, 4, 7]
+    assert sorted(row for shard in shards for row, _ in shard) == list(range(10))
+
+    # 一部の行だけを読み込んでも同じ行は同じシャードに入る
+    assert [row for row, _ in select_shard(rows[4:], 1, 3)] == [4, 7]
+
+def test_select_shard_is_lazy():
+    """
+    行を1件ずつ取り出す（全行をメモリに読み込まない）
+    """
+    def rows():
+        yield 0, {}
+        yield 1, {}
+        raise AssertionError("必要以上に読み込んでいます")
+
+    assert next(select_shard(rows(), 1, 2)) == (1, {})
@@ -0,0 +1,116 @@
+"""
+スプレッドシートの指紋（get_sheet_fingerprint）と --skip-unchanged のテスト
+Google APIは呼び出さず、モックのクライアントで確認する
+"""
+
+import argparse
+
+import pytest
+
+import main
+import state_store
+import google_sheets_reader
+from google_sheets_mock import MockSheetsService
+from google_sheets_reader import get_sheet_fingerprint
+
+ROWS = [["Item name", "Price", "Quantity"], ["Camera", "100", "1"], ["Mug", "10", "2"]]
+
+class MockDriveService:
+    """
+    Drive APIクライアントのモック（files().get でファイルのメタデータを返す）
+    """
+
+    def __init__(self, metadata):
+        self.metadata = metadata
+
+    def files(self):
+        return self
+
+    def get(self, fileId, fields, **kwargs):
+        return self
+
+    def execute(self):
+        return dict(self.metadata)
+
+def _use_services(monkeypatch, sheets, drive=None):
+    def get_service(api, version, scopes):
+        if api == 'drive':
+            if drive is None:
+                raise RuntimeError("403 Drive API has not been used in project")
+            return drive
+        return sheets
+    monkeypatch.setattr(google_sheets_reader, "_get_service", get_service)
+
+def test_drive_metadata_is_used(monkeypatch):
+    """
+    Drive APIが使える場合はファイルのバージョンと更新日時を指紋にし、シートの値は読み込まない
+    """
+    sheets = MockSheetsService(ROWS)
+    _use_services(monkeypatch, sheets, MockDriveService({"version": "42", "modifiedTime": "2024-05-01T00:00:00Z"}))
+
+    assert get_sheet_fingerprint("Sheet1", "sheet") == "drive:42:2024-05-01T00:00:00Z"
+    assert sheets.gets == []
+
+def test_fallback_detects_changes_in_any_column(monkeypatch):
+    """
+    Drive APIが使えない場合はシート全体の値のハッシュを使い、タイトル以外の列の変更も検出する
+    """
+    sheets = MockSheetsService(ROWS)
+    _use_services(monkeypatch, sheets)
+
+    before = get_sheet_fingerprint("Sheet1", "sheet")
+    assert sheets.gets == ["Sheet1"]
+    assert get_sheet_fingerprint("Sheet1", "sheet") == before
+
+    sheets.rows[2][1] = "12"
+    assert get_sheet_fingerprint("Sheet1", "sheet") != before
+
+def test_fingerprint_range_can_be_narrowed(monkeypatch):
+    """
+    SHEETS_FINGERPRINT_RANGE を指定した場合はその範囲だけを読み込む
+    """
+    sheets = MockSheetsService(ROWS)
+    _use_services(monkeypatch, sheets)
+    monkeypatch.setattr(google_sheets_reader, "SHEETS_FINGERPRINT_RANGE", "A:A")
+
+    before = get_sheet_fingerprint("Sheet1", "sheet")
+    sheets.rows[2][1] = "12"
+    assert get_sheet_fingerprint("Sheet1", "sheet") == before
+    assert sheets.gets == ["Sheet1!A:A", "Sheet1!A:A"]
+
+def test_no_fingerprint_when_sheets_api_fails(monkeypatch):
+    """
+    指紋を取得できない場合はNoneを返す（--skip-unchanged は実行をスキップしない）
+    """
+    def get_service(api, version, scopes):
+        raise RuntimeError("接続エラー")
+    monkeypatch.setattr(google_sheets_reader, "_get_service", get_service)
+
+    assert get_sheet_fingerprint("Sheet1", "sheet") is None
+
+def _args(**overrides):
+    values = dict(command='run', env='sandbox', targets=None, input=None, row=None, rows=None, shard=None,
+                  skip_unchanged=True, watch=False, export_feed=None, summary_file=None)
+    values.update(overrides)
+    return argparse.Namespace(**values)
+
+@pytest.fixture
+def last_runs(monkeypatch, tmp_path):
+    monkeypatch.setattr(state_store, "STATE_DIR", str(tmp_path))
+    setups = []
+    # 実行がスキップされなければ環境設定に進む（ここでは失敗させて終了する）
+    monkeypatch.setattr(main, "setup_environment", lambda: setups.append(True) or False)
+    return setups
+
+@pytest.mark.parametrize("fingerprint, skipped", [("drive:42:a", True), ("drive:43:b", False), (None, False)])
+def test_skip_unchanged(monkeypatch, last_runs, fingerprint, skipped):
+    """
+    前回の成功した実行と指紋が同じ場合だけ、eBay APIを呼び出さずに終了する
+    """
+    args = _args()
+    run_key = "|".join(str(part) for part in (main.input_source(args), "sandbox", None, None, None))
+    state_store.save_state("last_successful_runs", {run_key: "drive:42:a"})
+    monkeypatch.setattr(main, "get_fingerprint", lambda args: fingerprint)
+
+    assert main.run(args) == (0 if skipped else 1)
+    assert last_runs == ([] if skipped else [True])
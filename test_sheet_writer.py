@@ -0,0 +1,80 @@
+"""
+出品結果のスプレッドシートへの書き戻し（SheetResultWriter）のテスト
+Sheets APIは呼び出さず、モックのクライアントで書き込みを確認する
+"""
+
+import pytest
+
+import google_sheets_reader
+from google_sheets_mock import MockSheetsService
+from google_sheets_reader import SheetResultWriter
+
+SUCCESS = {"success": True, "item_id": "111", "error": None}
+FAILURE = {"success": False, "item_id": None, "error": "timeout"}
+
+@pytest.fixture
+def service(monkeypatch):
+    service = MockSheetsService([["Item name", "Price", "ListingStatus"]] + [[f"item {i}", "10"] for i in range(6)])
+    monkeypatch.setattr(google_sheets_reader, "_get_service", lambda *args: service)
+    return service
+
+def test_results_are_batched(service):
+    """
+    指定した行数の結果が溜まるまで書き込まず、1回の batchUpdate でまとめて書き込む
+    連続した行は1つの範囲にまとめ、ヘッダーにない列は最後の列の後ろに追加する
+    """
+    writer = SheetResultWriter(sheet_name="Sheet1", spreadsheet_id="sheet", batch_rows=3, flush_seconds=3600)
+    writer.add(0, SUCCESS)
+    writer.add(1, FAILURE)
+    assert service.updates == []
+
+    writer.add(4, SUCCESS)
+    assert len(service.updates) == 1
+    assert sorted(entry["range"] for entry in service.updates[0]) == [
+        "Sheet1!C2:C3", "Sheet1!C6:C6", "Sheet1!D1", "Sheet1!D2:D3", "Sheet1!D6:D6",
+        "Sheet1!E1", "Sheet1!E2:E3", "Sheet1!E6:E6",
+    ]
+    assert service.rows[0] == ["Item name", "Price", "ListingStatus", "ItemID", "ListingError"]
+    assert service.rows[1] == ["item 0", "10", "success", "111", ""]
+    assert service.rows[2] == ["item 1", "10", "failure", "", "timeout"]
+
+    # ヘッダーは最初の書き込みでだけ追加する
+    writer.add(5, SUCCESS)
+    assert writer.close()
+    assert [entry["range"] for entry in service.updates[1]] == ["Sheet1!D7:D7", "Sheet1!C7:C7", "Sheet1!E7:E7"]
+
+def test_failed_write_is_retried(service):
+    """
+    書き込みに失敗した結果は捨てずに、次回の書き込みで再送する（その間に追加された新しい結果を優先する）
+    """
+    service.fail_updates = 1
+    writer = SheetResultWriter(sheet_name="Sheet1", spreadsheet_id="sheet", batch_rows=100, flush_seconds=3600)
+    writer.add(0, FAILURE)
+    writer.add(1, SUCCESS)
+    assert not writer.flush()
+    assert service.updates == []
+
+    writer.add(0, SUCCESS)
+    assert writer.close()
+    assert service.rows[1][2:] == ["success", "111", ""]
+    assert service.rows[2][2:] == ["success", "111", ""]
+
+def test_results_of_all_targets_are_merged(service):
+    """
+    複数の出品先の結果は、すべての出品先の結果がそろってから1つのセルにまとめて書き込む
+    一部の出品先の結果しかない行は close() で書き込む
+    """
+    writer = SheetResultWriter(sheet_name="Sheet1", spreadsheet_id="sheet", batch_rows=1, flush_seconds=3600,
+                               targets=["sandbox", "production:shop2"])
+    writer.add(0, SUCCESS, "production:shop2")
+    assert service.updates == []
+
+    writer.add(0, FAILURE, "sandbox")
+    assert len(service.updates) == 1
+    assert service.rows[1][2:] == ["sandbox: failure\nproduction:shop2: success",
+                                   "sandbox: \nproduction:shop2: 111",
+                                   "sandbox: timeout\nproduction:shop2: "]
+
+    writer.add(1, SUCCESS, "sandbox")
+    assert writer.close()
+    assert service.rows[2][2:] == ["sandbox: success", "sandbox: 111", "sandbox: "]
@@ -0,0 +1,132 @@
+"""
+画像をディスクに保存せずにダウンロードしながらアップロードする処理（upload_image_stream / StreamingBody）のテスト
+画像の配信元とeBayには接続せず、スタブのトランスポートアダプターで確認する
+"""
+
+import io
+
+import pytest
+import requests
+from requests.adapters import BaseAdapter, HTTPAdapter
+from urllib3 import HTTPResponse
+
+import ebay_lister
+from ebay_env import EbayEnvironment, StreamingBody
+
+IMAGE = b"".join(bytes([i]) * 1000 for i in range(5))
+
+SUCCESS = b"""<?xml version="1.0" encoding="UTF-8"?>
+<UploadSiteHostedPicturesResponse xmlns="urn:ebay:apis:eBLBaseComponents">
+  <Ack>Success</Ack>
+  <SiteHostedPictureDetails><FullURL>https://i.ebayimg.com/images/test.jpg</FullURL></SiteHostedPictureDetails>
+</UploadSiteHostedPicturesResponse>
+"""
+
+FAILURE = b"""<?xml version="1.0" encoding="UTF-8"?>
+<UploadSiteHostedPicturesResponse xmlns="urn:ebay:apis:eBLBaseComponents">
+  <Ack>Failure</Ack>
+  <Errors><ErrorCode>21916</ErrorCode><LongMessage>Picture is too small.</LongMessage></Errors>
+</UploadSiteHostedPicturesResponse>
+"""
+
+class StubAdapter(BaseAdapter):
+    """
+    本文を読み込んで記録し、決まったレスポンスを返すトランスポートアダプター
+    """
+
+    def __init__(self, content, headers):
+        super().__init__()
+        self.content = content
+        self.headers = headers
+        self.requests = []
+
+    def send(self, request, **kwargs):
+        body = request.body
+        if body is not None and not isinstance(body, (bytes, str)):
+            # ストリームの本文は送信するときと同じように少しずつ読み込む
+            body = b"".join(body)
+        self.requests.append((request, body))
+        raw = HTTPResponse(body=io.BytesIO(self.content), headers=self.headers,
+                           status=200, preload_content=False, decode_content=False)
+        return HTTPAdapter().build_response(request, raw)
+
+    def close(self):
+        pass
+
+@pytest.fixture
+def upload(monkeypatch):
+    for name in ("APP_ID", "DEV_ID", "CERT_ID", "AUTH_TOKEN"):
+        monkeypatch.setenv(f"EBAY_SANDBOX_{name}", "test")
+    environment = EbayEnvironment("sandbox", calls_per_second=0)
+    ebay = StubAdapter(SUCCESS, {"Content-Type": "text/xml"})
+    environment.get_connection().session.mount("https://", ebay)
+
+    def serve(headers):
+        session = requests.Session()
+        source = StubAdapter(IMAGE, headers)
+        session.mount("https://", source)
+        monkeypatch.setattr(ebay_lister, "get_session", lambda: session)
+        return source
+
+    return environment, ebay, serve
+
+def test_image_is_streamed_into_the_upload(upload):
+    """
+    Content-Lengthを付けて画像のデータをmultipartの本文にそのまま流し込み、アップロードした画像のURLを返す
+    """
+    environment, ebay, serve = upload
+    serve({"Content-Type": "image/jpeg", "Content-Length": str(len(IMAGE))})
+
+    url = ebay_lister.upload_image_stream("https://images.example.com/camera.jpg?size=large", environment)
+    assert url == "https://i.ebayimg.com/images/test.jpg"
+
+    request, body = ebay.requests[0]
+    assert request.headers["X-EBAY-API-CALL-NAME"] == "UploadSiteHostedPictures"
+    assert int(request.headers["Content-Length"]) == len(body)
+    assert "Transfer-Encoding" not in request.headers
+    assert b'filename="camera.jpg"' in body
+    assert b"Content-Type: image/jpeg\r\n" in body
+    assert IMAGE in body
+    assert environment.traffic.as_dict()["UploadSiteHostedPictures"]["sent"] == len(body)
+
+@pytest.mark.parametrize("headers", [
+    {"Content-Type": "image/jpeg"},
+    {"Content-Type": "image/jpeg", "Content-Length": "100", "Content-Encoding": "gzip"},
+])
+def test_unknown_size_is_not_streamed(upload, headers):
+    """
+    配信元がContent-Lengthを返さない場合や圧縮して返す場合は、アップロードせずにNoneを返す
+    """
+    environment, ebay, serve = upload
+    serve(headers)
+
+    assert ebay_lister.upload_image_stream("https://images.example.com/camera.jpg", environment) is None
+    assert ebay.requests == []
+
+def test_api_error_returns_none(upload):
+    """
+    eBayがエラーを返した場合はNoneを返す
+    """
+    environment, ebay, serve = upload
+    serve({"Content-Type": "image/jpeg", "Content-Length": str(len(IMAGE))})
+    ebay.content = FAILURE
+
+    assert ebay_lister.upload_image_stream("https://images.example.com/camera.jpg", environment) is None
+    assert len(ebay.requests) == 1
+
+def test_streaming_body_length_and_order():
+    """
+    長さはストリームの前後のデータを含めたバイト数で、空のチャンクは送らない
+    """
+    body = StreamingBody(b"head", iter([b"ab", b"", b"cd"]), 4, b"tail")
+    assert len(body) == 12
+    assert list(body) == [b"head", b"ab", b"cd", b"tail"]
+
+def test_streaming_body_rejects_size_mismatch():
+    """
+    ストリームのバイト数が想定と異なる場合は、後ろのデータを送らずにエラーにする
+    （Content-Lengthと本文の長さが一致しない壊れたリクエストを送らない）
+    """
+    body = StreamingBody(b"head", iter([b"ab"]), 4, b"tail")
+    with pytest.raises(IOError):
+        list(body)
@@ -0,0 +1,103 @@
+"""
+出品前の認証トークンの確認（check_token）のテスト
+eBayには接続せず、セッションにスタブのトランスポートアダプターをマウントして確認する
+"""
+
+import io
+
+import pytest
+from requests.adapters import BaseAdapter, HTTPAdapter
+from urllib3 import HTTPResponse
+
+import state_store
+import token_check
+from ebay_env import EbayEnvironment
+from token_check import check_token
+
+ACTIVE = b"""<?xml version="1.0" encoding="UTF-8"?>
+<GetTokenStatusResponse xmlns="urn:ebay:apis:eBLBaseComponents">
+  <Ack>Success</Ack>
+  <TokenStatus><Status>Active</Status><ExpirationTime>2099-01-01T00:00:00.000Z</ExpirationTime></TokenStatus>
+</GetTokenStatusResponse>
+"""
+
+ERROR = b"""<?xml version="1.0" encoding="UTF-8"?>
+<GetTokenStatusResponse xmlns="urn:ebay:apis:eBLBaseComponents">
+  <Ack>Failure</Ack>
+  <Errors>
+    <ShortMessage>Error</ShortMessage>
+    <LongMessage>Error</LongMessage>
+    <ErrorCode>%s</ErrorCode>
+    <SeverityCode>Error</SeverityCode>
+  </Errors>
+</GetTokenStatusResponse>
+"""
+
+class StubAdapter(BaseAdapter):
+    """
+    決まった順にレスポンスを返すトランスポートアダプター
+    """
+
+    def __init__(self, responses):
+        super().__init__()
+        self.responses = list(responses)
+        self.calls = 0
+
+    def send(self, request, **kwargs):
+        status, content = self.responses[min(self.calls, len(self.responses) - 1)]
+        self.calls += 1
+        raw = HTTPResponse(body=io.BytesIO(content), headers={"Content-Type": "text/xml"},
+                           status=status, preload_content=False)
+        return HTTPAdapter().build_response(request, raw)
+
+    def close(self):
+        pass
+
+@pytest.fixture
+def environment(monkeypatch, tmp_path):
+    monkeypatch.setattr(state_store, "STATE_DIR", str(tmp_path))
+    for name in ("APP_ID", "DEV_ID", "CERT_ID", "AUTH_TOKEN"):
+        monkeypatch.setenv(f"EBAY_SANDBOX_{name}", "test")
+    environment = EbayEnvironment("sandbox", calls_per_second=0)
+
+    def respond(*responses):
+        adapter = StubAdapter(responses)
+        environment.get_connection().session.mount("https://", adapter)
+        return adapter
+    return environment, respond
+
+def test_active_token_is_cached(environment):
+    """
+    有効なトークンの確認結果は保存し、有効期間内は GetTokenStatus を呼び出さずに再利用する
+    """
+    env, respond = environment
+    adapter = respond((200, ACTIVE))
+
+    assert check_token(env, ttl=3600)
+    assert check_token(env, ttl=3600)
+    assert adapter.calls == 1
+
+    assert check_token(env, ttl=0)
+    assert adapter.calls == 2
+
+@pytest.mark.parametrize("code", sorted(token_check.AUTH_ERROR_CODES))
+def test_auth_errors_mean_invalid_token(environment, code):
+    """
+    認証エラーのエラーコードが返された場合だけ、認証情報が無効と判断する
+    """
+    env, respond = environment
+    respond((200, ERROR % code.encode()))
+    assert not check_token(env)
+
+@pytest.mark.parametrize("response", [(200, ERROR % b"10007"), (503, b"Service Unavailable")])
+def test_other_failures_do_not_stop_and_are_rechecked(environment, response):
+    """
+    認証エラー以外のエラー（eBayの内部エラーや一時的な障害）では出品を止めず、結果を保存せずに次回確認し直す
+    """
+    env, respond = environment
+    adapter = respond(response, (200, ACTIVE))
+
+    assert check_token(env, ttl=3600)
+    assert check_token(env, ttl=3600)
+    assert check_token(env, ttl=3600)
+    assert adapter.calls == 2
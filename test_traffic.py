@@ -0,0 +1,116 @@
+"""
+Trading APIの送受信（gzip圧縮と送受信量の記録）のテスト
+eBayには接続せず、セッションにスタブのトランスポートアダプターをマウントして確認する
+"""
+
+import io
+import gzip
+
+import pytest
+from requests.adapters import BaseAdapter, HTTPAdapter
+from urllib3 import HTTPResponse
+
+import ebay_env
+from ebay_env import EbayEnvironment
+from traffic import merge_traffic
+
+RESPONSE = b"""<?xml version="1.0" encoding="UTF-8"?>
+<%(verb)sResponse xmlns="urn:ebay:apis:eBLBaseComponents">
+  <Timestamp>2024-05-01T00:00:00.000Z</Timestamp>
+  <Ack>Success</Ack>
+  <Version>1193</Version>
+  <ItemID>110552734129</ItemID>
+""" + b"".join(b"  <Fees><Fee><Name>Fee%d</Name><Fee currencyID=\"USD\">0.0</Fee></Fee></Fees>\n" % i
+               for i in range(50)) + b"</%(verb)sResponse>\n"
+
+class StubAdapter(BaseAdapter):
+    """
+    受け取ったリクエストを記録し、API名に合わせたレスポンスをgzipで圧縮して返すトランスポートアダプター
+    """
+
+    def __init__(self):
+        super().__init__()
+        self.requests = []
+        self.responses = []
+
+    def send(self, request, **kwargs):
+        content = RESPONSE.replace(b"%(verb)s", request.headers["X-EBAY-API-CALL-NAME"].encode())
+        body = gzip.compress(content)
+        self.requests.append(request)
+        self.responses.append((body, content))
+        raw = HTTPResponse(body=io.BytesIO(body),
+                           headers={"Content-Type": "text/xml", "Content-Encoding": "gzip",
+                                    "Content-Length": str(len(body))},
+                           status=200, preload_content=False, decode_content=True)
+        return HTTPAdapter().build_response(request, raw)
+
+    def close(self):
+        pass
+
+@pytest.fixture
+def environment(monkeypatch):
+    for name in ("APP_ID", "DEV_ID", "CERT_ID", "AUTH_TOKEN"):
+        monkeypatch.setenv(f"EBAY_SANDBOX_{name}", "test")
+    monkeypatch.setattr(ebay_env, "EBAY_ACCEPT_GZIP", True)
+    environment = EbayEnvironment("sandbox", calls_per_second=0)
+    adapter = StubAdapter()
+    environment.get_connection().session.mount("https://", adapter)
+    return environment, adapter
+
+def _item(description_size: int) -> dict:
+    return {"Item": {"Title": "Test item", "Description": "lorem ipsum " * description_size}}
+
+def test_gzip_response_is_decoded(environment):
+    """
+    gzipで圧縮されたレスポンスを展開して解析し、Accept-Encoding: gzip を送る
+    """
+    env, adapter = environment
+
+    assert env.execute_fields("AddItem", _item(1), ["ItemID"]) == {"Ack": "Success", "ItemID": "110552734129"}
+    assert env.execute("AddItem", _item(1)).dict()["ItemID"] == "110552734129"
+    assert adapter.requests[0].headers["Accept-Encoding"] == "gzip"
+
+def test_gzip_request_body(environment, monkeypatch):
+    """
+    EBAY_GZIP_REQUESTS が有効な場合、1KiB以上の本文だけをgzipで圧縮して送る
+    """
+    env, adapter = environment
+    monkeypatch.setattr(ebay_env, "EBAY_GZIP_REQUESTS", True)
+
+    env.execute_fields("AddItem", _item(500), ["ItemID"])
+    env.execute_fields("AddItem", _item(1), ["ItemID"])
+
+    large, small = adapter.requests
+    assert large.headers["Content-Encoding"] == "gzip"
+    assert large.headers["Content-Length"] == str(len(large.body))
+    assert b"lorem ipsum " * 500 in gzip.decompress(large.body)
+    assert "Content-Encoding" not in small.headers
+    assert small.body.startswith(b"<?xml")
+
+def test_traffic_is_recorded_per_call(environment, monkeypatch):
+    """
+    API名ごとに呼び出し回数、送信したバイト数、受信したバイト数（圧縮されたまま）、展開後のバイト数を記録する
+    """
+    env, adapter = environment
+    monkeypatch.setattr(ebay_env, "EBAY_GZIP_REQUESTS", True)
+
+    env.execute_fields("AddItem", _item(500), ["ItemID"])
+    env.execute_fields("AddItem", _item(1), ["ItemID"])
+    env.execute("VerifyAddItem", _item(1))
+
+    def totals(calls):
+        return {
+            "calls": len(calls),
+            "sent": sum(len(request.body) for request, _ in calls),
+            "received": sum(len(body) for _, (body, _) in calls),
+            "decoded": sum(len(content) for _, (_, content) in calls),
+        }
+
+    calls = list(zip(adapter.requests, adapter.responses))
+    traffic = env.traffic.as_dict()
+    assert traffic == {"AddItem": totals(calls[:2]), "VerifyAddItem": totals(calls[2:])}
+    assert traffic["AddItem"]["received"] < traffic["AddItem"]["decoded"]
+
+    merged = merge_traffic([traffic, traffic])
+    assert merged["AddItem"]["calls"] == 4
+    assert merged["VerifyAddItem"]["received"] == 2 * traffic["VerifyAddItem"]["received"]
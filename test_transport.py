@@ -0,0 +1,158 @@
+"""
+共有のトランスポート（HttpxAdapter / GoogleHttp / create_adapter）のテスト
+外部には接続せず、スタブのアダプターと httpx.MockTransport で確認する
+"""
+
+import io
+import sys
+import gzip
+
+import pytest
+import requests
+from requests.adapters import BaseAdapter, HTTPAdapter
+from urllib3 import HTTPResponse
+
+import transport
+from transport import GoogleHttp, create_adapter, default_timeout
+
+BODY = b'{"values": [["Item name", "Price"]]}'
+
+class StubAdapter(BaseAdapter):
+    """
+    受け取ったリクエストと送信時の引数を記録し、gzipで圧縮したレスポンスを返すトランスポートアダプター
+    """
+
+    def __init__(self):
+        super().__init__()
+        self.sent = []
+
+    def send(self, request, **kwargs):
+        self.sent.append((request, kwargs))
+        body = gzip.compress(BODY)
+        raw = HTTPResponse(body=io.BytesIO(body),
+                           headers={"Content-Type": "application/json", "Content-Encoding": "gzip",
+                                    "Content-Length": str(len(body)), "X-Request-Id": "abc"},
+                           status=200, reason="OK", preload_content=False, decode_content=True)
+        return HTTPAdapter().build_response(request, raw)
+
+    def close(self):
+        pass
+
+@pytest.fixture
+def shared_adapter(monkeypatch):
+    adapter = StubAdapter()
+    monkeypatch.setattr(transport, "_adapter", adapter)
+    return adapter
+
+def test_google_http_returns_httplib2_style_response(shared_adapter):
+    """
+    GoogleHttp は共有のアダプターで送信し、httplib2 と同じ形（ステータスとヘッダー、展開した本文）で返す
+    本文を展開・連結した後の長さと一致しないヘッダーは渡さない
+    """
+    http = GoogleHttp(requests.Session())
+    info, content = http.request("https://sheets.googleapis.com/v4/spreadsheets/sheet/values/Sheet1",
+                                 method="POST", body=b"{}", headers={"Content-Type": "application/json"})
+
+    assert content == BODY
+    assert info.status == 200 and info["status"] == "200" and info.reason == "OK"
+    assert info["x-request-id"] == "abc"
+    assert "content-length" not in info and "content-encoding" not in info
+
+    request, kwargs = shared_adapter.sent[0]
+    assert (request.method, request.body) == ("POST", b"{}")
+    assert kwargs["timeout"] == default_timeout()
+
+def test_google_http_redirections(shared_adapter):
+    """
+    redirections=0 の場合はリダイレクトをたどらない
+    """
+    http = GoogleHttp(requests.Session())
+    session_requests = []
+    original = http.session.request
+    http.session.request = lambda *args, **kwargs: session_requests.append(kwargs) or original(*args, **kwargs)
+
+    http.request("https://www.googleapis.com/drive/v3/files/sheet", redirections=0)
+    http.request("https://www.googleapis.com/drive/v3/files/sheet")
+    assert [kwargs["allow_redirects"] for kwargs in session_requests] == [False, True]
+
+def test_httpx_falls_back_to_requests_when_not_installed(monkeypatch):
+    """
+    httpx がインストールされていない場合は requests の接続プールを使う
+    """
+    monkeypatch.setitem(sys.modules, "httpx", None)
+    assert isinstance(create_adapter("httpx"), HTTPAdapter)
+    assert isinstance(create_adapter("requests"), HTTPAdapter)
+
+@pytest.fixture
+def httpx_session():
+    httpx = pytest.importorskip("httpx")
+    pytest.importorskip("h2")
+    adapter = transport.HttpxAdapter(pool_connections=2, pool_maxsize=2, max_retries=0)
+    handled = []
+
+    class Chunks(httpx.SyncByteStream):
+        def __init__(self, body):
+            self.body = body
+
+        def __iter__(self):
+            yield self.body[:10]
+            yield self.body[10:]
+
+    def handler(request):
+        handled.append(request)
+        error = request.headers.get("X-Raise")
+        if error:
+            raise getattr(httpx, error)("failed", request=request)
+        return httpx.Response(200, headers={"Content-Encoding": "gzip", "Content-Type": "application/json"},
+                              stream=Chunks(gzip.compress(BODY)))
+
+    adapter._client.close()
+    adapter._client = httpx.Client(transport=httpx.MockTransport(handler))
+    session = requests.Session()
+    session.mount("https://", adapter)
+    yield session, handled
+    adapter.shutdown()
+
+def test_httpx_adapter_sends_through_httpx(httpx_session):
+    """
+    requests のセッションからの送信を httpx で行い、展開した本文とヘッダーを requests.Response として返す
+    """
+    session, handled = httpx_session
+    response = session.post("https://api.ebay.com/ws/api.dll", data=b"<xml/>", headers={"X-Test": "1"})
+
+    assert response.status_code == 200
+    assert response.content == BODY
+    assert response.headers["Content-Type"] == "application/json"
+    assert handled[0].method == "POST"
+    assert handled[0].headers["X-Test"] == "1"
+    assert handled[0].content == b"<xml/>"
+
+def test_httpx_adapter_streams_and_counts_wire_bytes(httpx_session):
+    """
+    stream=True の場合は本文を少しずつ読み、raw.tell() は圧縮されたまま受信したバイト数を返す
+    """
+    session, _ = httpx_session
+    with session.get("https://images.example.com/camera.jpg", stream=True) as response:
+        assert b"".join(response.iter_content(8)) == BODY
+        assert response.raw.tell() == len(gzip.compress(BODY))
+
+@pytest.mark.parametrize("error, expected", [
+    ("ConnectTimeout", requests.exceptions.ConnectTimeout),
+    ("ReadTimeout", requests.exceptions.ReadTimeout),
+    ("ConnectError", requests.exceptions.ConnectionError),
+])
+def test_httpx_errors_become_requests_errors(httpx_session, error, expected):
+    """
+    httpx の例外は、呼び出し元が処理している requests の例外に変換する
+    """
+    session, _ = httpx_session
+    with pytest.raises(expected):
+        session.get("https://api.ebay.com/ws/api.dll", headers={"X-Raise": error})
+
+def test_httpx_timeouts():
+    """
+    requests の (接続, 読み込み) のタイムアウトを httpx のタイムアウトに変換する
+    """
+    httpx = pytest.importorskip("httpx")
+    assert transport.HttpxAdapter._timeout((3, 20)) == httpx.Timeout(20, connect=3)
+    assert transport.HttpxAdapter._timeout(5) == httpx.Timeout(5)
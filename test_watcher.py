@@ -0,0 +1,123 @@
+"""
+監視モードの行と出品の対応付け（ListingIndex）と、出品済みの行の更新（ReviseItem）のテスト
+"""
+
+import ebay_lister
+from watcher import ListingIndex, sheet_item_ids
+
+IGNORE = ['ItemID', 'ListingStatus', 'ListingError']
+
+def _rows(*titles, item_ids=None):
+    item_ids = item_ids or {}
+    return [(i, {"Item name": title, "Price": "10", "ItemID": item_ids.get(i, "")}) for i, title in enumerate(titles)]
+
+def _listed(index, rows, label="sandbox"):
+    """
+    処理が必要な行をすべて出品したものとして記録する（アイテムIDは "id-<タイトル>"）
+    """
+    changed = index.plan(rows, IGNORE)
+    for row_index, item in changed:
+        index.record(label, row_index, index.revise[label].get(row_index) or f"id-{item['Item name']}")
+    return changed
+
+def test_inserted_and_deleted_rows_are_not_relisted():
+    """
+    行の挿入・削除で行番号がずれても、内容が同じ行は出品し直さない
+    """
+    index = ListingIndex({}, ["sandbox"], "ItemID")
+    assert len(_listed(index, _rows("Camera", "Mug", "Lamp"))) == 3
+
+    # 先頭に行を挿入すると、新しい行だけを出品する
+    changed = index.plan(_rows("Vase", "Camera", "Mug", "Lamp"), IGNORE)
+    assert [item["Item name"] for _, item in changed] == ["Vase"]
+    assert index.revise == {"sandbox": {}}
+    index.record("sandbox", 0, "id-Vase")
+
+    # 行を削除しても、残りの行は処理しない
+    assert index.plan(_rows("Vase", "Mug", "Lamp"), IGNORE) == []
+    assert index.as_state()["sandbox"]["id-Mug"]["row"] == 1
+
+def test_edited_row_revises_existing_listing():
+    """
+    内容が編集された出品済みの行は、新しく出品せずに既存の出品を更新する
+    """
+    index = ListingIndex({}, ["sandbox"], "ItemID")
+    _listed(index, _rows("Camera", "Mug"))
+
+    rows = _rows("Camera", "Mug")
+    rows[1][1]["Price"] = "12"
+    changed = index.plan(rows, IGNORE)
+    assert [row_index for row_index, _ in changed] == [1]
+    assert index.revise == {"sandbox": {1: "id-Mug"}}
+
+    index.record("sandbox", 1, "id-Mug")
+    assert index.plan(rows, IGNORE) == []
+
+def test_item_id_column_takes_precedence():
+    """
+    書き戻したItemID列がある行は、行が移動して内容が編集されていてもその出品を更新する
+    監視の記録にない出品（通常の実行で出品した行）も、新しく出品せずに更新する
+    """
+    index = ListingIndex({}, ["sandbox"], "ItemID")
+    _listed(index, _rows("Camera", "Mug"))
+
+    rows = _rows("Vase", "Camera", "Cup", "Lamp", item_ids={2: "id-Mug", 3: "999"})
+    changed = index.plan(rows, IGNORE)
+    assert [item["Item name"] for _, item in changed] == ["Vase", "Cup", "Lamp"]
+    assert index.revise == {"sandbox": {2: "id-Mug", 3: "999"}}
+
+def test_targets_are_matched_separately():
+    """
+    複数の出品先では、出品先ごとのアイテムIDで対応付け、失敗した出品先だけを新しく出品する
+    """
+    labels = ["sandbox", "production:shop2"]
+    index = ListingIndex({}, labels, "ItemID")
+    rows = _rows("Camera")
+    index.plan(rows, IGNORE)
+    index.record("sandbox", 0, "111")
+
+    rows = _rows("Camera", item_ids={0: "sandbox: 111\nproduction:shop2: "})
+    assert [row_index for row_index, _ in index.plan(rows, IGNORE)] == [0]
+    assert index.revise == {"sandbox": {}, "production:shop2": {}}
+
+def test_sheet_item_ids():
+    """
+    ItemID列の値は、出品先が1つならそのまま、複数なら "出品先: アイテムID" の行として読み取る
+    """
+    assert sheet_item_ids("111", ["sandbox"]) == {"sandbox": "111"}
+    assert sheet_item_ids("", ["sandbox"]) == {}
+    assert sheet_item_ids("sandbox: 111\nproduction:shop2: 222\nproduction:shop3: ",
+                          ["sandbox", "production:shop2", "production:shop3"]) == {
+        "sandbox": "111", "production:shop2": "222"}
+
+class FakeEnvironment:
+    """
+    Trading APIを呼び出さずに、呼び出したAPIとリクエストを記録するeBay環境
+    """
+
+    def __init__(self, response_item_id):
+        self.response_item_id = response_item_id
+        self.calls = []
+
+    def is_production(self):
+        return False
+
+    def execute_fields(self, verb, data, fields):
+        self.calls.append((verb, data))
+        return {"ItemID": self.response_item_id}
+
+def test_list_item_on_ebay_revises_when_item_id_is_given(monkeypatch):
+    """
+    item_id を指定した場合はAddItemではなくReviseItemで既存の出品を更新する
+    """
+    monkeypatch.setattr(ebay_lister, "validate_credentials", lambda environment: True)
+
+    env = FakeEnvironment(None)
+    assert ebay_lister.list_item_on_ebay("Camera", environment=env, item_id="111") == (True, "111")
+    assert env.calls[0][0] == "ReviseItem"
+    assert env.calls[0][1]["Item"]["ItemID"] == "111"
+
+    env = FakeEnvironment("222")
+    assert ebay_lister.list_item_on_ebay("Camera", environment=env) == (True, "222")
+    assert env.calls[0][0] == "AddItem"
+    assert "ItemID" not in env.calls[0][1]["Item"]
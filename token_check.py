@@ -0,0 +1,138 @@
+import time
+import hashlib
+import logging
+from datetime import datetime, timezone
+from typing import Optional, List
+
+from ebaysdk.exception import ConnectionError
+
+from config import EBAY_TOKEN_CHECK_TTL_SECONDS
+from ebay_env import EbayEnvironment
+from file_lock import FileLock
+from state_store import load_state, save_state, state_path
+
+logger = logging.getLogger("ebay_listing.token_check")
+
+# 確認結果を保存する状態の名前
+TOKEN_STATUS_STATE = "token_status"
+# 有効期限までこの秒数を切ったら警告する
+EXPIRY_WARNING_SECONDS = 14 * 24 * 60 * 60
+# 認証情報が無効であることを示すeBay APIのエラーコード
+# （931: トークンが無効, 932: トークンの有効期限切れ, 16110: トークンの取り消し,
+#   16118 / 16119: トークンの有効期限切れ・取り消し, 17470: トークンの再取得が必要）
+AUTH_ERROR_CODES = {"931", "932", "16110", "16118", "16119", "17470"}
+
+def token_key(environment: EbayEnvironment) -> str:
+    """
+    確認結果を保存するキーを作る（トークンそのものは保存しない）
+
+    Args:
+        environment (EbayEnvironment): eBay環境オブジェクト
+
+    Returns:
+        str: 出品先の表示名とトークンのハッシュ
+    """
+    digest = hashlib.sha256(environment.credentials["token"].encode('utf-8')).hexdigest()
+    return f"{environment.label}:{digest[:16]}"
+
+def _parse_time(value: Optional[str]) -> Optional[float]:
+    if not value:
+        return None
+    try:
+        return datetime.strptime(value, "%Y-%m-%dT%H:%M:%S.%fZ").replace(tzinfo=timezone.utc).timestamp()
+    except ValueError:
+        return None
+
+def _error_codes(response) -> List[str]:
+    """
+    eBay APIのエラーレスポンスからエラーコードを取り出す
+
+    Args:
+        response: ConnectionError のレスポンス
+
+    Returns:
+        List[str]: エラーコード（読み取れない場合は空）
+    """
+    try:
+        errors = response.dict().get('Errors') or []
+    except Exception:
+        return []
+    if isinstance(errors, dict):
+        errors = [errors]
+    return [str(error.get('ErrorCode')) for error in errors if isinstance(error, dict) and error.get('ErrorCode')]
+
+# 有効期限が近いことを警告済みのキー（監視モードで毎回警告しないため）
+_warned = set()
+
+def _warn_if_expiring(environment: EbayEnvironment, expires_at: Optional[float]) -> None:
+    key = token_key(environment)
+    if key in _warned:
+        return
+    if expires_at is not None and expires_at - time.time() < EXPIRY_WARNING_SECONDS:
+        _warned.add(key)
+        expiry = datetime.fromtimestamp(expires_at, tz=timezone.utc).strftime("%Y-%m-%d %H:%M UTC")
+        logger.warning(f"[{environment.label}] 認証トークンの有効期限が近づいています（{expiry}）。更新してください")
+
+def check_token(environment: EbayEnvironment, ttl: float = EBAY_TOKEN_CHECK_TTL_SECONDS) -> bool:
+    """
+    出品を始める前に、GetTokenStatus で認証情報とトークンが有効かどうかを1回だけ確認する
+    有効だった結果とトークンの有効期限は、ttl 秒の間（有効期限を過ぎるまで）保存して再利用する
+    確認はファイルロックで排他するため、並列に起動したワーカーも1回の呼び出しの結果を共有する
+
+    Args:
+        environment (EbayEnvironment): eBay環境オブジェクト
+        ttl (float): 確認結果を再利用する秒数（0の場合は毎回確認する）
+
+    Returns:
+        bool: 認証情報が無効と判明した場合（AUTH_ERROR_CODES のエラー）はFalse。
+              ネットワークの障害やその他のエラーで確認できなかった場合は、出品を止めずにTrueを返す
+              （結果は保存しないため、次の呼び出しで確認し直す）
+    """
+    if not environment.validate_credentials():
+        logger.error(f"eBay {environment.label} 環境のAPI認証情報が正しく設定されていません")
+        return False
+
+    key = token_key(environment)
+    with FileLock(state_path(TOKEN_STATUS_STATE) + ".lock"):
+        statuses = load_state(TOKEN_STATUS_STATE, {})
+        now = time.time()
+        cached = statuses.get(key)
+        if (cached and ttl > 0 and now - cached["checked_at"] < ttl and
+                (cached["expires_at"] is None or cached["expires_at"] > now)):
+            logger.debug(f"[{environment.label}] 確認済みの認証トークンの状態を使用します")
+            _warn_if_expiring(environment, cached["expires_at"])
+            return True
+
+        try:
+            fields = environment.execute_fields('GetTokenStatus', {},
+                                                ['TokenStatus/Status', 'TokenStatus/ExpirationTime'])
+        except ConnectionError as e:
+            response = getattr(e, 'response', None)
+            codes = _error_codes(response) if response is not None else []
+            if AUTH_ERROR_CODES.intersection(codes):
+                # eBayが認証エラーを返した（トークンの失効・取り消しなど）
+                logger.error(f"[{environment.label}] 認証情報が無効です: {str(e)}")
+                return False
+            logger.warning(f"[{environment.label}] 認証トークンを確認できませんでした（出品は続け、次回確認し直します）: "
+                           f"{str(e)}")
+            return True
+        except Exception as e:
+            # 接続の障害や、XMLではないエラーページ（503など）の解析の失敗
+            logger.warning(f"[{environment.label}] 認証トークンを確認できませんでした（出品は続け、次回確認し直します）: "
+                           f"{str(e)}")
+            return True
+
+        status = fields.get('TokenStatus/Status')
+        expires_at = _parse_time(fields.get('TokenStatus/ExpirationTime'))
+        if status != "Active":
+            logger.error(f"[{environment.label}] 認証トークンが無効です（状態: {status}）")
+            return False
+
+        logger.info(f"[{environment.label}] 認証トークンは有効です")
+        _warn_if_expiring(environment, expires_at)
+        # 有効期限を過ぎた他のトークンの結果は取り除く
+        statuses = {name: entry for name, entry in statuses.items()
+                    if entry["expires_at"] is None or entry["expires_at"] > now}
+        statuses[key] = {"status": status, "expires_at": expires_at, "checked_at": now}
+        save_state(TOKEN_STATUS_STATE, statuses)
+    return True
@@ -0,0 +1,131 @@
+import gzip
+import logging
+import threading
+from typing import Optional, Dict, Iterable
+
+import requests
+
+logger = logging.getLogger("ebay_listing.traffic")
+
+# 呼び出しごとに数える値
+# calls: 呼び出し回数 / sent: 送信した本文のバイト数 / received: 受信した本文のバイト数（圧縮されたまま）
+# decoded: 展開した後の本文のバイト数
+TRAFFIC_FIELDS = ("calls", "sent", "received", "decoded")
+
+# これより小さい本文は圧縮しても効果が小さいため、そのまま送信する
+GZIP_MIN_BYTES = 1024
+
+def compress_body(body: bytes, min_bytes: int = GZIP_MIN_BYTES) -> Optional[bytes]:
+    """
+    リクエストの本文をgzipで圧縮する
+
+    Args:
+        body (bytes): 本文
+        min_bytes (int): 圧縮する最小のバイト数
+
+    Returns:
+        Optional[bytes]: 圧縮した本文。小さすぎる場合や圧縮しても小さくならない場合はNone
+    """
+    if len(body) < min_bytes:
+        return None
+    compressed = gzip.compress(body, compresslevel=6)
+    return compressed if len(compressed) < len(body) else None
+
+def wire_bytes(response: requests.Response) -> int:
+    """
+    レスポンスの本文を受信したバイト数（圧縮されていれば圧縮されたまま）を取得する
+
+    Args:
+        response (requests.Response): 本文を読み終えたレスポンス
+
+    Returns:
+        int: 受信したバイト数。取得できない場合は展開後のバイト数
+    """
+    tell = getattr(response.raw, "tell", None)
+    if tell is not None:
+        try:
+            received = tell()
+            if received:
+                return received
+        except (OSError, ValueError):
+            pass
+    return len(response.content or b"")
+
+class TrafficStats:
+    """
+    API名ごとに、呼び出し回数と送受信したバイト数を数えるクラス
+    複数のスレッドから同時に記録できる
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._stats: Dict[str, Dict[str, int]] = {}
+
+    def record(self, verb: str, sent: int, received: int, decoded: int) -> None:
+        """
+        1回の呼び出しを記録する
+
+        Args:
+            verb (str): API名（"AddItem" など）
+            sent (int): 送信した本文のバイト数
+            received (int): 受信した本文のバイト数
+            decoded (int): 展開した後の本文のバイト数
+        """
+        with self._lock:
+            entry = self._stats.setdefault(verb, dict.fromkeys(TRAFFIC_FIELDS, 0))
+            entry["calls"] += 1
+            entry["sent"] += sent
+            entry["received"] += received
+            entry["decoded"] += decoded
+
+    def as_dict(self) -> Dict[str, Dict[str, int]]:
+        """
+        記録した値のコピーを取得する
+
+        Returns:
+            Dict[str, Dict[str, int]]: API名ごとの値
+        """
+        with self._lock:
+            return {verb: dict(entry) for verb, entry in self._stats.items()}
+
+def merge_traffic(traffics: Iterable[Dict[str, Dict[str, int]]]) -> Dict[str, Dict[str, int]]:
+    """
+    複数の出品先・ワーカーの値をAPI名ごとに合計する
+
+    Args:
+        traffics (Iterable[Dict[str, Dict[str, int]]]): API名ごとの値
+
+    Returns:
+        Dict[str, Dict[str, int]]: 合計した値
+    """
+    merged: Dict[str, Dict[str, int]] = {}
+    for traffic in traffics:
+        for verb, entry in (traffic or {}).items():
+            total = merged.setdefault(verb, dict.fromkeys(TRAFFIC_FIELDS, 0))
+            for field in TRAFFIC_FIELDS:
+                total[field] += entry.get(field, 0)
+    return merged
+
+def _format_bytes(size: int) -> str:
+    for unit in ("B", "KiB", "MiB"):
+        if size < 1024:
+            return f"{size:.0f}{unit}" if unit == "B" else f"{size:.1f}{unit}"
+        size /= 1024
+    return f"{size:.1f}GiB"
+
+def log_traffic(traffic: Dict[str, Dict[str, int]]) -> None:
+    """
+    API名ごとの呼び出し回数と送受信したバイト数をログに出力する
+
+    Args:
+        traffic (Dict[str, Dict[str, int]]): API名ごとの値
+    """
+    if not traffic:
+        return
+    logger.info("Trading APIの送受信量（API名: 呼び出し回数, 送信, 受信（展開後））:")
+    for verb in sorted(traffic, key=lambda name: -(traffic[name]["sent"] + traffic[name]["received"])):
+        entry = traffic[verb]
+        calls = entry["calls"] or 1
+        logger.info(f"  {verb}: {entry['calls']}回, 送信 {_format_bytes(entry['sent'])}"
+                    f"（平均 {_format_bytes(entry['sent'] // calls)}）, "
+                    f"受信 {_format_bytes(entry['received'])}（{_format_bytes(entry['decoded'])}）")
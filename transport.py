@@ -0,0 +1,261 @@
+import logging
+import threading
+from typing import Optional, Dict, Tuple, Union, Iterator
+
+import httplib2
+import requests
+from requests.adapters import BaseAdapter, HTTPAdapter
+from requests.structures import CaseInsensitiveDict
+from requests.utils import get_encoding_from_headers
+
+from config import (
+    HTTP_TRANSPORT,
+    HTTP_POOL_CONNECTIONS,
+    HTTP_POOL_MAXSIZE,
+    HTTP_MAX_RETRIES,
+    HTTP_CONNECT_TIMEOUT,
+    HTTP_READ_TIMEOUT
+)
+
+logger = logging.getLogger("ebay_listing.transport")
+
+# HTTP_TRANSPORT で指定できるトランスポート
+# requests: requests（urllib3）の接続プール / httpx: httpx の接続プール（サーバーが対応していればHTTP/2で多重化する）
+TRANSPORTS = ("requests", "httpx")
+
+# requests が本文を展開・連結するため、Google APIクライアントに渡さない応答ヘッダー
+_HOP_BY_HOP_HEADERS = {"content-length", "content-encoding", "transfer-encoding"}
+
+def default_timeout() -> Tuple[float, float]:
+    """
+    HTTP呼び出しのデフォルトのタイムアウト
+
+    Returns:
+        Tuple[float, float]: (接続のタイムアウト, 読み込みのタイムアウト)（秒）
+    """
+    return (HTTP_CONNECT_TIMEOUT, HTTP_READ_TIMEOUT)
+
+class _HttpxRaw:
+    """
+    httpx のレスポンスの本文を requests.Response.raw として読めるようにする
+    """
+
+    def __init__(self, response):
+        self._response = response
+
+    def stream(self, amt: int = 65536, decode_content: bool = True) -> Iterator[bytes]:
+        import httpx
+        try:
+            if decode_content:
+                yield from self._response.iter_bytes(amt)
+            else:
+                yield from self._response.iter_raw(amt)
+        except httpx.TimeoutException as e:
+            raise requests.exceptions.ReadTimeout(str(e))
+        except httpx.HTTPError as e:
+            raise requests.exceptions.ChunkedEncodingError(str(e))
+
+    def read(self, amt: Optional[int] = None, decode_content: bool = True) -> bytes:
+        return b"".join(self.stream(amt or 65536, decode_content))
+
+    def tell(self) -> int:
+        # 受信したバイト数（圧縮されたまま）
+        return self._response.num_bytes_downloaded
+
+    def close(self) -> None:
+        self._response.close()
+
+    def release_conn(self) -> None:
+        self._response.close()
+
+class HttpxAdapter(BaseAdapter):
+    """
+    requests のセッションから httpx のクライアントで送信するトランスポートアダプター
+    セッションを使う既存のコード（ebaysdk、画像の転送、Google APIクライアント）を変えずに、
+    1つの httpx のクライアントの接続プールとHTTP/2の多重化を共有する
+    """
+
+    def __init__(self, pool_connections: int, pool_maxsize: int, max_retries: int):
+        """
+        初期化
+
+        Args:
+            pool_connections (int): Keep-Aliveで保持する接続の最大数
+            pool_maxsize (int): 同時に使う接続の最大数
+            max_retries (int): 接続に失敗した場合の再試行回数
+        """
+        import httpx
+        super().__init__()
+        self._client = httpx.Client(
+            transport=httpx.HTTPTransport(
+                http2=True,
+                retries=max_retries,
+                limits=httpx.Limits(max_connections=pool_maxsize, max_keepalive_connections=pool_connections)
+            ),
+            timeout=httpx.Timeout(HTTP_READ_TIMEOUT, connect=HTTP_CONNECT_TIMEOUT),
+            follow_redirects=False
+        )
+
+    @staticmethod
+    def _timeout(timeout: Union[None, float, Tuple[float, float]]):
+        import httpx
+        if timeout is None:
+            return httpx.Timeout(HTTP_READ_TIMEOUT, connect=HTTP_CONNECT_TIMEOUT)
+        if isinstance(timeout, tuple):
+            return httpx.Timeout(timeout[1], connect=timeout[0])
+        return httpx.Timeout(timeout)
+
+    def send(self, request: requests.PreparedRequest, stream: bool = False, timeout=None,
+             verify=True, cert=None, proxies=None) -> requests.Response:
+        """
+        requests の送信を httpx のクライアントで行う（verify・cert・proxies はクライアントの設定を使う）
+        """
+        import httpx
+        try:
+            outgoing = self._client.build_request(request.method, request.url, headers=dict(request.headers),
+                                                  content=request.body, timeout=self._timeout(timeout))
+            incoming = self._client.send(outgoing, stream=True)
+        except httpx.ConnectTimeout as e:
+            raise requests.exceptions.ConnectTimeout(str(e), request=request)
+        except httpx.TimeoutException as e:
+            raise requests.exceptions.ReadTimeout(str(e), request=request)
+        except httpx.HTTPError as e:
+            raise requests.exceptions.ConnectionError(str(e), request=request)
+
+        response = requests.Response()
+        response.status_code = incoming.status_code
+        response.headers = CaseInsensitiveDict(incoming.headers.multi_items())
+        response.encoding = get_encoding_from_headers(response.headers)
+        response.reason = incoming.reason_phrase
+        response.url = request.url
+        response.request = request
+        response.connection = self
+        response.raw = _HttpxRaw(incoming)
+        if not stream:
+            # 本文を読み終えて接続をプールに戻す
+            response.content
+            incoming.close()
+        return response
+
+    def close(self) -> None:
+        # セッションを閉じても、他のセッションと共有しているクライアントは閉じない
+        pass
+
+    def shutdown(self) -> None:
+        self._client.close()
+
+def create_adapter(transport: str = HTTP_TRANSPORT) -> BaseAdapter:
+    """
+    設定に従ってトランスポートアダプターを作成する
+
+    Args:
+        transport (str): TRANSPORTS のいずれか
+
+    Returns:
+        BaseAdapter: requests のセッションにマウントするアダプター
+    """
+    if transport == "httpx":
+        try:
+            adapter = HttpxAdapter(HTTP_POOL_CONNECTIONS, HTTP_POOL_MAXSIZE, HTTP_MAX_RETRIES)
+            logger.info("HTTPの送信に httpx（HTTP/2）を使用します")
+            return adapter
+        except ImportError:
+            logger.warning("httpx[http2] がインストールされていないため、requests の接続プールを使用します")
+    return HTTPAdapter(pool_connections=HTTP_POOL_CONNECTIONS, pool_maxsize=HTTP_POOL_MAXSIZE,
+                       max_retries=HTTP_MAX_RETRIES)
+
+_adapter: Optional[BaseAdapter] = None
+_session: Optional[requests.Session] = None
+_lock = threading.Lock()
+
+def get_adapter() -> BaseAdapter:
+    """
+    プロセス内で共有するトランスポートアダプターを取得する
+
+    Returns:
+        BaseAdapter: トランスポートアダプター
+    """
+    global _adapter
+    with _lock:
+        if _adapter is None:
+            _adapter = create_adapter()
+        return _adapter
+
+def mount(session: requests.Session) -> requests.Session:
+    """
+    セッションに共有のトランスポートアダプターをマウントする（接続プールを共有する）
+
+    Args:
+        session (requests.Session): セッション
+
+    Returns:
+        requests.Session: 同じセッション
+    """
+    adapter = get_adapter()
+    session.mount('https://', adapter)
+    session.mount('http://', adapter)
+    return session
+
+def get_session() -> requests.Session:
+    """
+    画像の転送などに使う、プロセス内で共有するセッションを取得する
+
+    Returns:
+        requests.Session: 共有のトランスポートアダプターをマウントしたセッション
+    """
+    global _session
+    if _session is None:
+        session = mount(requests.Session())
+        with _lock:
+            if _session is None:
+                _session = session
+    return _session
+
+class GoogleHttp:
+    """
+    Google APIクライアント（googleapiclient）から httplib2.Http の代わりに使うHTTPクライアント
+    認証済みのセッション（google.auth.transport.requests.AuthorizedSession）で送信し、共有の接続プールを使う
+    """
+
+    def __init__(self, session: requests.Session):
+        """
+        初期化
+
+        Args:
+            session (requests.Session): 認証済みのセッション
+        """
+        self.session = mount(session)
+
+    def request(self, uri: str, method: str = "GET", body=None, headers: Optional[Dict[str, str]] = None,
+                redirections: int = 5, connection_type=None) -> Tuple[httplib2.Response, bytes]:
+        """
+        httplib2.Http.request と同じ形で送信する
+
+        Returns:
+            Tuple[httplib2.Response, bytes]: (ステータスとヘッダー, 本文)
+        """
+        response = self.session.request(method, uri, data=body, headers=headers, timeout=default_timeout(),
+                                        allow_redirects=redirections > 0)
+        info = {key.lower(): value for key, value in response.headers.items()
+                if key.lower() not in _HOP_BY_HOP_HEADERS}
+        info["status"] = str(response.status_code)
+        result = httplib2.Response(info)
+        result.reason = response.reason
+        return result, response.content
+
+    def close(self) -> None:
+        # 共有の接続プールは閉じない
+        pass
+
+def google_http(credentials) -> GoogleHttp:
+    """
+    認証情報から Google APIクライアント用のHTTPクライアントを作成する
+
+    Args:
+        credentials (google.auth.credentials.Credentials): 認証情報
+
+    Returns:
+        GoogleHttp: build(..., http=...) に渡すHTTPクライアント
+    """
+    from google.auth.transport.requests import AuthorizedSession
+    return GoogleHttp(AuthorizedSession(credentials))
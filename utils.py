@@ -1,36 +1,48 @@
 import os
 import logging
+import threading
 import requests
-from typing import Optional
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from typing import Optional, List, Callable, Iterable, TypeVar
+
+from config import IMAGE_WORKERS, IMAGE_CACHE_DIR
+from image_cache import get_image_cache
+from transport import get_session, default_timeout
+
+T = TypeVar("T")
+R = TypeVar("R")
 
 logger = logging.getLogger("ebay_listing.utils")
 
-def download_image_from_url(url: str, save_dir: str = "images") -> Optional[str]:
+IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png', '.gif', '.bmp', '.tif', '.tiff', '.webp', '.heic')
+
+def download_image_from_url(url: str, save_dir: str = IMAGE_CACHE_DIR) -> Optional[str]:
     """
     URLから画像をダウンロードして保存する関数
+    画像はキャッシュに保存し、同じURLは再度ダウンロードしない
     
     Args:
         url (str): 画像のURL
-        save_dir (str, optional): 保存先ディレクトリ
+        save_dir (str, optional): 保存先（キャッシュ）ディレクトリ
         
     Returns:
         Optional[str]: 保存されたファイルのパス。失敗した場合はNone。
     """
     try:
-        os.makedirs(save_dir, exist_ok=True)
+        cache = get_image_cache(save_dir)
+        cached_path = cache.get(url)
+        if cached_path:
+            logger.info(f"キャッシュの画像を使用します: {url} -> {cached_path}")
+            return cached_path
         
-        filename = os.path.basename(url.split('?')[0])
-        if not filename:
-            filename = f"image_{hash(url)}.jpg"
+        extension = os.path.splitext(url.split('?')[0])[1].lower()
+        if extension not in IMAGE_EXTENSIONS:
+            extension = '.jpg'
         
-        save_path = os.path.join(save_dir, filename)
-        
-        response = requests.get(url, stream=True, timeout=30)
+        response = get_session().get(url, stream=True, timeout=default_timeout())
         response.raise_for_status()
         
-        with open(save_path, 'wb') as f:
-            for chunk in response.iter_content(chunk_size=8192):
-                f.write(chunk)
+        save_path = cache.put(url, response.iter_content(chunk_size=8192), extension)
         
         logger.info(f"画像をダウンロードしました: {url} -> {save_path}")
         return save_path
@@ -41,3 +53,53 @@ def download_image_from_url(url: str, save_dir: str = "images") -> Optional[str]
     except Exception as e:
         logger.error(f"画像のダウンロード中に予期しないエラーが発生しました: {str(e)}")
         return None
+
+_executor: Optional[ThreadPoolExecutor] = None
+_executor_lock = threading.Lock()
+
+def _get_executor() -> ThreadPoolExecutor:
+    """
+    画像の転送に使うスレッドプールを取得する
+    スレッドを使い回すことで、スレッドごとのeBay API接続（Keep-Alive）も再利用される
+    
+    Returns:
+        ThreadPoolExecutor: プロセス内で共有するスレッドプール
+    """
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=IMAGE_WORKERS, thread_name_prefix="image")
+        return _executor
+
+def map_in_order(func: Callable[[T], R], items: Iterable[T], max_concurrency: int) -> List[R]:
+    """
+    共有のスレッドプールで関数を並行に実行し、入力と同じ順序で結果を返す関数
+    
+    Args:
+        func (Callable[[T], R]): 各要素に適用する関数
+        items (Iterable[T]): 入力
+        max_concurrency (int): 同時に実行する最大数（呼び出しごとの上限）
+        
+    Returns:
+        List[R]: 入力と同じ順序の結果
+    """
+    items = list(items)
+    if len(items) <= 1 or max_concurrency <= 1:
+        return [func(item) for item in items]
+    
+    executor = _get_executor()
+    results: List[Optional[R]] = [None] * len(items)
+    pending = {}
+    next_index = 0
+    try:
+        while next_index < len(items) or pending:
+            while next_index < len(items) and len(pending) < max_concurrency:
+                pending[executor.submit(func, items[next_index])] = next_index
+                next_index += 1
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                results[pending.pop(future)] = future.result()
+    finally:
+        # 例外で抜けた場合も、実行中の処理が終わるまで待つ
+        wait(pending)
+    return results
@@ -0,0 +1,240 @@
+import json
+import signal
+import hashlib
+import logging
+import threading
+from typing import Optional, List, Dict, Any, Tuple, Iterable, Iterator, TypeVar
+
+logger = logging.getLogger("ebay_listing.watcher")
+
+T = TypeVar("T")
+
+class StopSignal:
+    """
+    SIGTERM / SIGINT を受け取ったら停止を要求するクラス
+    処理中の出品は最後まで行い、新しい行の処理だけを止めるために使う
+    """
+
+    def __init__(self):
+        """
+        初期化
+        """
+        self.event = threading.Event()
+        self._previous = {}
+
+    def install(self) -> None:
+        """
+        シグナルハンドラを登録する（メインスレッドから呼び出すこと）
+        """
+        for signum in (signal.SIGTERM, signal.SIGINT):
+            self._previous[signum] = signal.signal(signum, self._handle)
+
+    def restore(self) -> None:
+        """
+        登録前のシグナルハンドラに戻す
+        """
+        for signum, handler in self._previous.items():
+            signal.signal(signum, handler)
+        self._previous = {}
+
+    def _handle(self, signum, frame) -> None:
+        if self.event.is_set():
+            # 2回目のシグナルでは待たずに終了する
+            raise KeyboardInterrupt
+        logger.info(f"シグナル {signal.Signals(signum).name} を受信しました。処理中の出品が終わり次第停止します")
+        self.event.set()
+
+    @property
+    def requested(self) -> bool:
+        """
+        停止が要求されているかどうか
+        """
+        return self.event.is_set()
+
+    def wait(self, timeout: float) -> bool:
+        """
+        停止が要求されるか、指定した秒数が経過するまで待つ
+
+        Args:
+            timeout (float): 待機する秒数
+
+        Returns:
+            bool: 停止が要求された場合はTrue
+        """
+        return self.event.wait(timeout)
+
+def until_stopped(items: Iterable[T], stop: StopSignal) -> Iterator[T]:
+    """
+    停止が要求されるまで要素を返すイテレータ
+    既に取り出された要素（処理中の出品）はそのまま最後まで処理される
+
+    Args:
+        items (Iterable[T]): 元の並び
+        stop (StopSignal): 停止シグナル
+
+    Yields:
+        T: 元の並びの要素
+    """
+    for item in items:
+        if stop.requested:
+            return
+        yield item
+
+def row_digest(item: Dict[str, str], ignore: Iterable[str] = ()) -> str:
+    """
+    行の内容のハッシュを計算する
+
+    Args:
+        item (Dict[str, str]): 商品データ
+        ignore (Iterable[str]): ハッシュに含めない列（書き戻した出品結果の列など）
+
+    Returns:
+        str: 行の内容のハッシュ
+    """
+    ignore = set(ignore)
+    content = {key: value for key, value in item.items() if key not in ignore}
+    return hashlib.sha1(json.dumps(content, sort_keys=True, ensure_ascii=False).encode('utf-8')).hexdigest()
+
+def sheet_item_ids(value: str, labels: List[str]) -> Dict[str, str]:
+    """
+    書き戻したItemID列の値から、出品先ごとのアイテムIDを取り出す
+
+    Args:
+        value (str): ItemID列の値（出品先が1つの場合はアイテムID、複数の場合は "出品先: アイテムID" の行）
+        labels (List[str]): 出品先の表示名
+
+    Returns:
+        Dict[str, str]: 出品先の表示名ごとのアイテムID
+    """
+    value = (value or "").strip()
+    if not value:
+        return {}
+    if len(labels) == 1:
+        return {labels[0]: value}
+
+    item_ids = {}
+    for line in value.splitlines():
+        label, separator, item_id = line.partition(': ')
+        if separator and label in labels and item_id.strip():
+            item_ids[label] = item_id.strip()
+    return item_ids
+
+class ListingIndex:
+    """
+    監視モードで出品した商品を出品先ごとに記録するクラス（アイテムIDごとの内容のハッシュと行番号）
+    シートの行は、ItemID列（書き戻した出品結果）、内容のハッシュ、前回の行番号の順に出品と対応付けるため、
+    行の挿入・削除で行番号がずれても出品し直さず、内容が編集された行は既存の出品を更新する
+    """
+
+    def __init__(self, state: Dict[str, Dict[str, Dict[str, Any]]], labels: List[str], id_column: str):
+        """
+        初期化
+
+        Args:
+            state (Dict): 保存されている記録（出品先の表示名 → アイテムID → {"digest", "row"}）
+            labels (List[str]): 出品先の表示名
+            id_column (str): 書き戻したアイテムIDの列
+        """
+        self.labels = labels
+        self.id_column = id_column
+        self.listings = {label: {item_id: dict(entry) for item_id, entry in state.get(label, {}).items()}
+                         for label in labels}
+        self.revise: Dict[str, Dict[int, str]] = {label: {} for label in labels}
+        self._digests: Dict[int, str] = {}
+
+    def _match(self, label: str, rows: List[Tuple[int, Dict[str, str], str]]) -> Dict[int, str]:
+        """
+        シートの行を出品先の既存の出品と対応付ける
+
+        Returns:
+            Dict[int, str]: 行番号ごとのアイテムID（出品されていない行は含まない）
+        """
+        listings = self.listings[label]
+        by_digest: Dict[str, List[str]] = {}
+        by_row: Dict[int, str] = {}
+        for item_id, entry in listings.items():
+            by_digest.setdefault(entry["digest"], []).append(item_id)
+            if entry.get("row") is not None:
+                by_row[entry["row"]] = item_id
+
+        matched: Dict[int, str] = {}
+        claimed = set()
+
+        def claim(row_index: int, item_id: Optional[str]) -> None:
+            if item_id and row_index not in matched and item_id not in claimed:
+                matched[row_index] = item_id
+                claimed.add(item_id)
+
+        # 1. 書き戻したItemID列（行と一緒に移動するため、最も確実）
+        for row_index, item, _ in rows:
+            claim(row_index, sheet_item_ids(item.get(self.id_column, ""), self.labels).get(label))
+        # 2. 内容が同じ出品（行の挿入・削除で行番号だけがずれた行）
+        for row_index, _, digest in rows:
+            for item_id in by_digest.get(digest, []):
+                if item_id not in claimed:
+                    claim(row_index, item_id)
+                    break
+        # 3. 同じ行番号の出品で、他の行に対応付けられていないもの（内容が編集された行）
+        for row_index, _, _ in rows:
+            claim(row_index, by_row.get(row_index))
+        return matched
+
+    def plan(self,
+             items: Iterable[Tuple[int, Dict[str, str]]],
+             ignore: Iterable[str] = ()) -> List[Tuple[int, Dict[str, str]]]:
+        """
+        処理が必要な行（新しく追加された行と、内容が編集された出品済みの行）を取り出す
+        編集された行のアイテムIDは revise に出品先ごとに記録する（ReviseItemで更新する）
+
+        Args:
+            items (Iterable[Tuple[int, Dict[str, str]]]): (行番号, 商品データ) の並び
+            ignore (Iterable[str]): 変更の判定に含めない列（書き戻した出品結果の列など）
+
+        Returns:
+            List[Tuple[int, Dict[str, str]]]: 処理が必要な行
+        """
+        ignore = list(ignore)
+        rows = [(row_index, item, row_digest(item, ignore)) for row_index, item in items]
+        self._digests = {row_index: digest for row_index, _, digest in rows}
+        self.revise = {label: {} for label in self.labels}
+
+        changed = set()
+        for label in self.labels:
+            listings = self.listings[label]
+            matched = self._match(label, rows)
+            for row_index, _, digest in rows:
+                item_id = matched.get(row_index)
+                if item_id is None:
+                    changed.add(row_index)
+                elif item_id not in listings or listings[item_id]["digest"] != digest:
+                    # ItemID列にだけある出品（通常の実行で出品した行）は、内容が同じでも一度更新して記録する
+                    self.revise[label][row_index] = item_id
+                    changed.add(row_index)
+                else:
+                    listings[item_id]["row"] = row_index
+            # 他の行に行番号を取られた出品は、行番号での対応付けに使わない
+            for item_id, entry in listings.items():
+                if entry.get("row") in matched and matched[entry["row"]] != item_id:
+                    entry["row"] = None
+
+        return [(row_index, item) for row_index, item, _ in rows if row_index in changed]
+
+    def record(self, label: str, row_index: int, item_id: str) -> None:
+        """
+        出品（または更新）に成功した行を記録する
+
+        Args:
+            label (str): 出品先の表示名
+            row_index (int): 行番号
+            item_id (str): アイテムID
+        """
+        self.listings[label][item_id] = {"digest": self._digests[row_index], "row": row_index}
+
+    def as_state(self) -> Dict[str, Dict[str, Dict[str, Any]]]:
+        """
+        保存する記録を取得する
+
+        Returns:
+            Dict: 出品先の表示名 → アイテムID → {"digest", "row"}
+        """
+        return self.listings